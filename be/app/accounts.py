@@ -0,0 +1,113 @@
+"""Account deletion and bulk resets.
+
+Every table holding user data references ``users`` with ON DELETE CASCADE,
+so deleting the user row removes everything in one statement. That is what
+``delete_account`` does for ordinary accounts. Accounts with more child rows
+than ACCOUNT_DELETE_INLINE_ROWS are instead disabled and scrubbed at once and
+handed to a ``purge_account`` job, which deletes their rows in batches of
+ACCOUNT_PURGE_BATCH_SIZE, one short transaction each, before removing the
+user row itself.
+"""
+
+from datetime import datetime, timezone
+from typing import Optional
+import os
+import uuid
+
+from sqlalchemy import delete, func, select, text, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .models import (
+    AIJob,
+    DailyActivity,
+    LearningGoal,
+    Note,
+    Playlist,
+    Progress,
+    Quiz,
+    Schedule,
+    Task,
+    User,
+    UserStreak,
+    WeekRollup,
+)
+
+ACCOUNT_DELETE_INLINE_ROWS = int(os.getenv("ACCOUNT_DELETE_INLINE_ROWS", "5000"))
+ACCOUNT_PURGE_BATCH_SIZE = int(os.getenv("ACCOUNT_PURGE_BATCH_SIZE", "1000"))
+
+# Child tables that can grow with a user's history, purged in batches. The
+# rollup tables are bounded (one row per active day or week) and simply go
+# with the user row.
+PURGED_MODELS = (AIJob, Schedule, Task, Note, Progress, Quiz, Playlist, LearningGoal)
+ROLLUP_MODELS = (DailyActivity, WeekRollup, UserStreak)
+
+
+async def count_user_rows(db: AsyncSession, user_id: int, cap: int) -> int:
+    """Rows the user owns in PURGED_MODELS, counting no further than ``cap``."""
+    total = 0
+    for model in PURGED_MODELS:
+        owned = select(model.id).where(model.user_id == user_id).limit(cap - total + 1)
+        total += await db.scalar(select(func.count()).select_from(owned.subquery()))
+        if total > cap:
+            break
+    return total
+
+
+async def delete_account(db: AsyncSession, user_id: int) -> bool:
+    """Delete the account, or disable it for a background purge.
+
+    Returns True when the user row is already gone, False when the caller
+    must enqueue a ``purge_account`` job. Either way the caller commits.
+    """
+    if await count_user_rows(db, user_id, ACCOUNT_DELETE_INLINE_ROWS) <= (
+        ACCOUNT_DELETE_INLINE_ROWS
+    ):
+        await db.execute(delete(User).where(User.id == user_id))
+        return True
+
+    # Free the username and email and kill outstanding tokens right away
+    placeholder = f"deleted-{uuid.uuid4().hex}"
+    await db.execute(
+        update(User)
+        .where(User.id == user_id)
+        .values(
+            username=placeholder,
+            email=f"{placeholder}@deleted.invalid",
+            name=None,
+            token_version=User.token_version + 1,
+            deleted_at=datetime.now(timezone.utc),
+        )
+        .execution_options(synchronize_session=False)
+    )
+    return False
+
+
+async def purge_batch(
+    db: AsyncSession, model, user_id: int, keep_job_id: Optional[int] = None
+) -> int:
+    """Delete up to ACCOUNT_PURGE_BATCH_SIZE of the user's ``model`` rows."""
+    batch = select(model.id).where(model.user_id == user_id)
+    if model is AIJob and keep_job_id is not None:
+        batch = batch.where(AIJob.id != keep_job_id)  # the purge job itself
+    batch = batch.limit(ACCOUNT_PURGE_BATCH_SIZE)
+    result = await db.execute(
+        delete(model)
+        .where(model.id.in_(batch))
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount
+
+
+async def reset_all_data(db: AsyncSession) -> None:
+    """Empty every user table (dev and load-test environments only).
+
+    On Postgres this is a single TRUNCATE, which skips per-row work and
+    resets id sequences; SQLite has no TRUNCATE, so rows are deleted.
+    """
+    models = (*ROLLUP_MODELS, *PURGED_MODELS, User)
+    if db.bind.dialect.name == "postgresql":
+        tables = ", ".join(model.__tablename__ for model in models)
+        await db.execute(text(f"TRUNCATE TABLE {tables} RESTART IDENTITY"))
+    else:
+        for model in models:
+            await db.execute(delete(model))
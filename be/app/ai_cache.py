@@ -0,0 +1,186 @@
+from __future__ import annotations
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional, Tuple, Type
+import asyncio
+import hashlib
+import json
+import os
+import time
+
+from pydantic import BaseModel
+from sqlalchemy import delete, select
+
+
+def normalize_input(text: Optional[str]) -> str:
+    """Collapse and trim whitespace in user input before it enters a prompt."""
+    return " ".join((text or "").split())
+
+
+def cache_key(model: str, contents: str, schema: Optional[Type[BaseModel]]) -> str:
+    """Content address of a generation request.
+
+    Runs of whitespace in the prompt are collapsed, so requests differing
+    only in spacing ("Python" vs " Python ") share an entry. Case is kept:
+    identifiers and names in the details or plan context are case-sensitive.
+    """
+    normalized = " ".join(contents.split())
+    schema_json = (
+        json.dumps(schema.model_json_schema(), sort_keys=True) if schema else ""
+    )
+    payload = json.dumps([model, normalized, schema_json])
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class CacheStats:
+    def __init__(self) -> None:
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self.bytes_stored = 0
+
+    def snapshot(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "stores": self.stores,
+            "evictions": self.evictions,
+            "bytes_stored": self.bytes_stored,
+        }
+
+
+class MemoryCache:
+    """LRU cache with a TTL, bounded by entry count and total bytes."""
+
+    name = "memory"
+
+    def __init__(self, ttl: float, max_entries: int, max_bytes: int) -> None:
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.stats = CacheStats()
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._bytes = 0
+
+    def _drop(self, key: str) -> None:
+        _, value = self._entries.pop(key)
+        self._bytes -= len(value.encode())
+
+    async def get(self, key: str) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.stats.misses += 1
+            return None
+        if entry[0] < time.monotonic():
+            self._drop(key)
+            self.stats.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.stats.hits += 1
+        return entry[1]
+
+    async def set(self, key: str, value: str, model: str = "") -> None:
+        size = len(value.encode())
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._drop(key)
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._bytes += size
+        self.stats.stores += 1
+        self.stats.bytes_stored += size
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            self._drop(next(iter(self._entries)))
+            self.stats.evictions += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "backend": self.name,
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            **self.stats.snapshot(),
+        }
+
+
+class SQLCache:
+    """Cache stored in the ai_cache table, shared by every app worker.
+
+    Uses the sync engine from a worker thread so lookups never block the loop.
+    """
+
+    name = "sql"
+    purge_every = 100
+
+    def __init__(self, ttl: float) -> None:
+        self.ttl = ttl
+        self.stats = CacheStats()
+        self._sets = 0
+
+    def _get(self, key: str) -> Optional[str]:
+        from .database import SessionLocal
+        from .models import AICacheEntry
+
+        with SessionLocal() as db:
+            return db.scalar(
+                select(AICacheEntry.value).where(
+                    AICacheEntry.key == key,
+                    AICacheEntry.expires_at > datetime.now(timezone.utc),
+                )
+            )
+
+    def _set(self, key: str, model: str, value: str, purge: bool) -> None:
+        from .database import SessionLocal
+        from .models import AICacheEntry
+
+        now = datetime.now(timezone.utc)
+        with SessionLocal() as db:
+            db.merge(
+                AICacheEntry(
+                    key=key,
+                    model=model,
+                    value=value,
+                    size_bytes=len(value.encode()),
+                    created_at=now,
+                    expires_at=now + timedelta(seconds=self.ttl),
+                )
+            )
+            if purge:
+                db.execute(delete(AICacheEntry).where(AICacheEntry.expires_at <= now))
+            db.commit()
+
+    async def get(self, key: str) -> Optional[str]:
+        value = await asyncio.to_thread(self._get, key)
+        if value is None:
+            self.stats.misses += 1
+        else:
+            self.stats.hits += 1
+        return value
+
+    async def set(self, key: str, value: str, model: str = "") -> None:
+        self._sets += 1
+        purge = self._sets % self.purge_every == 0
+        await asyncio.to_thread(self._set, key, model, value, purge)
+        self.stats.stores += 1
+        self.stats.bytes_stored += len(value.encode())
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {"backend": self.name, **self.stats.snapshot()}
+
+
+def cache_from_env():
+    backend = os.getenv("AI_CACHE_BACKEND", "memory").lower()
+    ttl = float(os.getenv("AI_CACHE_TTL_SECONDS", "86400"))
+    if backend == "none":
+        return None
+    if backend == "sql":
+        return SQLCache(ttl=ttl)
+    if backend == "memory":
+        return MemoryCache(
+            ttl=ttl,
+            max_entries=int(os.getenv("AI_CACHE_MAX_ENTRIES", "1000")),
+            max_bytes=int(os.getenv("AI_CACHE_MAX_BYTES", str(64 * 1024 * 1024))),
+        )
+    raise ValueError(f"Unknown AI_CACHE_BACKEND: {backend!r}")
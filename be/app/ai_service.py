@@ -1,14 +1,29 @@
 from __future__ import annotations
-from typing import List
+from collections import Counter, deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from functools import lru_cache
+from datetime import datetime, timedelta, timezone
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple
+import asyncio
+import logging
 import os
+import random
+import re
+import time
 from dotenv import load_dotenv
-from pydantic import BaseModel
+from pydantic import BaseModel, create_model
 
-# Use the same client/structure as example.py
-from google import genai
+from .ai_cache import cache_from_env, cache_key, normalize_input
+from .llm_backends import LLMBackend, LLMResponse, backend_from_env
+from .metrics import Histogram
+from .tokens import estimate_tokens, fit_to_budget, split_into_chunks
+from .streaming import ArrayItemParser
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 
 class RoadmapWeek(BaseModel):
     week: int
@@ -35,15 +50,637 @@ class QuizData(BaseModel):
     questions: List[AIQuestion]
 
 
-class AIService:
+@lru_cache(maxsize=None)
+def quiz_batch_schema(size: int) -> type:
+    """``{"quiz_1": QuizData, ..., "quiz_<size>": QuizData}``.
+
+    Named required fields, rather than a list, make structured output return
+    exactly one quiz per requested spec.
+    """
+    fields = {f"quiz_{n}": (QuizData, ...) for n in range(1, size + 1)}
+    return create_model(f"QuizBatch{size}", **fields)
+
+
+class AITimeoutError(Exception):
+    """Raised when a model call does not finish within its per-call timeout."""
+
+
+class AIUnavailableError(Exception):
+    """Raised when a model keeps failing transiently after every retry."""
+
+
+class AIBudgetExceededError(Exception):
+    """Raised when a user has spent their daily token allowance."""
+
+    def __init__(self, message: str, retry_after: int) -> None:
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+# Attempt outcomes worth retrying; anything else is a bug or a bad request
+RETRYABLE = {"timeout", "throttled", "server_error", "network"}
+
+
+def classify_error(exc: BaseException) -> str:
+    if isinstance(exc, AITimeoutError):
+        return "timeout"
+    # google.genai.errors.APIError and StubAPIError carry the HTTP status
+    code = getattr(exc, "code", None)
+    if code == 429:
+        return "throttled"
+    if code in (500, 502, 503, 504):
+        return "server_error"
+    if isinstance(exc, OSError):
+        return "network"
+    if type(exc).__module__.split(".")[0] in ("httpx", "httpcore", "aiohttp"):
+        return "network"
+    return "error"
+
+
+@dataclass(frozen=True)
+class ResiliencePolicy:
+    """How one AIService method retries, hedges and falls back."""
+
+    max_attempts: int = 3
+    base_delay: float = 0.5
+    max_delay: float = 8.0
+    # Wall-clock budget across every attempt, hedge and backoff sleep
+    deadline: float = 60.0
+    # Fire a second identical request once the first outlives this quantile
+    # of the model's recent latencies
+    hedge_quantile: Optional[float] = None
+    # Model to switch to when the requested one answers 429
+    fallback_model: Optional[str] = None
+
+    def backoff(self, attempt: int) -> float:
+        delay = min(self.base_delay * 2 ** (attempt - 1), self.max_delay)
+        return random.uniform(delay / 2, delay)
+
+
+def _env_flag(name: str, default: str) -> bool:
+    return os.getenv(name, default).lower() in ("1", "true", "yes")
+
+
+class ModelGate:
+    """Bounds concurrent calls to one model and tracks its queue."""
+
+    # Hedging waits for this many latency samples before trusting a quantile
+    min_samples = 20
+
+    def __init__(self, model: str, limit: int, timeout: float) -> None:
+        self.model = model
+        self.limit = limit
+        self.timeout = timeout
+        self.semaphore = asyncio.Semaphore(limit)
+        self.waiting = 0
+        self.max_waiting = 0
+        self.in_flight = 0
+        self.completed = 0
+        self.failed = 0
+        self.timeouts = 0
+        self.queue_timeouts = 0  # gave up waiting for a free slot
+        self.latencies: deque = deque(maxlen=256)
+
+    def quantile(self, q: float) -> Optional[float]:
+        if len(self.latencies) < self.min_samples:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+    def snapshot(self) -> Dict[str, Any]:
+        p95 = self.quantile(0.95)
+        return {
+            "limit": self.limit,
+            "timeout_seconds": self.timeout,
+            "waiting": self.waiting,
+            "max_waiting": self.max_waiting,
+            "in_flight": self.in_flight,
+            "completed": self.completed,
+            "failed": self.failed,
+            "timeouts": self.timeouts,
+            "queue_timeouts": self.queue_timeouts,
+            "p95_seconds": round(p95, 3) if p95 is not None else None,
+        }
+
+
+class AttemptStats:
+    """Per-attempt outcomes for each (method, model)."""
+
     def __init__(self) -> None:
-        # API key is read from environment by the client
-        self.client = genai.Client()
+        self.outcomes: Dict[str, Counter] = {}
+        self.hedges = Counter()
+        self.hedge_wins = Counter()
+        self.fallbacks = Counter()
+
+    def record(self, method: str, model: str, outcome: str) -> None:
+        self.outcomes.setdefault(f"{method}:{model}", Counter())[outcome] += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "outcomes": {key: dict(c) for key, c in self.outcomes.items()},
+            "hedges": dict(self.hedges),
+            "hedge_wins": dict(self.hedge_wins),
+            "fallbacks": dict(self.fallbacks),
+        }
+
+
+TOKEN_BUCKETS = (100, 250, 500, 1000, 2000, 4000, 8000, 16000, 32000, 64000, 128000)
+
+
+class CallStats:
+    def __init__(self) -> None:
+        self.calls = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.estimated_calls = 0  # no usage metadata; counted from characters
+        self.latency = Histogram()
+        self.prompt_tokens = Histogram(TOKEN_BUCKETS)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "input_tokens": self.input_tokens,
+            "output_tokens": self.output_tokens,
+            "estimated_calls": self.estimated_calls,
+            "latency_seconds": self.latency.snapshot(),
+            "prompt_tokens": self.prompt_tokens.snapshot(),
+        }
+
+
+class TokenStats:
+    """Token usage and latency of successful calls per (method, model)."""
+
+    def __init__(self) -> None:
+        self.calls: Dict[str, CallStats] = {}
+        self.truncations = Counter()
+
+    def record(
+        self, method: str, model: str, contents: str, response: LLMResponse, took: float
+    ) -> Tuple[int, int]:
+        stats = self.calls.setdefault(f"{method}:{model}", CallStats())
+        input_tokens = response.input_tokens
+        output_tokens = response.output_tokens
+        if input_tokens is None or output_tokens is None:
+            stats.estimated_calls += 1
+            if input_tokens is None:
+                input_tokens = estimate_tokens(contents)
+            if output_tokens is None:
+                output_tokens = estimate_tokens(response.text or "")
+        stats.calls += 1
+        stats.input_tokens += input_tokens
+        stats.output_tokens += output_tokens
+        stats.latency.observe(took)
+        stats.prompt_tokens.observe(input_tokens)
+        return input_tokens, output_tokens
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "calls": {key: stats.snapshot() for key, stats in self.calls.items()},
+            "truncations": dict(self.truncations),
+        }
+
+
+class TokenBudget:
+    """Daily (UTC) token allowance per user.
+
+    Counted in this process only, like the auth user cache; with several app
+    workers each enforces the limit on its own share of the traffic.
+    """
+
+    def __init__(self, daily_limit: int) -> None:
+        self.daily_limit = daily_limit
+        self._used: Dict[int, Tuple[Any, int]] = {}
+        self.rejections = 0
+
+    def _used_today(self, user_id: int) -> int:
+        day, used = self._used.get(user_id, (None, 0))
+        return used if day == datetime.now(timezone.utc).date() else 0
+
+    def check(self, user_id: Optional[int], tokens: int) -> None:
+        if self.daily_limit <= 0 or user_id is None:
+            return
+        if self._used_today(user_id) + tokens > self.daily_limit:
+            self.rejections += 1
+            now = datetime.now(timezone.utc)
+            midnight = datetime.combine(
+                now.date() + timedelta(days=1), datetime.min.time(), timezone.utc
+            )
+            raise AIBudgetExceededError(
+                f"Daily AI token budget of {self.daily_limit} is used up",
+                retry_after=int((midnight - now).total_seconds()) + 1,
+            )
+
+    def charge(self, user_id: Optional[int], tokens: int) -> None:
+        if self.daily_limit <= 0 or user_id is None:
+            return
+        today = datetime.now(timezone.utc).date()
+        self._used[user_id] = (today, self._used_today(user_id) + tokens)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "daily_limit": self.daily_limit,
+            "users_tracked": len(self._used),
+            "rejections": self.rejections,
+        }
+
+
+class SingleFlight:
+    """Lets concurrent callers with the same key share one in-flight call."""
+
+    def __init__(self) -> None:
+        self._calls: Dict[str, asyncio.Future] = {}
+        self._waiters: Dict[str, int] = {}
+        self.leaders = 0
+        self.followers = 0
+        self.max_waiters = 0
+
+    async def do(self, key: str, call) -> Any:
+        task = self._calls.get(key)
+        if task is None:
+            self.leaders += 1
+            task = asyncio.ensure_future(call())
+            self._calls[key] = task
+            self._waiters[key] = 1
+            task.add_done_callback(lambda done: self._finish(key, done))
+        else:
+            self.followers += 1
+            self._waiters[key] += 1
+            self.max_waiters = max(self.max_waiters, self._waiters[key])
+        # shield: one caller disconnecting must not cancel the shared call
+        return await asyncio.shield(task)
+
+    def _finish(self, key: str, task: asyncio.Future) -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
+            del self._waiters[key]
+        if not task.cancelled():
+            task.exception()  # mark retrieved even if every waiter went away
+
+    def snapshot(self) -> Dict[str, Any]:
+        calls = self.leaders + self.followers
+        return {
+            "upstream_calls": self.leaders,
+            "coalesced_waiters": self.followers,
+            "coalescing_ratio": round(self.followers / calls, 4) if calls else 0.0,
+            "in_flight_keys": len(self._calls),
+            "current_waiters": sum(self._waiters.values()),
+            "max_waiters": self.max_waiters,
+        }
+
+
+class AIService:
+    def __init__(self, backend: Optional[LLMBackend] = None) -> None:
         self.flash_model_name = "gemini-2.5-flash-lite"
         self.pro_model_name = "gemini-2.5-pro"
+        self.backend = backend or backend_from_env(
+            self.pro_model_name, self.flash_model_name
+        )
+        self._gates = {
+            self.pro_model_name: ModelGate(
+                self.pro_model_name,
+                int(os.getenv("AI_PRO_CONCURRENCY", "4")),
+                float(os.getenv("AI_PRO_TIMEOUT_SECONDS", "120")),
+            ),
+            self.flash_model_name: ModelGate(
+                self.flash_model_name,
+                int(os.getenv("AI_FLASH_CONCURRENCY", "16")),
+                float(os.getenv("AI_FLASH_TIMEOUT_SECONDS", "30")),
+            ),
+        }
+        self.cache = cache_from_env()
+        # Quiz specs answered per model call by generate_quiz_batch
+        self.quiz_batch_size = int(os.getenv("AI_QUIZ_BATCH_SIZE", "4"))
+        self._single_flight = (
+            SingleFlight()
+            if _env_flag("AI_SINGLE_FLIGHT", "true")
+            else None
+        )
+        self.attempts = AttemptStats()
+        self.policies = self._policies_from_env()
+        self.tokens = TokenStats()
+        self.budget = TokenBudget(int(os.getenv("AI_USER_DAILY_TOKEN_BUDGET", "0")))
+        # Prompts are trimmed to these before sending; see _fit
+        self.input_budgets = {
+            method: int(os.getenv(f"AI_{method.upper()}_INPUT_TOKEN_BUDGET", default))
+            for method, default in (
+                ("roadmap", "2000"),
+                ("quiz", "4000"),
+                ("quiz_batch", "6000"),
+                ("video_summary", "8000"),
+                ("answer", "8000"),
+                ("context_chunk", "4000"),
+            )
+        }
+        # Long contexts are map-reduced in chunks of this many tokens, with at
+        # most AI_MAP_CONCURRENCY chunk summaries in flight per request
+        self.chunk_tokens = int(os.getenv("AI_CONTEXT_CHUNK_TOKENS", "3000"))
+        self.map_concurrency = int(os.getenv("AI_MAP_CONCURRENCY", "4"))
 
-    async def generate_roadmap(self, topic: str, details: str = "") -> LearningRoadmap:
-        contents = (
+    def _policies_from_env(self) -> Dict[str, ResiliencePolicy]:
+        retry = dict(
+            max_attempts=int(os.getenv("AI_RETRY_MAX_ATTEMPTS", "3")),
+            base_delay=float(os.getenv("AI_RETRY_BASE_SECONDS", "0.5")),
+            max_delay=float(os.getenv("AI_RETRY_MAX_SECONDS", "8")),
+        )
+        # Hedging a two-minute pro generation doubles its cost, so only the
+        # short flash calls hedge by default
+        hedge = float(os.getenv("AI_HEDGE_QUANTILE", "0.95"))
+        flash_hedge = hedge if _env_flag("AI_HEDGE", "true") else None
+        fallback = (
+            self.flash_model_name if _env_flag("AI_PRO_FALLBACK", "true") else None
+        )
+        pro_deadline = float(os.getenv("AI_PRO_DEADLINE_SECONDS", "240"))
+        flash_deadline = float(os.getenv("AI_FLASH_DEADLINE_SECONDS", "60"))
+        return {
+            "roadmap": ResiliencePolicy(
+                deadline=pro_deadline, fallback_model=fallback, **retry
+            ),
+            "quiz": ResiliencePolicy(
+                deadline=flash_deadline, hedge_quantile=flash_hedge, **retry
+            ),
+            "quiz_batch": ResiliencePolicy(
+                deadline=flash_deadline, hedge_quantile=flash_hedge, **retry
+            ),
+            "video_summary": ResiliencePolicy(
+                deadline=flash_deadline, hedge_quantile=flash_hedge, **retry
+            ),
+            "answer": ResiliencePolicy(
+                deadline=flash_deadline, hedge_quantile=flash_hedge, **retry
+            ),
+            "context_chunk": ResiliencePolicy(
+                deadline=flash_deadline, hedge_quantile=flash_hedge, **retry
+            ),
+        }
+
+    @asynccontextmanager
+    async def _slot(self, model: str, timeout: float):
+        # The gate keeps a burst on one model from piling up upstream. Waiting
+        # for it is bounded too, so a queued call still times out and the
+        # retry, hedge and fallback policy gets to act on it.
+        gate = self._gates[model]
+        gate.waiting += 1
+        gate.max_waiting = max(gate.max_waiting, gate.waiting)
+        try:
+            await asyncio.wait_for(gate.semaphore.acquire(), timeout=timeout)
+        except asyncio.TimeoutError:
+            gate.queue_timeouts += 1
+            raise AITimeoutError(
+                f"{model} had no free slot within {timeout:g}s"
+            ) from None
+        finally:
+            gate.waiting -= 1
+
+        gate.in_flight += 1
+        try:
+            yield gate
+        finally:
+            gate.in_flight -= 1
+            gate.semaphore.release()
+
+    async def _generate(
+        self,
+        model: str,
+        contents: str,
+        config: Optional[dict] = None,
+        timeout: Optional[float] = None,
+    ) -> Any:
+        gate = self._gates[model]
+        limit = gate.timeout if timeout is None else min(timeout, gate.timeout)
+        queued = time.perf_counter()
+        async with self._slot(model, limit):
+            started = time.perf_counter()
+            # Time spent queued for the slot comes out of the same limit
+            remaining = limit - (started - queued)
+            try:
+                response = await asyncio.wait_for(
+                    self.backend.generate(model, contents, config),
+                    timeout=remaining,
+                )
+            except asyncio.TimeoutError:
+                gate.timeouts += 1
+                raise AITimeoutError(
+                    f"{model} did not respond within {limit:g}s"
+                ) from None
+            except Exception:
+                gate.failed += 1
+                raise
+            gate.completed += 1
+            gate.latencies.append(time.perf_counter() - started)
+            return response
+
+    async def _attempt(
+        self,
+        method: str,
+        model: str,
+        contents: str,
+        config: Optional[dict],
+        timeout: float,
+        hedge: bool = False,
+    ) -> Any:
+        started = time.perf_counter()
+        try:
+            response = await self._generate(model, contents, config, timeout)
+        except asyncio.CancelledError:
+            self.attempts.record(method, model, "cancelled")
+            raise
+        except Exception as exc:
+            self.attempts.record(method, model, classify_error(exc))
+            raise
+        self.attempts.record(method, model, "hedge_ok" if hedge else "ok")
+        self.tokens.record(
+            method, model, contents, response, time.perf_counter() - started
+        )
+        return response
+
+    async def _hedged(
+        self,
+        method: str,
+        model: str,
+        contents: str,
+        config: Optional[dict],
+        timeout: float,
+        policy: ResiliencePolicy,
+    ) -> Any:
+        """One logical attempt, duplicated if it runs past the hedge delay."""
+        primary = asyncio.ensure_future(
+            self._attempt(method, model, contents, config, timeout)
+        )
+        delay = None
+        if policy.hedge_quantile is not None:
+            delay = self._gates[model].quantile(policy.hedge_quantile)
+        if delay is None or delay >= timeout:
+            return await primary
+
+        pending = {primary}
+        try:
+            done, _ = await asyncio.wait(pending, timeout=delay)
+            if not done:
+                self.attempts.hedges[model] += 1
+                hedge = asyncio.ensure_future(
+                    self._attempt(
+                        method, model, contents, config, timeout - delay, hedge=True
+                    )
+                )
+                pending.add(hedge)
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.exception() is None:
+                        if task is not primary:
+                            self.attempts.hedge_wins[model] += 1
+                        return task.result()
+                    error = error or task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def _call(
+        self,
+        method: str,
+        model: str,
+        contents: str,
+        config: Optional[dict] = None,
+    ) -> tuple:
+        """Run ``method``'s policy; returns (response, model that answered)."""
+        policy = self.policies[method]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + policy.deadline
+        current = model
+        attempt = 0
+        while True:
+            attempt += 1
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                raise AITimeoutError(
+                    f"{method} exceeded its {policy.deadline:g}s budget"
+                )
+            try:
+                response = await self._hedged(
+                    method, current, contents, config, remaining, policy
+                )
+                return response, current
+            except Exception as exc:
+                outcome = classify_error(exc)
+                if outcome not in RETRYABLE:
+                    raise
+                if attempt >= policy.max_attempts:
+                    if outcome == "timeout":
+                        raise
+                    raise AIUnavailableError(
+                        f"{method} failed after {attempt} attempts: {exc}"
+                    ) from exc
+                logger.info(
+                    "%s attempt %s on %s: %s", method, attempt, current, outcome
+                )
+                if (
+                    outcome == "throttled"
+                    and policy.fallback_model
+                    and current != policy.fallback_model
+                ):
+                    # Throttled pro capacity: degrade now instead of waiting
+                    self.attempts.fallbacks[f"{current}->{policy.fallback_model}"] += 1
+                    current = policy.fallback_model
+                    continue
+                pause = policy.backoff(attempt)
+                if loop.time() + pause >= deadline:
+                    raise AIUnavailableError(
+                        f"{method} has no budget left to retry: {exc}"
+                    ) from exc
+                await asyncio.sleep(pause)
+
+    async def _complete(
+        self,
+        method: str,
+        model: str,
+        contents: str,
+        schema: Optional[type] = None,
+        cache: bool = False,
+        fresh: bool = False,
+        user_id: Optional[int] = None,
+    ) -> Any:
+        """Run one generation; validated ``schema`` instance or plain text.
+
+        With ``cache`` the result is content-addressed on (model, prompt,
+        schema); ``fresh`` skips the lookup but still refreshes the entry.
+        Upstream calls are charged to ``user_id``'s daily token budget, as
+        is every caller that shares an in-flight call (single-flight).
+        """
+        config = None
+        if schema is not None:
+            config = {
+                "response_mime_type": "application/json",
+                "response_schema": schema,
+            }
+
+        key = cache_key(model, contents, schema)
+        use_cache = cache and self.cache is not None
+        if use_cache and not fresh:
+            cached = await self.cache.get(key)
+            if cached is not None:
+                return schema.model_validate_json(cached) if schema else cached
+
+        self.budget.check(user_id, estimate_tokens(contents))
+
+        async def call() -> Tuple[str, int]:
+            response, answered_by = await self._call(method, model, contents, config)
+            text = response.text or ""
+            used = (response.input_tokens or estimate_tokens(contents)) + (
+                response.output_tokens or estimate_tokens(text)
+            )
+            # Validate before caching so a malformed payload is never replayed
+            if schema is not None:
+                schema.model_validate_json(text)
+            # A fallback model's answer must not be served as the primary's
+            if use_cache and answered_by == model:
+                await self.cache.set(key, text, model=model)
+            return text, used
+
+        # Identical prompts already in flight share one upstream call; every
+        # waiter validates its own copy of the payload and is charged the
+        # call's tokens, so riding on someone else's call is not free.
+        if self._single_flight is not None:
+            text, used = await self._single_flight.do(key, call)
+        else:
+            text, used = await call()
+        self.budget.charge(user_id, used)
+        return schema.model_validate_json(text) if schema else text
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "backend": self.backend.name,
+            "models": {model: gate.snapshot() for model, gate in self._gates.items()},
+            "attempts": self.attempts.snapshot(),
+            "tokens": self.tokens.snapshot(),
+            "budget": self.budget.snapshot(),
+            "cache": self.cache.snapshot() if self.cache is not None else None,
+            "single_flight": (
+                self._single_flight.snapshot()
+                if self._single_flight is not None
+                else None
+            ),
+        }
+
+    def _fit(self, method: str, text: str, prompt_without_text: str) -> str:
+        """Trim the variable part of a prompt to the method's input budget."""
+        room = self.input_budgets[method] - estimate_tokens(prompt_without_text)
+        fitted = fit_to_budget(text, room)
+        if fitted != text:
+            self.tokens.truncations[method] += 1
+        return fitted
+
+    def _roadmap_prompt(self, topic: str, details: str = "") -> str:
+        topic = normalize_input(topic)
+        details = self._fit(
+            "roadmap", normalize_input(details), self._roadmap_template(topic, "")
+        )
+        return self._roadmap_template(topic, details)
+
+    def _roadmap_template(self, topic: str, details: str) -> str:
+        return (
             "Hey Chat, I want you to act like a professional mentor and generate a structured 6-month (24-week) learning roadmap for me.\n"
             "🔹 Goal: I want to learn [SUBJECT/GOAL] in 6 months (24 weeks).\n"
             "Guidelines:\n"
@@ -59,15 +696,126 @@ class AIService:
             "Return a strict JSON object matching the provided schema.\n"
             f"Subject/goal: {topic}. Additional details: {details}"
         )
-        response = self.client.models.generate_content(
-            model=self.pro_model_name,
-            contents=contents,
-            config={
-                "response_mime_type": "application/json",
-                "response_schema": LearningRoadmap,
-            },
+
+    async def generate_roadmap(
+        self,
+        topic: str,
+        details: str = "",
+        fresh: bool = False,
+        user_id: Optional[int] = None,
+    ) -> LearningRoadmap:
+        contents = self._roadmap_prompt(topic, details)
+        return await self._complete(
+            "roadmap",
+            self.pro_model_name,
+            contents,
+            LearningRoadmap,
+            cache=True,
+            fresh=fresh,
+            user_id=user_id,
         )
-        return LearningRoadmap.model_validate_json(response.text)
+
+    async def stream_roadmap(
+        self,
+        topic: str,
+        details: str = "",
+        fresh: bool = False,
+        user_id: Optional[int] = None,
+    ) -> AsyncIterator[RoadmapWeek]:
+        """Yield each roadmap week as soon as the model has finished it.
+
+        Unlike generate_roadmap there is no retry, hedge, fallback or
+        single-flight: a failed stream raises and the caller starts over.
+        The upstream stream is read into a buffer by its own task, so the
+        model's gate slot is released as soon as the model finishes, however
+        slowly the caller consumes the weeks.
+        """
+        model = self.pro_model_name
+        contents = self._roadmap_prompt(topic, details)
+        key = cache_key(model, contents, LearningRoadmap)
+        if self.cache is not None and not fresh:
+            cached = await self.cache.get(key)
+            if cached is not None:
+                for week in LearningRoadmap.model_validate_json(cached).weeks:
+                    yield week
+                return
+
+        self.budget.check(user_id, estimate_tokens(contents))
+        parser = ArrayItemParser()
+        chunks: List[str] = []
+        weeks: asyncio.Queue = asyncio.Queue()
+        end = object()
+        started = time.perf_counter()
+
+        async def read_upstream() -> None:
+            gate = self._gates[model]
+            loop = asyncio.get_running_loop()
+            # The timeout bounds waiting for a slot and the whole stream
+            deadline = loop.time() + gate.timeout
+            try:
+                async with self._slot(model, gate.timeout):
+                    stream = self.backend.stream(
+                        model,
+                        contents,
+                        {
+                            "response_mime_type": "application/json",
+                            "response_schema": LearningRoadmap,
+                        },
+                    )
+                    try:
+                        while True:
+                            remaining = deadline - loop.time()
+                            if remaining <= 0:
+                                raise asyncio.TimeoutError
+                            try:
+                                text = await asyncio.wait_for(
+                                    stream.__anext__(), timeout=remaining
+                                )
+                            except StopAsyncIteration:
+                                break
+                            chunks.append(text)
+                            for item in parser.feed(text):
+                                weeks.put_nowait(RoadmapWeek.model_validate(item))
+                    except asyncio.TimeoutError:
+                        gate.timeouts += 1
+                        raise AITimeoutError(
+                            f"{model} did not finish streaming within "
+                            f"{gate.timeout:g}s"
+                        ) from None
+                    except Exception:
+                        gate.failed += 1
+                        raise
+                    finally:
+                        await stream.aclose()
+                    gate.completed += 1
+            finally:
+                weeks.put_nowait(end)
+
+        reader = asyncio.ensure_future(read_upstream())
+        try:
+            while True:
+                week = await weeks.get()
+                if week is end:
+                    break
+                yield week
+            await reader  # raises whatever ended the stream early
+        finally:
+            # The caller went away: stop reading upstream
+            reader.cancel()
+
+        full = "".join(chunks)
+        # Streamed chunks carry no usage metadata, so these are estimates
+        used = self.tokens.record(
+            "roadmap_stream",
+            model,
+            contents,
+            LLMResponse(text=full),
+            time.perf_counter() - started,
+        )
+        self.budget.charge(user_id, sum(used))
+        LearningRoadmap.model_validate_json(full)
+        if self.cache is not None:
+            await self.cache.set(key, full, model=model)
 
     async def generate_quiz(
         self,
@@ -76,52 +824,188 @@ class AIService:
         plan_context: str = "",
         week_start: int = 1,
         week_end: int = 24,
+        fresh: bool = False,
+        user_id: Optional[int] = None,
     ) -> QuizData:
+        topic = normalize_input(topic)
+
+        def prompt(context: str) -> str:
+            return (
+                f"Create a short quiz with exactly 5 real-world multiple-choice questions on '{topic}' at {difficulty} difficulty.\n"
+                f"Focus ONLY on material from weeks {week_start} to {week_end} in the plan summary below.\n"
+                "Each question must have EXACTLY 4 options (A–D) and provide 'correct_answer' as a 0-based index.\n"
+                "Do not include more than 4 options. Do not include explanations in the JSON.\n"
+                "Plan context (condensed):\n" + context + "\n\n"
+                "After generating the JSON for questions, also provide a short bullet list (outside JSON) of 3–5 highly relevant YouTube video URLs that match the same scope, so the app can surface them in the player."
+            )
+
+        contents = prompt(self._fit("quiz", plan_context, prompt("")))
+        return await self._complete(
+            "quiz",
+            self.flash_model_name,
+            contents,
+            QuizData,
+            cache=True,
+            fresh=fresh,
+            user_id=user_id,
+        )
+
+    async def generate_quiz_batch(
+        self,
+        specs: Sequence[Any],
+        plan_context: str = "",
+        fresh: bool = False,
+        user_id: Optional[int] = None,
+    ) -> List[QuizData]:
+        """One quiz per spec (anything with topic, difficulty, week_start and
+        week_end, e.g. QuizCreate), in order.
+
+        Specs share one preamble and plan context per model call; batches of
+        ``quiz_batch_size`` specs run concurrently.
+        """
+        size = max(self.quiz_batch_size, 1)
+        chunks = [specs[i : i + size] for i in range(0, len(specs), size)]
+        results = await asyncio.gather(
+            *(
+                self._quiz_chunk(chunk, plan_context, fresh, user_id)
+                for chunk in chunks
+            )
+        )
+        return [quiz for chunk in results for quiz in chunk]
+
+    async def _quiz_chunk(
+        self,
+        specs: Sequence[Any],
+        plan_context: str,
+        fresh: bool,
+        user_id: Optional[int],
+    ) -> List[QuizData]:
+        listing = "\n".join(
+            f"quiz_{n}: '{normalize_input(spec.topic)}' at {spec.difficulty} difficulty, "
+            f"weeks {spec.week_start} to {spec.week_end}"
+            for n, spec in enumerate(specs, 1)
+        )
+
+        def prompt(context: str) -> str:
+            return (
+                f"Create {len(specs)} separate short quizzes, one per spec below.\n"
+                "Each quiz has exactly 5 real-world multiple-choice questions on its topic at its difficulty, and covers ONLY material from its weeks in the plan summary.\n"
+                "Each question must have EXACTLY 4 options (A–D) and provide 'correct_answer' as a 0-based index.\n"
+                "Do not include more than 4 options. Do not include explanations in the JSON.\n"
+                "Specs:\n" + listing + "\n"
+                "Plan context (condensed):\n" + context
+            )
+
+        schema = quiz_batch_schema(len(specs))
+        contents = prompt(self._fit("quiz_batch", plan_context, prompt("")))
+        batch = await self._complete(
+            "quiz_batch",
+            self.flash_model_name,
+            contents,
+            schema,
+            cache=True,
+            fresh=fresh,
+            user_id=user_id,
+        )
+        return [getattr(batch, f"quiz_{n}") for n in range(1, len(specs) + 1)]
+
+    async def _summarize_chunk(self, chunk: str, user_id: Optional[int]) -> str:
+        # No title or question in the prompt: the cached summary of a chunk
+        # is reused by every later summary or question on the same text
         contents = (
-            f"Create a short quiz with exactly 5 real-world multiple-choice questions on '{topic}' at {difficulty} difficulty.\n"
-            f"Focus ONLY on material from weeks {week_start} to {week_end} in the plan summary below.\n"
-            "Each question must have EXACTLY 4 options (A–D) and provide 'correct_answer' as a 0-based index.\n"
-            "Do not include more than 4 options. Do not include explanations in the JSON.\n"
-            "Plan context (condensed):\n" + plan_context + "\n\n"
-            "After generating the JSON for questions, also provide a short bullet list (outside JSON) of 3–5 highly relevant YouTube video URLs that match the same scope, so the app can surface them in the player."
-        )
-        response = self.client.models.generate_content(
-            model=self.flash_model_name,
-            contents=contents,
-            config={
-                "response_mime_type": "application/json",
-                "response_schema": QuizData,
-            },
+            "Summarize this excerpt of a video transcript or description in a few "
+            "dense sentences. Keep names, definitions, numbers and steps.\n"
+            f"Excerpt: {chunk}"
+        )
+        return await self._complete(
+            "context_chunk",
+            self.flash_model_name,
+            contents,
+            cache=True,
+            user_id=user_id,
         )
-        return QuizData.model_validate_json(response.text)
+
+    async def _digest(self, text: str, user_id: Optional[int], depth: int = 0) -> str:
+        """Map-reduce ``text`` into chunk summaries that fit one chunk."""
+        chunks = split_into_chunks(text, self.chunk_tokens)
+        gate = asyncio.Semaphore(self.map_concurrency)
+
+        async def summarize(chunk: str) -> str:
+            async with gate:
+                return await self._summarize_chunk(chunk, user_id)
+
+        summaries = await asyncio.gather(*(summarize(c) for c in chunks))
+        digest = "\n".join(summaries)
+        # Hour-long transcripts can need a second pass over the summaries
+        if (
+            estimate_tokens(digest) > self.chunk_tokens
+            and len(digest) < len(text)
+            and depth < 2
+        ):
+            return await self._digest(digest, user_id, depth + 1)
+        return digest
 
     async def generate_video_summary(
-        self, video_title: str, video_description: str = ""
+        self,
+        video_title: str,
+        video_description: str = "",
+        transcript: str = "",
+        user_id: Optional[int] = None,
     ) -> str:
-        contents = (
-            "Provide a concise summary of this YouTube video.\n"
-            f"Title: {video_title}\n"
-            f"Description: {video_description}"
-        )
-        response = self.client.models.generate_content(
-            model=self.flash_model_name,
-            contents=contents,
+        def prompt(source: str) -> str:
+            return (
+                "Provide a concise summary of this YouTube video.\n"
+                f"Title: {video_title}\n"
+                f"Description: {source}"
+            )
+
+        source = "\n\n".join(part for part in (video_description, transcript) if part)
+        if estimate_tokens(prompt(source)) > self.input_budgets["video_summary"]:
+            source = "Summaries of consecutive sections:\n" + await self._digest(
+                source, user_id
+            )
+        source = self._fit("video_summary", source, prompt(""))
+        return await self._complete(
+            "video_summary",
+            self.flash_model_name,
+            prompt(source),
+            user_id=user_id,
         )
-        return response.text or ""
 
     async def answer_contextual_question(
-        self, question: str, video_context: str
+        self, question: str, video_context: str, user_id: Optional[int] = None
     ) -> str:
-        contents = (
-            "Based on this context, answer the user's question.\n"
-            f"Context: {video_context}\n"
-            f"Question: {question}"
-        )
-        response = self.client.models.generate_content(
-            model=self.flash_model_name,
-            contents=contents,
+        def prompt(context: str) -> str:
+            return (
+                "Based on this context, answer the user's question.\n"
+                f"Context: {context}\n"
+                f"Question: {question}"
+            )
+
+        context = video_context
+        if estimate_tokens(prompt(context)) > self.input_budgets["answer"]:
+            # Whole-video digest (chunk summaries come from the cache after
+            # the first question) plus the excerpt that best matches the
+            # question, verbatim
+            digest = await self._digest(video_context, user_id)
+            excerpt = best_matching_chunk(
+                split_into_chunks(video_context, self.chunk_tokens), question
+            )
+            context = (
+                f"Summary of the full context:\n{digest}\n\n"
+                f"Most relevant excerpt:\n{excerpt}"
+            )
+        context = self._fit("answer", context, prompt(""))
+        return await self._complete(
+            "answer", self.flash_model_name, prompt(context), user_id=user_id
         )
-        return response.text or ""
+
+
+def best_matching_chunk(chunks: List[str], question: str) -> str:
+    words = set(re.findall(r"\w{4,}", question.casefold()))
+    if not chunks:
+        return ""
+    return max(chunks, key=lambda chunk: sum(w in chunk.casefold() for w in words))
 
 
 ai_service = AIService()
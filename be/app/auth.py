@@ -1,13 +1,19 @@
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Dict, Optional, Tuple
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
-from .database import get_db
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from .database import get_async_db
 from .models import User
+import asyncio
 import os
+import time
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -16,9 +22,25 @@ SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-here")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "4"))
+
+# min_rounds makes needs_update() flag hashes made with a lower cost, so they
+# are upgraded on the next successful login.
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS,
+)
 security = HTTPBearer()
 
+# bcrypt releases the GIL while hashing, so a small thread pool runs password
+# work in parallel and keeps it off the event loop.
+_password_executor = ThreadPoolExecutor(
+    max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="password"
+)
+
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
@@ -28,6 +50,24 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
+async def get_password_hash_async(password: str) -> str:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_password_executor, get_password_hash, password)
+
+
+async def verify_and_update_password(
+    plain_password: str, hashed_password: str
+) -> Tuple[bool, Optional[str]]:
+    """Verify off the event loop; also return a new hash if the old is stale."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        _password_executor,
+        pwd_context.verify_and_update,
+        plain_password,
+        hashed_password,
+    )
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
@@ -39,6 +79,12 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     return encoded_jwt
 
 
+def token_claims(user: User) -> dict:
+    # "uid"/"ver" let authenticated requests skip the users lookup; bumping
+    # User.token_version invalidates every token issued before it.
+    return {"sub": user.username, "uid": user.id, "ver": user.token_version or 0}
+
+
 def verify_token(token: str) -> Optional[dict]:
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
@@ -47,27 +93,142 @@ def verify_token(token: str) -> Optional[dict]:
         return None
 
 
-async def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db),
-) -> User:
-    credentials_exception = HTTPException(
+@dataclass(frozen=True)
+class AuthUser:
+    """Detached, read-only snapshot of the authenticated user."""
+
+    id: int
+    username: str
+    email: str
+    name: Optional[str]
+    token_version: int
+
+    @classmethod
+    def from_user(cls, user: User) -> "AuthUser":
+        return cls(
+            id=user.id,
+            username=user.username,
+            email=user.email,
+            name=user.name,
+            token_version=user.token_version or 0,
+        )
+
+
+class UserCache:
+    """In-process TTL + LRU cache of AuthUser keyed on (user id, token version)."""
+
+    def __init__(self, maxsize: int, ttl: float) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: "OrderedDict[Tuple[int, int], Tuple[float, AuthUser]]" = (
+            OrderedDict()
+        )
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Tuple[int, int]) -> Optional[AuthUser]:
+        entry = self._entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            self._entries.pop(key, None)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, user: AuthUser) -> None:
+        key = (user.id, user.token_version)
+        self._entries[key] = (time.monotonic() + self.ttl, user)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def invalidate_user(self, user_id: int) -> None:
+        for key in [k for k in self._entries if k[0] == user_id]:
+            del self._entries[key]
+
+
+user_cache = UserCache(
+    maxsize=int(os.getenv("AUTH_USER_CACHE_SIZE", "1024")),
+    ttl=float(os.getenv("AUTH_USER_CACHE_TTL_SECONDS", "60")),
+)
+
+# Users deleted by this process, so a deleted account's outstanding tokens
+# stop working here immediately; other workers reject them once their cached
+# AuthUser expires (AUTH_USER_CACHE_TTL_SECONDS).
+_revoked_users: Dict[int, float] = {}
+
+
+def invalidate_user(user_id: int, revoke: bool = False) -> None:
+    user_cache.invalidate_user(user_id)
+    if revoke:
+        now = time.time()
+        # Tokens live no longer than ACCESS_TOKEN_EXPIRE_MINUTES
+        horizon = now - ACCESS_TOKEN_EXPIRE_MINUTES * 60
+        for stale in [uid for uid, at in _revoked_users.items() if at < horizon]:
+            del _revoked_users[stale]
+        _revoked_users[user_id] = now
+
+
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
 
-    token = credentials.credentials
-    payload = verify_token(token)
-    if payload is None:
-        raise credentials_exception
 
-    username: str = payload.get("sub")
-    if username is None:
-        raise credentials_exception
+def _decode_credentials(credentials: HTTPAuthorizationCredentials) -> dict:
+    payload = verify_token(credentials.credentials)
+    if payload is None or payload.get("sub") is None:
+        raise _credentials_exception()
+    if payload.get("uid") in _revoked_users:
+        raise _credentials_exception()
+    return payload
+
 
-    user = db.query(User).filter(User.username == username).first()
-    if user is None:
-        raise credentials_exception
+async def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: AsyncSession = Depends(get_async_db),
+) -> AuthUser:
+    payload = _decode_credentials(credentials)
+    user_id = payload.get("uid")
+    version = payload.get("ver", 0)
+
+    if user_id is not None:
+        cached = user_cache.get((user_id, version))
+        if cached is not None:
+            return cached
+        user = await db.get(User, user_id)
+    else:
+        # Tokens issued before uid/ver claims existed
+        user = await db.scalar(select(User).where(User.username == payload["sub"]))
 
-    return user
+    if user is None or user.deleted_at is not None:  # disabled, pending purge
+        raise _credentials_exception()
+    if user_id is not None and (user.token_version or 0) != version:
+        raise _credentials_exception()
+
+    auth_user = AuthUser.from_user(user)
+    user_cache.put(auth_user)
+    return auth_user
+
+
+async def get_current_user_id(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: AsyncSession = Depends(get_async_db),
+) -> int:
+    """Resolve the caller's user id, loading the user at most once per TTL.
+
+    A token whose (uid, ver) is in the user cache is accepted without a
+    query. Otherwise get_current_user loads the user row, once per user per
+    AUTH_USER_CACHE_TTL_SECONDS, and refuses disabled (``deleted_at`` set)
+    or deleted accounts and older token versions. Accounts this process
+    disabled are refused at once; other processes refuse them when their
+    cached entry expires.
+    """
+    payload = _decode_credentials(credentials)
+    user_id = payload.get("uid")
+    if user_id is not None and user_cache.get((user_id, payload.get("ver", 0))):
+        return user_id
+    return (await get_current_user(credentials, db)).id
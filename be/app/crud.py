@@ -0,0 +1,331 @@
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional
+import os
+from sqlalchemy import and_, delete, func, insert, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .database import upsert_insert
+from .models import LearningGoal, Progress, Quiz, Task, Schedule
+from .rollups import tasks_completion_changed, tasks_created, tasks_deleted
+from .schemas import LearningRoadmap, RoadmapWeek
+from .task_sources import (
+    ROADMAP_SOURCE,
+    counted_tasks,
+    pending_source,
+    pending_tasks,
+    roadmap_task_filter,
+)
+from .tokens import CHARS_PER_TOKEN
+
+# Staged rows older than this belong to a stream that died without cleaning up
+ROADMAP_STAGE_TTL = timedelta(hours=1)
+
+# Quiz prompts carry only the requested weeks' summaries, within this budget
+PLAN_CONTEXT_TOKEN_BUDGET = int(os.getenv("PLAN_CONTEXT_TOKEN_BUDGET", "1500"))
+WEEK_TASK_CHARS = 120
+MIN_WEEK_CHARS = 80
+
+
+def roadmap_task_rows(
+    user_id: int, weeks: Iterable[RoadmapWeek], source: str = ROADMAP_SOURCE
+) -> List[dict]:
+    rows = []
+    # Support dicts or Pydantic objects
+    for week_data in weeks:
+        for task_data in week_data.tasks:
+            if isinstance(task_data, dict):
+                title = task_data.get("description", "")
+                quadrant = task_data.get("quadrant") or "Q2"
+            else:
+                title = getattr(task_data, "description", "")
+                quadrant = getattr(task_data, "quadrant", None) or "Q2"
+            rows.append(
+                {
+                    "user_id": user_id,
+                    "title": title,
+                    "quadrant": quadrant,
+                    "week": week_data.week,
+                    "completed": False,
+                    "source": source,
+                }
+            )
+    return rows
+
+
+async def detach_schedules(db: AsyncSession, user_id: int, criterion) -> None:
+    """Unlink schedule rows from the user's tasks matching ``criterion``."""
+    matching = select(Task.id).where(Task.user_id == user_id, criterion)
+    await db.execute(
+        update(Schedule)
+        .where(Schedule.user_id == user_id, Schedule.task_id.in_(matching))
+        .values(task_id=None)
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def delete_tasks_where(db: AsyncSession, user_id: int, criterion) -> None:
+    """Delete a user's tasks matching ``criterion``, detaching schedule rows."""
+    await detach_schedules(db, user_id, criterion)
+    await db.execute(
+        delete(Task)
+        .where(Task.user_id == user_id, criterion)
+        .execution_options(synchronize_session=False)
+    )
+
+
+# What the rollup hooks read from a task, returned by set-based writes
+TASK_ROLLUP_COLUMNS = (
+    Task.id,
+    Task.week,
+    Task.completed,
+    Task.completed_at,
+    Task.updated_at,
+    Task.created_at,
+)
+
+
+async def insert_task_rows(db: AsyncSession, rows: List[dict]) -> List[int]:
+    # A single executemany with RETURNING, which SQLAlchemy sends as batched
+    # multi-row VALUES statements.
+    if not rows:
+        return []
+    result = await db.execute(insert(Task).returning(Task.id), rows)
+    return list(result.scalars())
+
+
+async def _delete_task_rows(db: AsyncSession, user_id: int, criterion) -> List:
+    """Delete a user's tasks matching ``criterion``; returns their old state."""
+    await detach_schedules(db, user_id, criterion)
+    result = await db.execute(
+        delete(Task)
+        .where(Task.user_id == user_id, criterion)
+        .returning(*TASK_ROLLUP_COLUMNS)
+        .execution_options(synchronize_session=False)
+    )
+    return result.all()
+
+
+async def _replace_roadmap_tasks(db: AsyncSession, user_id: int) -> None:
+    # A new plan replaces the old one's tasks, not what the user already did
+    replaced = await _delete_task_rows(db, user_id, roadmap_task_filter)
+    await tasks_deleted(db, user_id, replaced, keep_history=True)
+
+
+async def materialize_roadmap(
+    db: AsyncSession, user_id: int, roadmap: LearningRoadmap
+) -> List[int]:
+    """Replace the user's roadmap tasks with those of ``roadmap``.
+
+    Runs in the caller's transaction so the swap is atomic on commit.
+    """
+    await _replace_roadmap_tasks(db, user_id)
+    rows = roadmap_task_rows(user_id, roadmap.weeks)
+    if not rows:
+        return []
+    created = (
+        await db.execute(insert(Task).returning(*TASK_ROLLUP_COLUMNS), rows)
+    ).all()
+    await tasks_created(db, user_id, created)
+    return [row.id for row in created]
+
+
+async def stage_roadmap_week(
+    db: AsyncSession, user_id: int, stream: str, week: RoadmapWeek
+) -> List[int]:
+    rows = roadmap_task_rows(user_id, [week], source=pending_source(stream))
+    return await insert_task_rows(db, rows)
+
+
+async def discard_pending_roadmap(db: AsyncSession, user_id: int, stream: str) -> None:
+    """Drop the tasks ``stream`` staged, and any a dead stream left behind."""
+    stale = Task.created_at < datetime.now(timezone.utc) - ROADMAP_STAGE_TTL
+    await delete_tasks_where(
+        db,
+        user_id,
+        or_(Task.source == pending_source(stream), and_(pending_tasks, stale)),
+    )
+
+
+async def promote_pending_roadmap(db: AsyncSession, user_id: int, stream: str) -> None:
+    """Swap the previous roadmap's tasks for those ``stream`` staged."""
+    await _replace_roadmap_tasks(db, user_id)
+    promoted = await db.execute(
+        update(Task)
+        .where(Task.user_id == user_id, Task.source == pending_source(stream))
+        .values(source=ROADMAP_SOURCE)
+        .returning(*TASK_ROLLUP_COLUMNS)
+        .execution_options(synchronize_session=False)
+    )
+    # Staged tasks were left out of the rollups until now
+    await tasks_created(db, user_id, promoted.all())
+
+
+async def save_learning_goal(
+    db: AsyncSession,
+    user_id: int,
+    topic: str,
+    details: Optional[str],
+    roadmap: dict,
+) -> LearningGoal:
+    learning_goal = await db.scalar(
+        select(LearningGoal).where(LearningGoal.user_id == user_id)
+    )
+    if learning_goal:
+        learning_goal.topic = topic
+        learning_goal.details = details
+        learning_goal.roadmap = roadmap
+        learning_goal.week_summaries = summarize_roadmap(roadmap)
+    else:
+        learning_goal = LearningGoal(
+            user_id=user_id,
+            topic=topic,
+            details=details,
+            roadmap=roadmap,
+            week_summaries=summarize_roadmap(roadmap),
+        )
+        db.add(learning_goal)
+    return learning_goal
+
+
+def summarize_week(week: dict) -> str:
+    """One condensed line of plan context for a roadmap week."""
+    task_texts = []
+    for t in week.get("tasks", []):
+        text = t.get("description") if isinstance(t, dict) else str(t)
+        text = " ".join((text or "").split())
+        if len(text) > WEEK_TASK_CHARS:
+            text = text[: WEEK_TASK_CHARS - 1].rstrip() + "…"
+        task_texts.append(text)
+    header = f"Week {week.get('week')} – {week.get('theme', '')}: "
+    return header + "; ".join(task_texts)
+
+
+def summarize_roadmap(roadmap: Optional[dict]) -> Optional[Dict[str, str]]:
+    """Per-week summaries keyed by week number (JSON object keys are str)."""
+    if not roadmap:
+        return None
+    try:
+        return {
+            str(w.get("week")): summarize_week(w) for w in roadmap.get("weeks", [])
+        }
+    except (AttributeError, TypeError):
+        return {}
+
+
+def plan_context(
+    week_summaries: Dict[str, str],
+    week_start: int,
+    week_end: int,
+    token_budget: int = PLAN_CONTEXT_TOKEN_BUDGET,
+) -> str:
+    """Summaries for ``week_start..week_end`` trimmed to ``token_budget``.
+
+    Each week gets an equal share of the budget so a wide range still covers
+    every week rather than dropping the last ones.
+    """
+    lines = [
+        week_summaries[str(week)]
+        for week in range(week_start, week_end + 1)
+        if str(week) in week_summaries
+    ]
+    if not lines:
+        return ""
+    budget = token_budget * CHARS_PER_TOKEN
+    if sum(len(line) + 1 for line in lines) > budget:
+        share = max(budget // len(lines) - 1, MIN_WEEK_CHARS)
+        lines = [
+            line if len(line) <= share else line[: share - 1].rstrip() + "…"
+            for line in lines
+        ]
+    return "\n".join(lines)
+
+
+async def load_plan_summary(
+    db: AsyncSession, user_id: int, week_start: int = 1, week_end: int = 24
+) -> str:
+    week_summaries = await db.scalar(
+        select(LearningGoal.week_summaries).where(LearningGoal.user_id == user_id)
+    )
+    if week_summaries is None:
+        # Goals saved before summaries existed. Computed per call rather than
+        # stored, so reads never write; the next save_learning_goal stores them.
+        roadmap = await db.scalar(
+            select(LearningGoal.roadmap).where(LearningGoal.user_id == user_id)
+        )
+        if not roadmap:
+            return ""
+        week_summaries = summarize_roadmap(roadmap)
+    return plan_context(week_summaries, week_start, week_end)
+
+
+async def insert_quizzes(db: AsyncSession, rows: List[dict]) -> List[Quiz]:
+    """Insert quiz rows in one executemany and return them as ORM objects."""
+    if not rows:
+        return []
+    result = await db.scalars(insert(Quiz).returning(Quiz), rows)
+    return list(result)
+
+
+async def upsert_progress(
+    db: AsyncSession, user_id: int, entries: List[dict]
+) -> List[Progress]:
+    """Insert or overwrite a user's progress for each entry's date.
+
+    One ``INSERT ... ON CONFLICT (user_id, date) DO UPDATE`` for the whole
+    batch, relying on uq_progress_user_date. Later entries for the same date
+    win, as they would have with one request each.
+    """
+    by_date = {entry["date"]: entry for entry in entries}
+    if not by_date:
+        return []
+    # Sorted so concurrent batches take row locks in the same order
+    rows = [{**by_date[day], "user_id": user_id} for day in sorted(by_date)]
+    stmt = upsert_insert(db, Progress).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Progress.user_id, Progress.date],
+        set_={
+            "tasks_completed": stmt.excluded.tasks_completed,
+            "study_hours": stmt.excluded.study_hours,
+            "notes_created": stmt.excluded.notes_created,
+        },
+    )
+    result = await db.scalars(
+        stmt.returning(Progress),
+        execution_options={"populate_existing": True},
+    )
+    return list(result)
+
+
+async def set_tasks_completed(
+    db: AsyncSession, user_id: int, completed: bool, criterion
+) -> List[Task]:
+    """Complete or reopen a user's tasks matching ``criterion`` in one UPDATE.
+
+    Returns only the tasks whose state changed, with rollups updated for them.
+    """
+    if completed:
+        stamp = datetime.now(timezone.utc)
+        changing = Task.completed.is_not(True)
+    else:
+        # Keep the moment the completion was counted on; see app.rollups
+        stamp = func.coalesce(Task.completed_at, Task.updated_at, Task.created_at)
+        changing = Task.completed.is_(True)
+    result = await db.scalars(
+        update(Task)
+        .where(Task.user_id == user_id, counted_tasks, changing, criterion)
+        .values(completed=completed, completed_at=stamp)
+        .returning(Task),
+        execution_options={"populate_existing": True},
+    )
+    tasks = list(result)
+    await tasks_completion_changed(db, user_id, tasks, completed)
+    return tasks
+
+
+async def delete_tasks_returning(
+    db: AsyncSession, user_id: int, criterion
+) -> List[int]:
+    """Like delete_tasks_where, but maintains rollups and returns the ids."""
+    deleted = await _delete_task_rows(db, user_id, and_(counted_tasks, criterion))
+    await tasks_deleted(db, user_id, deleted)
+    return [row.id for row in deleted]
@@ -1,22 +1,228 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from contextlib import asynccontextmanager
+from fastapi import Request
+import asyncio
 import os
+import time
 from dotenv import load_dotenv
 
+from .metrics import pool_telemetry
+
 load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL")
 
-engine = create_engine(DATABASE_URL)
+# Opt-in async mode: handlers run on an asyncpg-backed AsyncEngine instead of
+# blocking psycopg2 calls on the event loop. Leave off for tests / SQLite.
+DB_ASYNC = os.getenv("DB_ASYNC", "false").lower() in ("1", "true", "yes")
+
+_ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+    "sqlite+pysqlite": "sqlite+aiosqlite",
+}
+
+
+def _to_async_url(url: str) -> str:
+    parsed = make_url(url)
+    driver = _ASYNC_DRIVERS.get(parsed.drivername, parsed.drivername)
+    return parsed.set(drivername=driver).render_as_string(hide_password=False)
+
+
+class _TimedCheckoutMixin:
+    # Times how long a caller waits for a pooled connection, including
+    # queueing behind other checkouts once pool_size + max_overflow is hit.
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            pool_telemetry.checkout_timeouts += 1
+            raise
+        finally:
+            pool_telemetry.checkout_wait.observe(time.perf_counter() - started)
+
+
+class TimedQueuePool(_TimedCheckoutMixin, QueuePool):
+    pass
+
+
+class TimedAsyncQueuePool(_TimedCheckoutMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def _pool_options(url: str, poolclass) -> dict:
+    if make_url(url).get_backend_name() == "sqlite":
+        return {}
+    return {
+        "poolclass": poolclass,
+        "pool_size": int(os.getenv("DB_POOL_SIZE", "5")),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "10")),
+        "pool_timeout": float(os.getenv("DB_POOL_TIMEOUT", "30")),
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "1800")),
+        "pool_pre_ping": os.getenv("DB_POOL_PRE_PING", "true").lower()
+        in ("1", "true", "yes"),
+    }
+
+
+def _enforce_sqlite_foreign_keys(sync_engine) -> None:
+    # SQLite ignores foreign keys, ON DELETE CASCADE included, unless every
+    # connection turns them on
+    if sync_engine.dialect.name != "sqlite":
+        return
+
+    @event.listens_for(sync_engine, "connect")
+    def _foreign_keys_on(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.close()
+
+
+engine = create_engine(DATABASE_URL, **_pool_options(DATABASE_URL, TimedQueuePool))
+pool_telemetry.instrument("sync", engine)
+_enforce_sqlite_foreign_keys(engine)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+async_engine = None
+AsyncSessionLocal = None
+if DB_ASYNC:
+    ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or _to_async_url(
+        DATABASE_URL
+    )
+    async_engine = create_async_engine(
+        ASYNC_DATABASE_URL, **_pool_options(ASYNC_DATABASE_URL, TimedAsyncQueuePool)
+    )
+    pool_telemetry.instrument("async", async_engine.sync_engine)
+    _enforce_sqlite_foreign_keys(async_engine.sync_engine)
+    AsyncSessionLocal = async_sessionmaker(
+        async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+    )
+
 Base = declarative_base()
 
 
+class SyncSessionAdapter:
+    """Exposes the AsyncSession call surface over a plain sync Session.
+
+    Handlers are written once against AsyncSession; with DB_ASYNC off they
+    receive this wrapper and keep running on the sync engine.
+    """
+
+    def __init__(self, session: Session) -> None:
+        self.sync_session = session
+
+    @property
+    def info(self) -> dict:
+        return self.sync_session.info
+
+    @property
+    def bind(self):
+        return self.sync_session.get_bind()
+
+    def add(self, instance) -> None:
+        self.sync_session.add(instance)
+
+    def add_all(self, instances) -> None:
+        self.sync_session.add_all(instances)
+
+    def expunge(self, instance) -> None:
+        self.sync_session.expunge(instance)
+
+    async def execute(self, statement, params=None, **kw):
+        return self.sync_session.execute(statement, params, **kw)
+
+    async def scalars(self, statement, params=None, **kw):
+        return self.sync_session.scalars(statement, params, **kw)
+
+    async def scalar(self, statement, params=None, **kw):
+        return self.sync_session.scalar(statement, params, **kw)
+
+    async def get(self, entity, ident, **kw):
+        return self.sync_session.get(entity, ident, **kw)
+
+    async def delete(self, instance) -> None:
+        self.sync_session.delete(instance)
+
+    async def flush(self, objects=None) -> None:
+        self.sync_session.flush(objects)
+
+    async def refresh(self, instance, attribute_names=None) -> None:
+        self.sync_session.refresh(instance, attribute_names)
+
+    async def commit(self) -> None:
+        self.sync_session.commit()
+
+    async def rollback(self) -> None:
+        self.sync_session.rollback()
+
+    async def close(self) -> None:
+        self.sync_session.close()
+
+
+_UPSERT_INSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+
+def upsert_insert(db, model):
+    """``insert(model)`` with ``on_conflict_do_update`` for the session's dialect."""
+    return _UPSERT_INSERTS[db.bind.dialect.name](model)
+
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+
+def _endpoint_label(request: Request) -> str:
+    route = request.scope.get("route")
+    return f"{request.method} {getattr(route, 'path', request.url.path)}"
+
+
+@asynccontextmanager
+async def session_scope(endpoint: str):
+    """Session for work outside a request's own dependency, e.g. inside a
+    streaming response or a background worker. ``endpoint`` labels its hold
+    time in the pool telemetry."""
+    if AsyncSessionLocal is not None:
+        async with AsyncSessionLocal() as session:
+            session.info["endpoint"] = endpoint
+            yield session
+    else:
+        db = SessionLocal()
+        db.info["endpoint"] = endpoint
+        try:
+            yield SyncSessionAdapter(db)
+        finally:
+            db.close()
+
+
+async def get_async_db(request: Request):
+    async with session_scope(_endpoint_label(request)) as db:
+        yield db
+
+
+async def run_concurrently(db, *queries):
+    """Run independent read callables, each ``async def query(session)``.
+
+    In async mode every query gets its own pooled session and they run in
+    parallel, so the caller waits for one round trip rather than several.
+    On the sync path they share ``db`` and run in order.
+    """
+    if AsyncSessionLocal is None:
+        return [await query(db) for query in queries]
+
+    async def run(query):
+        async with session_scope(db.info.get("endpoint", "unknown")) as session:
+            return await query(session)
+
+    return await asyncio.gather(*(run(query) for query in queries))
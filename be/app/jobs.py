@@ -0,0 +1,387 @@
+"""Durable queue for AI generations that outlive the HTTP request.
+
+Jobs are rows in ``ai_jobs``. Workers claim them with
+``SELECT ... FOR UPDATE SKIP LOCKED`` so any number of app processes can poll
+the same table, run the model call, and record the result for ``/jobs/{id}``.
+Run workers in-process (JOB_WORKERS > 0) or on their own with
+``python -m app.jobs``.
+"""
+
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional
+import asyncio
+import logging
+import os
+import random
+
+from sqlalchemy import and_, delete, func, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .accounts import ACCOUNT_PURGE_BATCH_SIZE, PURGED_MODELS, purge_batch
+from .ai_service import AIBudgetExceededError, ai_service
+from .crud import load_plan_summary, materialize_roadmap, save_learning_goal
+from .database import session_scope
+from .models import AIJob, Quiz, User
+from .schemas import LearningGoalResponse, QuizCreate, QuizResponse, RoadmapRequest
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+DEAD = "dead"
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL_SECONDS", "1"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "4"))
+JOB_RETRY_BASE = float(os.getenv("JOB_RETRY_BASE_SECONDS", "5"))
+JOB_RETRY_MAX = float(os.getenv("JOB_RETRY_MAX_SECONDS", "300"))
+JOB_PER_USER_CONCURRENCY = int(os.getenv("JOB_PER_USER_CONCURRENCY", "1"))
+# A running job whose lease is older than this is assumed orphaned (its worker
+# died) and may be claimed again. Must exceed the slowest model timeout.
+JOB_LEASE = float(os.getenv("JOB_LEASE_SECONDS", "600"))
+
+LABEL = "job worker"
+
+
+class LeaseLost(Exception):
+    """The job was reclaimed by another worker after our lease expired."""
+
+
+@dataclass(frozen=True)
+class ClaimedJob:
+    id: int
+    user_id: int
+    kind: str
+    payload: Dict[str, Any]
+    attempts: int
+    max_attempts: int
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def retry_delay(attempts: int) -> float:
+    """Exponential backoff with jitter; ``attempts`` counts the failed run."""
+    delay = min(JOB_RETRY_BASE * 2 ** (attempts - 1), JOB_RETRY_MAX)
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+async def enqueue(
+    db: AsyncSession, user_id: int, kind: str, payload: Dict[str, Any]
+) -> AIJob:
+    if kind not in HANDLERS:
+        raise ValueError(f"Unknown job kind: {kind!r}")
+    now = _now()
+    job = AIJob(
+        user_id=user_id,
+        kind=kind,
+        payload=payload,
+        state=QUEUED,
+        attempts=0,
+        max_attempts=JOB_MAX_ATTEMPTS,
+        run_after=now,
+        updated_at=now,
+    )
+    db.add(job)
+    await db.commit()
+    await db.refresh(job)
+    job_workers.notify()
+    return job
+
+
+async def claim_job(db: AsyncSession) -> Optional[ClaimedJob]:
+    """Lock and mark running the next due job, or return None.
+
+    Users already at JOB_PER_USER_CONCURRENCY running jobs are skipped. The
+    check reads committed rows, so two processes claiming for the same user at
+    the same instant can briefly exceed the limit by one.
+    """
+    now = _now()
+    stale = now - timedelta(seconds=JOB_LEASE)
+    busy_users = (
+        select(AIJob.user_id)
+        .where(AIJob.state == RUNNING, AIJob.locked_at > stale)
+        .group_by(AIJob.user_id)
+        .having(func.count() >= JOB_PER_USER_CONCURRENCY)
+    )
+    job = await db.scalar(
+        select(AIJob)
+        .where(
+            or_(
+                and_(AIJob.state == QUEUED, AIJob.run_after <= now),
+                and_(AIJob.state == RUNNING, AIJob.locked_at <= stale),
+            ),
+            AIJob.user_id.not_in(busy_users),
+        )
+        .order_by(AIJob.run_after, AIJob.id)
+        .limit(1)
+        .with_for_update(skip_locked=True)
+    )
+    if job is None:
+        await db.rollback()
+        return None
+
+    job.state = RUNNING
+    job.attempts += 1
+    job.locked_at = now
+    job.updated_at = now
+    claimed = ClaimedJob(
+        id=job.id,
+        user_id=job.user_id,
+        kind=job.kind,
+        payload=job.payload,
+        attempts=job.attempts,
+        max_attempts=job.max_attempts,
+    )
+    await db.commit()
+    return claimed
+
+
+async def _settle(db: AsyncSession, job: ClaimedJob, **values) -> None:
+    # ``attempts`` doubles as the lease token: a reclaimed job has moved on
+    result = await db.execute(
+        update(AIJob)
+        .where(
+            AIJob.id == job.id,
+            AIJob.state == RUNNING,
+            AIJob.attempts == job.attempts,
+        )
+        .values(updated_at=_now(), **values)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount == 0:
+        raise LeaseLost(f"job {job.id} was reclaimed")
+
+
+async def renew_lease(db: AsyncSession, job: ClaimedJob) -> None:
+    """Extend a long job's lease in the caller's transaction, or raise
+    LeaseLost if another worker has already reclaimed it."""
+    await _settle(db, job, locked_at=_now())
+
+
+async def complete_job(db: AsyncSession, job: ClaimedJob, result: dict) -> None:
+    """Record success in the caller's transaction, alongside the job's writes."""
+    await _settle(db, job, state=SUCCEEDED, result=result, error=None)
+
+
+async def fail_job(
+    db: AsyncSession, job: ClaimedJob, error: str, retry: bool = True
+) -> str:
+    if not retry or job.attempts >= job.max_attempts:
+        await _settle(db, job, state=DEAD, error=error)
+        return DEAD
+    run_after = _now() + timedelta(seconds=retry_delay(job.attempts))
+    await _settle(db, job, state=QUEUED, run_after=run_after, error=error)
+    return QUEUED
+
+
+async def release_job(db: AsyncSession, job: ClaimedJob) -> None:
+    """Put an interrupted job back without charging it an attempt."""
+    await _settle(db, job, state=QUEUED, attempts=job.attempts - 1, run_after=_now())
+
+
+async def run_roadmap_job(job: ClaimedJob) -> None:
+    request = RoadmapRequest.model_validate(job.payload)
+    roadmap_data = await ai_service.generate_roadmap(
+        request.topic, request.details, fresh=request.fresh, user_id=job.user_id
+    )
+    async with session_scope(LABEL) as db:
+        learning_goal = await save_learning_goal(
+            db, job.user_id, request.topic, request.details, roadmap_data.model_dump()
+        )
+        await materialize_roadmap(db, job.user_id, roadmap_data)
+        await db.flush()
+        await db.refresh(learning_goal)
+        goal = LearningGoalResponse.model_validate(learning_goal)
+        await complete_job(db, job, goal.model_dump(mode="json"))
+        await db.commit()
+
+
+async def run_quiz_job(job: ClaimedJob) -> None:
+    request = QuizCreate.model_validate(job.payload)
+    async with session_scope(LABEL) as db:
+        plan_summary = await load_plan_summary(
+            db, job.user_id, request.week_start, request.week_end
+        )
+
+    quiz_data = await ai_service.generate_quiz(
+        request.topic,
+        request.difficulty,
+        plan_context=plan_summary,
+        week_start=request.week_start,
+        week_end=request.week_end,
+        fresh=request.fresh,
+        user_id=job.user_id,
+    )
+
+    async with session_scope(LABEL) as db:
+        quiz = Quiz(
+            user_id=job.user_id,
+            topic=request.topic,
+            difficulty=request.difficulty,
+            questions=quiz_data.model_dump()["questions"],
+        )
+        db.add(quiz)
+        await db.flush()
+        await db.refresh(quiz)
+        result = QuizResponse.model_validate(quiz).model_dump(mode="json")
+        await complete_job(db, job, result)
+        await db.commit()
+
+
+async def run_purge_job(job: ClaimedJob) -> None:
+    """Delete a disabled account's rows in bounded batches, then the user.
+
+    Each batch commits on its own, so locks stay short and a retried job
+    resumes where the last one stopped. Every batch also renews the lease,
+    however long the purge runs. Deleting the user row cascades to this
+    job's own row, which is how the job completes.
+    """
+    for model in PURGED_MODELS:
+        while True:
+            async with session_scope(LABEL) as db:
+                await renew_lease(db, job)
+                deleted = await purge_batch(db, model, job.user_id, job.id)
+                await db.commit()
+            if deleted < ACCOUNT_PURGE_BATCH_SIZE:
+                break
+    async with session_scope(LABEL) as db:
+        await renew_lease(db, job)
+        await db.execute(delete(User).where(User.id == job.user_id))
+        await db.commit()
+
+
+HANDLERS = {
+    "roadmap": run_roadmap_job,
+    "quiz": run_quiz_job,
+    "purge_account": run_purge_job,
+}
+
+
+class JobWorkerPool:
+    """In-process asyncio workers polling the ai_jobs table."""
+
+    def __init__(self, workers: int, poll_interval: float) -> None:
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self._tasks = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self.busy = 0
+        self.claimed = 0
+        self.succeeded = 0
+        self.retried = 0
+        self.dead = 0
+        self.lost = 0
+
+    def start(self) -> None:
+        self._wakeup = asyncio.Event()
+        self._tasks = [
+            asyncio.create_task(self._worker(), name=f"job-worker-{n}")
+            for n in range(self.workers)
+        ]
+
+    async def stop(self) -> None:
+        # Interrupted jobs are handed back to the queue by _execute
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def notify(self) -> None:
+        """Wake idle workers instead of waiting out the poll interval."""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _worker(self) -> None:
+        while True:
+            try:
+                async with session_scope(LABEL) as db:
+                    job = await claim_job(db)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Claiming a job failed")
+                job = None
+
+            if job is not None:
+                await self._execute(job)
+                continue
+
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    async def _execute(self, job: ClaimedJob) -> None:
+        self.claimed += 1
+        self.busy += 1
+        try:
+            if job.attempts > job.max_attempts:
+                # Reclaimed after its worker died on the final attempt
+                raise RuntimeError("lease expired on the final attempt")
+            handler = HANDLERS.get(job.kind)
+            if handler is None:
+                raise ValueError(f"Unknown job kind: {job.kind!r}")
+            await handler(job)
+            self.succeeded += 1
+        except asyncio.CancelledError:
+            async with session_scope(LABEL) as db:
+                await release_job(db, job)
+                await db.commit()
+            raise
+        except LeaseLost:
+            self.lost += 1
+            logger.warning("Job %s was reclaimed before it finished", job.id)
+        except Exception as exc:
+            logger.warning("Job %s attempt %s failed: %s", job.id, job.attempts, exc)
+            try:
+                async with session_scope(LABEL) as db:
+                    # An exhausted budget will not recover within the backoff
+                    state = await fail_job(
+                        db,
+                        job,
+                        f"{type(exc).__name__}: {exc}",
+                        retry=not isinstance(exc, AIBudgetExceededError),
+                    )
+                    await db.commit()
+            except LeaseLost:
+                self.lost += 1
+            else:
+                if state == DEAD:
+                    self.dead += 1
+                else:
+                    self.retried += 1
+        finally:
+            self.busy -= 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "workers": len(self._tasks),
+            "busy": self.busy,
+            "claimed": self.claimed,
+            "succeeded": self.succeeded,
+            "retried": self.retried,
+            "dead": self.dead,
+            "lost_leases": self.lost,
+        }
+
+
+job_workers = JobWorkerPool(JOB_WORKERS, JOB_POLL_INTERVAL)
+
+
+async def _serve() -> None:
+    pool = JobWorkerPool(JOB_WORKERS or 1, JOB_POLL_INTERVAL)
+    pool.start()
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await pool.stop()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(_serve())
@@ -0,0 +1,261 @@
+"""Model backends behind AIService.
+
+``GeminiBackend`` talks to Gemini through google-genai. ``StubBackend`` runs
+entirely in-process: it returns schema-valid payloads (derived from the
+requested ``response_schema``) after a configurable latency and fails at
+configurable rates, so the whole generation pipeline can be load-tested
+offline. Pick one with LLM_BACKEND=gemini|stub.
+"""
+
+from __future__ import annotations
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Callable, Dict, Optional
+import asyncio
+import hashlib
+import json
+import math
+import os
+import random
+import re
+
+
+@dataclass
+class LLMResponse:
+    text: str
+    input_tokens: Optional[int] = None
+    output_tokens: Optional[int] = None
+
+
+class LLMBackend(ABC):
+    """What AIService needs from a model provider.
+
+    A backend missing either method fails when it is constructed.
+    """
+
+    name = "base"
+
+    @abstractmethod
+    async def generate(
+        self, model: str, contents: str, config: Optional[dict] = None
+    ) -> LLMResponse: ...
+
+    @abstractmethod
+    def stream(
+        self, model: str, contents: str, config: Optional[dict] = None
+    ) -> AsyncIterator[str]:
+        """Async iterator over text chunks of one generation."""
+
+
+class GeminiBackend(LLMBackend):
+    name = "gemini"
+
+    def __init__(self, client: Any = None) -> None:
+        # Created on first use so importing the app needs no credentials
+        self._client = client
+
+    @property
+    def client(self) -> Any:
+        if self._client is None:
+            from google import genai
+
+            # API key is read from environment by the client
+            self._client = genai.Client()
+        return self._client
+
+    async def generate(
+        self, model: str, contents: str, config: Optional[dict] = None
+    ) -> LLMResponse:
+        response = await self.client.aio.models.generate_content(
+            model=model, contents=contents, config=config
+        )
+        usage = getattr(response, "usage_metadata", None)
+        return LLMResponse(
+            text=response.text or "",
+            input_tokens=getattr(usage, "prompt_token_count", None),
+            output_tokens=getattr(usage, "candidates_token_count", None),
+        )
+
+    async def stream(
+        self, model: str, contents: str, config: Optional[dict] = None
+    ) -> AsyncIterator[str]:
+        chunks = await self.client.aio.models.generate_content_stream(
+            model=model, contents=contents, config=config
+        )
+        async for chunk in chunks:
+            yield chunk.text or ""
+
+
+class StubAPIError(Exception):
+    """Shaped like google.genai.errors.APIError: carries the HTTP status."""
+
+    def __init__(self, code: int, message: str) -> None:
+        super().__init__(f"{code} {message}")
+        self.code = code
+
+
+def parse_latency(spec: str) -> Callable[[random.Random], float]:
+    """``fixed:S``, ``uniform:LO,HI`` or ``lognormal:MEDIAN,SIGMA`` seconds."""
+    kind, _, args = spec.partition(":")
+    values = [float(v) for v in args.split(",") if v.strip()]
+    if kind == "fixed" and len(values) == 1:
+        return lambda rng: values[0]
+    if kind == "uniform" and len(values) == 2:
+        return lambda rng: rng.uniform(values[0], values[1])
+    if kind == "lognormal" and len(values) == 2:
+        mu = math.log(values[0])
+        return lambda rng: rng.lognormvariate(mu, values[1])
+    raise ValueError(f"Bad latency spec: {spec!r}")
+
+
+@dataclass
+class StubProfile:
+    """Latency and failure behaviour of one stubbed model."""
+
+    latency: Callable[[random.Random], float]
+    error_rate: float = 0.0  # answered with 503
+    throttle_rate: float = 0.0  # answered with 429
+
+
+# Array lengths for field names whose size the prompts pin down
+_ARRAY_SIZES = {"weeks": 24, "questions": 5, "options": 4, "tasks": 5, "videos": 2}
+
+
+class StubBackend(LLMBackend):
+    """Deterministic offline backend for load tests and local runs.
+
+    Payloads depend only on the prompt, so cache and single-flight behave as
+    with the real model; latency and failures are drawn per call.
+    """
+
+    name = "stub"
+
+    def __init__(
+        self,
+        profiles: Optional[Dict[str, StubProfile]] = None,
+        default: Optional[StubProfile] = None,
+        seed: Optional[int] = None,
+        chunk_size: int = 256,
+    ) -> None:
+        self.profiles = profiles or {}
+        self.default = default or StubProfile(latency=parse_latency("fixed:0.05"))
+        self.chunk_size = chunk_size
+        self._rng = random.Random(seed)
+        self.calls = 0
+
+    def _profile(self, model: str) -> StubProfile:
+        return self.profiles.get(model, self.default)
+
+    async def _delay_or_fail(self, profile: StubProfile, latency: float) -> None:
+        roll = self._rng.random()
+        if roll < profile.throttle_rate:
+            await asyncio.sleep(min(latency, 0.05))
+            raise StubAPIError(429, "RESOURCE_EXHAUSTED")
+        if roll < profile.throttle_rate + profile.error_rate:
+            await asyncio.sleep(min(latency, 0.05))
+            raise StubAPIError(503, "UNAVAILABLE")
+        await asyncio.sleep(latency)
+
+    def payload(self, contents: str, config: Optional[dict]) -> str:
+        rng = random.Random(hashlib.sha256(contents.encode()).digest())
+        schema = (config or {}).get("response_schema")
+        if schema is None:
+            words = re.findall(r"\w+", contents)[:12]
+            return "Stub answer about " + " ".join(words) + "."
+        json_schema = schema.model_json_schema()
+        value = _fake_value(json_schema, json_schema.get("$defs", {}), rng, None, 0)
+        return json.dumps(value)
+
+    async def generate(
+        self, model: str, contents: str, config: Optional[dict] = None
+    ) -> LLMResponse:
+        self.calls += 1
+        profile = self._profile(model)
+        await self._delay_or_fail(profile, profile.latency(self._rng))
+        text = self.payload(contents, config)
+        # Rough 4-characters-per-token estimate in place of usage metadata
+        return LLMResponse(
+            text=text,
+            input_tokens=len(contents) // 4,
+            output_tokens=len(text) // 4,
+        )
+
+    async def stream(
+        self, model: str, contents: str, config: Optional[dict] = None
+    ) -> AsyncIterator[str]:
+        self.calls += 1
+        profile = self._profile(model)
+        text = self.payload(contents, config)
+        chunks = [
+            text[i : i + self.chunk_size]
+            for i in range(0, len(text), self.chunk_size)
+        ] or [""]
+        # A quarter of the latency (and any failure) comes before the first
+        # chunk; the rest is spread evenly between chunks
+        total = profile.latency(self._rng)
+        await self._delay_or_fail(profile, total / 4)
+        step = total * 3 / 4 / len(chunks)
+        for chunk in chunks:
+            yield chunk
+            await asyncio.sleep(step)
+
+
+def _fake_value(
+    schema: dict, defs: dict, rng: random.Random, name: Optional[str], index: int
+) -> Any:
+    if "$ref" in schema:
+        schema = defs[schema["$ref"].rsplit("/", 1)[-1]]
+    if "anyOf" in schema:
+        options = [s for s in schema["anyOf"] if s.get("type") != "null"]
+        return _fake_value(options[0], defs, rng, name, index) if options else None
+
+    kind = schema.get("type")
+    if kind == "object":
+        return {
+            field: _fake_value(sub, defs, rng, field, index)
+            for field, sub in schema.get("properties", {}).items()
+        }
+    if kind == "array":
+        size = _ARRAY_SIZES.get(name, 3)
+        item = schema.get("items", {})
+        # Items inherit the array's name: "videos" entries become URLs
+        return [_fake_value(item, defs, rng, name, i) for i in range(size)]
+    if kind == "integer":
+        if name == "week":
+            return index + 1
+        if name == "correct_answer":
+            return rng.randrange(_ARRAY_SIZES["options"])
+        return rng.randrange(1, 10)
+    if kind == "number":
+        return round(rng.uniform(0, 10), 2)
+    if kind == "boolean":
+        return rng.random() < 0.5
+    word = "".join(rng.choices("abcdefghijklmnopqrstuvwxyz", k=8))
+    if name == "videos":
+        return f"https://www.youtube.com/watch?v={word}{index:03d}"
+    label = (name or "item").replace("_", " ").capitalize()
+    return f"{label} {index + 1}: {word}"
+
+
+def _profile_from_env(prefix: str, latency: str) -> StubProfile:
+    return StubProfile(
+        latency=parse_latency(os.getenv(f"{prefix}_LATENCY", latency)),
+        error_rate=float(os.getenv(f"{prefix}_ERROR_RATE", "0")),
+        throttle_rate=float(os.getenv(f"{prefix}_THROTTLE_RATE", "0")),
+    )
+
+
+def backend_from_env(pro_model: str, flash_model: str) -> LLMBackend:
+    backend = os.getenv("LLM_BACKEND", "gemini").lower()
+    if backend == "gemini":
+        return GeminiBackend()
+    if backend == "stub":
+        seed = os.getenv("LLM_STUB_SEED")
+        return StubBackend(
+            profiles={
+                pro_model: _profile_from_env("LLM_STUB_PRO", "lognormal:20,0.4"),
+                flash_model: _profile_from_env("LLM_STUB_FLASH", "lognormal:1,0.5"),
+            },
+            seed=int(seed) if seed else None,
+        )
+    raise ValueError(f"Unknown LLM_BACKEND: {backend!r}")
@@ -1,13 +1,40 @@
-from fastapi import FastAPI, Depends, HTTPException, status
+from fastapi import (
+    FastAPI,
+    Depends,
+    Header,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+    status,
+)
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.orm import Session
+from fastapi.responses import JSONResponse, StreamingResponse
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from contextlib import asynccontextmanager
 from datetime import datetime, timedelta
 from typing import List, Optional
+import hmac
 import os
+import uuid
 from dotenv import load_dotenv
 
-from .database import get_db, engine, Base
-from .models import User, LearningGoal, Task, Schedule, Note, Playlist, Progress, Quiz
+from .database import get_async_db, run_concurrently, session_scope
+from .models import (
+    AIJob,
+    User,
+    LearningGoal,
+    Task,
+    Schedule,
+    Note,
+    Playlist,
+    Progress,
+    Quiz,
+    DailyActivity,
+    UserStreak,
+    WeekRollup,
+)
 from .schemas import (
     UserCreate,
     UserResponse,
@@ -18,36 +45,87 @@ from .schemas import (
     TaskCreate,
     TaskUpdate,
     TaskResponse,
+    TaskBulkRequest,
+    TaskBulkResponse,
+    TaskBulkResult,
     ScheduleCreate,
     ScheduleResponse,
     NoteCreate,
     NoteUpdate,
     NoteResponse,
+    NoteSearchHit,
     PlaylistCreate,
     PlaylistResponse,
     ProgressCreate,
+    ProgressBatchCreate,
     ProgressResponse,
     QuizCreate,
+    QuizBatchCreate,
     QuizResponse,
     RoadmapRequest,
     VideoSummaryRequest,
     VideoQuestionRequest,
     DashboardData,
+    DashboardSummary,
+    WeekProgress,
+    JobResponse,
+    ActivityDay,
+    ActivitySummary,
 )
 from .auth import (
-    get_password_hash,
-    verify_password,
+    get_password_hash_async,
+    verify_and_update_password,
     create_access_token,
+    token_claims,
     get_current_user,
+    get_current_user_id,
+    invalidate_user,
+    AuthUser,
+)
+from .ai_service import (
+    ai_service,
+    AIBudgetExceededError,
+    AITimeoutError,
+    AIUnavailableError,
 )
-from .ai_service import ai_service
+from .metrics import pool_telemetry
+from .crud import (
+    delete_tasks_returning,
+    insert_quizzes,
+    set_tasks_completed,
+    load_plan_summary,
+    materialize_roadmap,
+    save_learning_goal,
+    stage_roadmap_week,
+    upsert_progress,
+    discard_pending_roadmap,
+    promote_pending_roadmap,
+)
+from .streaming import sse_event
+from .task_sources import counted_tasks
+from .pagination import fetch_page, page_response
+from .search import MAX_PAGE_SIZE as SEARCH_MAX_PAGE_SIZE, search_notes
+from .jobs import enqueue, job_workers
+from .accounts import delete_account as remove_account, reset_all_data
+from . import rollups
 
 load_dotenv()
 
-# Create tables
-Base.metadata.create_all(bind=engine)
+# Schema is managed by Alembic: run `alembic upgrade head` before starting.
+
 
-app = FastAPI(title="GoalPad", version="1.0.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # JOB_WORKERS=0 leaves the queue to a separate `python -m app.jobs`
+    if job_workers.workers > 0:
+        job_workers.start()
+    try:
+        yield
+    finally:
+        await job_workers.stop()
+
+
+app = FastAPI(title="GoalPad", version="1.0.0", lifespan=lifespan)
 
 # CORS middleware (dev)
 app.add_middleware(
@@ -56,35 +134,74 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "Link"],
 )
 
 
+@app.exception_handler(AITimeoutError)
+async def ai_timeout_handler(request: Request, exc: AITimeoutError):
+    return JSONResponse(status_code=504, content={"detail": str(exc)})
+
+
+@app.exception_handler(AIUnavailableError)
+async def ai_unavailable_handler(request: Request, exc: AIUnavailableError):
+    # Retries are exhausted; tell the client to come back rather than 500
+    return JSONResponse(
+        status_code=503,
+        content={"detail": str(exc)},
+        headers={"Retry-After": os.getenv("AI_RETRY_AFTER_SECONDS", "30")},
+    )
+
+
+@app.exception_handler(AIBudgetExceededError)
+async def ai_budget_handler(request: Request, exc: AIBudgetExceededError):
+    return JSONResponse(
+        status_code=429,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+
+# Pool, AI gate, budget and job internals are for operators only: /metrics
+# answers 404 unless METRICS_TOKEN is set, then needs it in X-Metrics-Token
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+
+def require_metrics_token(x_metrics_token: Optional[str] = Header(None)) -> None:
+    if not METRICS_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not hmac.compare_digest(x_metrics_token or "", METRICS_TOKEN):
+        raise HTTPException(status_code=403, detail="Invalid metrics token")
+
+
+@app.get("/metrics", dependencies=[Depends(require_metrics_token)])
+async def get_metrics():
+    return {
+        "ai": ai_service.metrics(),
+        "db": pool_telemetry.snapshot(),
+        "jobs": job_workers.snapshot(),
+    }
+
+
 # Dev reset (no auth) – clears all tables
 @app.post("/dev/reset")
-async def dev_reset(db: Session = Depends(get_db)):
-    db.query(Progress).delete()
-    db.query(Note).delete()
-    db.query(Playlist).delete()
-    db.query(Schedule).delete()
-    db.query(Task).delete()
-    db.query(LearningGoal).delete()
-    db.query(Quiz).delete()
-    db.query(User).delete()
-    db.commit()
+async def dev_reset(db: AsyncSession = Depends(get_async_db)):
+    await reset_all_data(db)
+    await db.commit()
     return {"message": "Reset complete"}
 
 
 # Auth endpoints
 @app.post("/auth/register", response_model=UserResponse)
-async def register(user: UserCreate, db: Session = Depends(get_db)):
+async def register(user: UserCreate, db: AsyncSession = Depends(get_async_db)):
     # Check if user exists
-    if db.query(User).filter(User.username == user.username).first():
+    if await db.scalar(select(User.id).where(User.username == user.username)):
         raise HTTPException(status_code=400, detail="Username already registered")
-    if db.query(User).filter(User.email == user.email).first():
+    if await db.scalar(select(User.id).where(User.email == user.email)):
         raise HTTPException(status_code=400, detail="Email already registered")
 
     # Create user
-    hashed_password = get_password_hash(user.password)
+    hashed_password = await get_password_hash_async(user.password)
     db_user = User(
         username=user.username,
         email=user.email,
@@ -92,22 +209,47 @@ async def register(user: UserCreate, db: Session = Depends(get_db)):
         name=user.name,
     )
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
     return db_user
 
 
 @app.post("/auth/login", response_model=Token)
-async def login(user_credentials: UserLogin, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.username == user_credentials.username).first()
-    if not user or not verify_password(user_credentials.password, user.hashed_password):
+async def login(
+    user_credentials: UserLogin, db: AsyncSession = Depends(get_async_db)
+):
+    user = await db.scalar(
+        select(User).where(User.username == user_credentials.username)
+    )
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Incorrect username or password",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    claims = token_claims(user)
+    hashed_password = user.hashed_password
+    # Don't hold a pooled connection through the bcrypt round
+    await db.close()
+
+    valid, new_hash = await verify_and_update_password(
+        user_credentials.password, hashed_password
+    )
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    if new_hash:
+        await db.execute(
+            update(User)
+            .where(User.id == claims["uid"])
+            .values(hashed_password=new_hash)
+        )
+        await db.commit()
 
-    access_token = create_access_token(data={"sub": user.username})
+    access_token = create_access_token(data=claims)
     return {"access_token": access_token, "token_type": "bearer"}
 
 
@@ -117,79 +259,104 @@ async def login(user_credentials: UserLogin, db: Session = Depends(get_db)):
 @app.post("/ai/generate-roadmap", response_model=LearningGoalResponse)
 async def generate_roadmap(
     request: RoadmapRequest,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    user_id: int = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_async_db),
 ):
+    # Hand the pooled connection back before the long model call; the write
+    # phase below checks out a fresh one for a single short transaction.
+    await db.close()
+
     # Generate roadmap using AI
-    roadmap_data = await ai_service.generate_roadmap(request.topic, request.details)
+    roadmap_data = await ai_service.generate_roadmap(
+        request.topic, request.details, fresh=request.fresh, user_id=user_id
+    )
 
     # Save or update learning goal
-    learning_goal = (
-        db.query(LearningGoal).filter(LearningGoal.user_id == current_user.id).first()
+    learning_goal = await save_learning_goal(
+        db, user_id, request.topic, request.details, roadmap_data.model_dump()
     )
-    if learning_goal:
-        learning_goal.topic = request.topic
-        learning_goal.details = request.details
-        learning_goal.roadmap = roadmap_data.model_dump()
-    else:
-        learning_goal = LearningGoal(
-            user_id=current_user.id,
-            topic=request.topic,
-            details=request.details,
-            roadmap=roadmap_data.model_dump(),
-        )
-        db.add(learning_goal)
 
-    db.commit()
-    db.refresh(learning_goal)
-
-    # Create tasks from roadmap (support dicts or Pydantic objects)
-    for week_data in roadmap_data.weeks:
-        for task_data in week_data.tasks:
-            if isinstance(task_data, dict):
-                title = task_data.get("description", "")
-                quadrant = task_data.get("quadrant") or "Q2"
-            else:
-                title = getattr(task_data, "description", "")
-                quadrant = getattr(task_data, "quadrant", None) or "Q2"
-
-            task = Task(
-                user_id=current_user.id,
-                title=title,
-                quadrant=quadrant,
-                week=week_data.week,
-            )
-            db.add(task)
+    # Replace the previous roadmap's tasks in the same transaction
+    await materialize_roadmap(db, user_id, roadmap_data)
 
-    db.commit()
+    await db.commit()
+    await db.refresh(learning_goal)
     return learning_goal
 
 
+@app.post("/ai/generate-roadmap/stream")
+async def generate_roadmap_stream(
+    request: RoadmapRequest,
+    user_id: int = Depends(get_current_user_id),
+):
+    """Server-Sent Events variant of /ai/generate-roadmap.
+
+    Emits a ``week`` event per RoadmapWeek as soon as the model finishes it,
+    then ``done`` with the saved learning goal (or ``error``). Tasks are
+    written week by week as pending rows and swapped in for the previous
+    roadmap's tasks in one transaction at the end. Unlike the JSON endpoint
+    the model call is not retried and never falls back to another model.
+    """
+    label = "POST /ai/generate-roadmap/stream"
+    stream = uuid.uuid4().hex  # tags this request's staged tasks
+
+    async def events():
+        weeks = []
+        finished = False
+        try:
+            async with session_scope(label) as db:
+                await discard_pending_roadmap(db, user_id, stream)
+                await db.commit()
+
+            async for week in ai_service.stream_roadmap(
+                request.topic, request.details, fresh=request.fresh, user_id=user_id
+            ):
+                async with session_scope(label) as db:
+                    await stage_roadmap_week(db, user_id, stream, week)
+                    await db.commit()
+                weeks.append(week)
+                yield sse_event("week", week.model_dump())
+
+            roadmap = {"weeks": [week.model_dump() for week in weeks]}
+            async with session_scope(label) as db:
+                await promote_pending_roadmap(db, user_id, stream)
+                learning_goal = await save_learning_goal(
+                    db, user_id, request.topic, request.details, roadmap
+                )
+                await db.commit()
+                await db.refresh(learning_goal)
+                goal = LearningGoalResponse.model_validate(learning_goal)
+            finished = True
+            yield sse_event("done", goal.model_dump())
+        except Exception as exc:
+            yield sse_event("error", {"detail": str(exc)})
+        finally:
+            # Also runs when the client disconnects mid-stream
+            if not finished:
+                async with session_scope(label) as db:
+                    await discard_pending_roadmap(db, user_id, stream)
+                    await db.commit()
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @app.post("/ai/generate-quiz", response_model=QuizResponse)
 async def generate_quiz(
     request: QuizCreate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    user_id: int = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_async_db),
 ):
     # Get plan context, if any
-    lg = db.query(LearningGoal).filter(LearningGoal.user_id == current_user.id).first()
-    plan_summary = ""
-    if lg and lg.roadmap:
-        try:
-            weeks = lg.roadmap.get("weeks", [])
-            lines = []
-            for w in weeks:
-                theme = w.get("theme", "")
-                ws = w.get("week")
-                tasks = w.get("tasks", [])
-                task_texts = [
-                    (t.get("description") if isinstance(t, dict) else str(t))
-                    for t in tasks
-                ]
-                lines.append(f"Week {ws} – {theme}: " + "; ".join(task_texts))
-            plan_summary = "\n".join(lines)
-        except Exception:
-            plan_summary = ""
+    plan_summary = await load_plan_summary(
+        db, user_id, request.week_start, request.week_end
+    )
+
+    # Context is read; release the connection while the model runs.
+    await db.close()
 
     quiz_data = await ai_service.generate_quiz(
         request.topic,
@@ -197,65 +364,157 @@ async def generate_quiz(
         plan_context=plan_summary,
         week_start=request.week_start,
         week_end=request.week_end,
+        fresh=request.fresh,
+        user_id=user_id,
     )
 
     quiz = Quiz(
-        user_id=current_user.id,
+        user_id=user_id,
         topic=request.topic,
         difficulty=request.difficulty,
         questions=quiz_data.model_dump()["questions"],
     )
     db.add(quiz)
-    db.commit()
-    db.refresh(quiz)
+    await db.commit()
+    await db.refresh(quiz)
     return quiz
 
 
+@app.post("/ai/generate-quiz/batch", response_model=List[QuizResponse])
+async def generate_quiz_batch(
+    request: QuizBatchCreate,
+    user_id: int = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Generate several quizzes (e.g. a week's worth for Quiz Bomber) in one
+    round trip: specs share one plan context and model call per batch."""
+    specs = request.quizzes
+    plan_summary = await load_plan_summary(
+        db,
+        user_id,
+        min(spec.week_start for spec in specs),
+        max(spec.week_end for spec in specs),
+    )
+    await db.close()
+
+    quizzes = await ai_service.generate_quiz_batch(
+        specs, plan_context=plan_summary, fresh=request.fresh, user_id=user_id
+    )
+
+    rows = [
+        {
+            "user_id": user_id,
+            "topic": spec.topic,
+            "difficulty": spec.difficulty,
+            "questions": quiz.model_dump()["questions"],
+        }
+        for spec, quiz in zip(specs, quizzes)
+    ]
+    # Serialize before commit expires the returned rows
+    created = [QuizResponse.model_validate(q) for q in await insert_quizzes(db, rows)]
+    await db.commit()
+    return created
+
+
 @app.post("/ai/video-summary")
-async def get_video_summary(request: VideoSummaryRequest):
+async def get_video_summary(
+    request: VideoSummaryRequest, user_id: int = Depends(get_current_user_id)
+):
     summary = await ai_service.generate_video_summary(
-        request.video_title, request.video_description
+        request.video_title,
+        request.video_description or "",
+        request.transcript or "",
+        user_id=user_id,
     )
     return {"summary": summary}
 
 
 @app.post("/ai/answer-question")
-async def answer_question(request: VideoQuestionRequest):
+async def answer_question(
+    request: VideoQuestionRequest, user_id: int = Depends(get_current_user_id)
+):
     answer = await ai_service.answer_contextual_question(
-        request.question, request.video_context
+        request.question, request.video_context, user_id=user_id
     )
     return {"answer": answer}
 
 
+# Background jobs: submit returns at once, poll /jobs/{id} for the result
+
+
+@app.post(
+    "/jobs/roadmap",
+    response_model=JobResponse,
+    status_code=status.HTTP_202_ACCEPTED,
+)
+async def submit_roadmap_job(
+    request: RoadmapRequest,
+    user_id: int = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_async_db),
+):
+    return await enqueue(db, user_id, "roadmap", request.model_dump())
+
+
+@app.post(
+    "/jobs/quiz",
+    response_model=JobResponse,
+    status_code=status.HTTP_202_ACCEPTED,
+)
+async def submit_quiz_job(
+    request: QuizCreate,
+    user_id: int = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_async_db),
+):
+    return await enqueue(db, user_id, "quiz", request.model_dump())
+
+
+@app.get("/jobs/{job_id}", response_model=JobResponse)
+async def get_job(
+    job_id: int,
+    user_id: int = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_async_db),
+):
+    job = await db.scalar(
+        select(AIJob).where(AIJob.id == job_id, AIJob.user_id == user_id)
+    )
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
 # Dashboard endpoint
 @app.get("/dashboard", response_model=DashboardData)
 async def get_dashboard(
-    current_user: User = Depends(get_current_user), db: Session = Depends(get_db)
+    current_user: AuthUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    learning_goal = (
-        db.query(LearningGoal).filter(LearningGoal.user_id == current_user.id).first()
+    learning_goal = await db.scalar(
+        select(LearningGoal).where(LearningGoal.user_id == current_user.id)
     )
     # Return all tasks ordered by week then created time
     recent_tasks = (
-        db.query(Task)
-        .filter(Task.user_id == current_user.id)
-        .order_by(Task.week.asc(), Task.created_at.asc())
-        .all()
-    )
+        await db.scalars(
+            select(Task)
+            .where(Task.user_id == current_user.id, counted_tasks)
+            .order_by(Task.week.asc(), Task.created_at.asc())
+        )
+    ).all()
     progress_data = (
-        db.query(Progress)
-        .filter(Progress.user_id == current_user.id)
-        .order_by(Progress.date.desc())
-        .limit(30)
-        .all()
-    )
+        await db.scalars(
+            select(Progress)
+            .where(Progress.user_id == current_user.id)
+            .order_by(Progress.date.desc())
+            .limit(30)
+        )
+    ).all()
     upcoming_schedule = (
-        db.query(Schedule)
-        .filter(Schedule.user_id == current_user.id)
-        .order_by(Schedule.date.asc())
-        .limit(7)
-        .all()
-    )
+        await db.scalars(
+            select(Schedule)
+            .where(Schedule.user_id == current_user.id)
+            .order_by(Schedule.date.asc())
+            .limit(7)
+        )
+    ).all()
 
     return DashboardData(
         user=current_user,
@@ -266,24 +525,211 @@ async def get_dashboard(
     )
 
 
+@app.get("/dashboard/summary", response_model=DashboardSummary)
+async def get_dashboard_summary(
+    week: Optional[int] = None,
+    current_user: AuthUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Dashboard with per-week completion read from the week rollups.
+
+    Migration 0008 fills the rollups from existing tasks, so the counts match
+    a GROUP BY over ``tasks`` from the moment the upgrade finishes.
+
+    Only the tasks of one week are returned (``week`` or, by default, the
+    earliest week that still has open tasks), so the payload no longer grows
+    with the user's task history.
+    """
+    user_id = current_user.id
+    if week is not None:
+        week_filter = Task.week == week
+    else:
+        first_open_week = (
+            select(func.min(WeekRollup.week))
+            .where(
+                WeekRollup.user_id == user_id,
+                WeekRollup.week != rollups.NO_WEEK,
+                WeekRollup.completed < WeekRollup.total,
+            )
+            .scalar_subquery()
+        )
+        week_filter = Task.week == first_open_week
+
+    async def load_goal(session):
+        return await session.scalar(
+            select(LearningGoal).where(LearningGoal.user_id == user_id)
+        )
+
+    async def load_week_progress(session):
+        rows = await session.scalars(
+            select(WeekRollup)
+            .where(WeekRollup.user_id == user_id, WeekRollup.total > 0)
+            .order_by(WeekRollup.week.asc())
+        )
+        return [
+            WeekProgress(
+                week=None if r.week == rollups.NO_WEEK else r.week,
+                total=r.total,
+                completed=r.completed,
+            )
+            for r in rows
+        ]
+
+    async def load_week_tasks(session):
+        return (
+            await session.scalars(
+                select(Task)
+                .where(Task.user_id == user_id, counted_tasks, week_filter)
+                .order_by(Task.created_at.asc(), Task.id.asc())
+            )
+        ).all()
+
+    async def load_progress(session):
+        return (
+            await session.scalars(
+                select(Progress)
+                .where(Progress.user_id == user_id)
+                .order_by(Progress.date.desc())
+                .limit(30)
+            )
+        ).all()
+
+    async def load_schedule(session):
+        return (
+            await session.scalars(
+                select(Schedule)
+                .where(Schedule.user_id == user_id)
+                .order_by(Schedule.date.asc())
+                .limit(7)
+            )
+        ).all()
+
+    (
+        learning_goal,
+        week_progress,
+        week_tasks,
+        progress_data,
+        upcoming_schedule,
+    ) = await run_concurrently(
+        db,
+        load_goal,
+        load_week_progress,
+        load_week_tasks,
+        load_progress,
+        load_schedule,
+    )
+
+    current_week = week
+    if current_week is None:
+        current_week = next(
+            (
+                wp.week
+                for wp in week_progress
+                if wp.week is not None and wp.completed < wp.total
+            ),
+            None,
+        )
+
+    return DashboardSummary(
+        user=current_user,
+        learning_goal=learning_goal,
+        current_week=current_week,
+        current_week_tasks=week_tasks,
+        week_progress=week_progress,
+        total_tasks=sum(wp.total for wp in week_progress),
+        completed_tasks=sum(wp.completed for wp in week_progress),
+        progress_data=progress_data,
+        upcoming_schedule=upcoming_schedule,
+    )
+
+
+@app.get("/stats/activity", response_model=ActivitySummary)
+async def get_activity(
+    days: int = Query(365, ge=1, le=366),
+    user_id: int = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Streaks and per-day activity for the heatmap, straight from rollups."""
+    today = rollups.utc_day(None)
+    since = today - timedelta(days=days - 1)
+
+    async def load_streak(session):
+        return await session.get(UserStreak, user_id)
+
+    async def load_days(session):
+        return (
+            await session.scalars(
+                select(DailyActivity)
+                .where(
+                    DailyActivity.user_id == user_id,
+                    DailyActivity.day >= since,
+                    DailyActivity.tasks_completed + DailyActivity.notes_created > 0,
+                )
+                .order_by(DailyActivity.day.asc())
+            )
+        ).all()
+
+    streak, activity = await run_concurrently(db, load_streak, load_days)
+
+    current = longest = 0
+    last_active_day = None
+    if streak is not None:
+        longest = streak.longest
+        last_active_day = streak.last_active_day
+        # A run only stays current while yesterday or today was active
+        if last_active_day and last_active_day >= today - timedelta(days=1):
+            current = streak.current
+
+    return ActivitySummary(
+        current_streak=current,
+        longest_streak=longest,
+        last_active_day=last_active_day,
+        days=[
+            ActivityDay(
+                day=row.day,
+                tasks_completed=row.tasks_completed,
+                notes_created=row.notes_created,
+            )
+            for row in activity
+        ],
+    )
+
+
 # Task endpoints
 @app.get("/tasks", response_model=List[TaskResponse])
 async def get_tasks(
-    current_user: User = Depends(get_current_user), db: Session = Depends(get_db)
+    request: Request,
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    user_id: int = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    return db.query(Task).filter(Task.user_id == current_user.id).all()
+    page = await fetch_page(
+        db,
+        Task,
+        user_id,
+        TaskResponse,
+        limit=limit,
+        cursor=cursor,
+        fields=fields,
+        criterion=counted_tasks,
+    )
+    return page_response(request, response, page)
 
 
 @app.post("/tasks", response_model=TaskResponse)
 async def create_task(
     task: TaskCreate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    user_id: int = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    db_task = Task(user_id=current_user.id, **task.model_dump())
+    db_task = Task(user_id=user_id, **task.model_dump())
     db.add(db_task)
-    db.commit()
-    db.refresh(db_task)
+    await rollups.task_created(db, db_task)
+    await db.commit()
+    await db.refresh(db_task)
     return db_task
 
 
@@ -291,89 +737,217 @@ async def create_task(
 async def update_task(
     task_id: int,
     task_update: TaskUpdate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    user_id: int = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    task = (
-        db.query(Task)
-        .filter(Task.id == task_id, Task.user_id == current_user.id)
-        .first()
+    task = await db.scalar(
+        select(Task).where(Task.id == task_id, Task.user_id == user_id, counted_tasks)
     )
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
 
     update_data = task_update.model_dump(exclude_unset=True)
+    if update_data.get("completed") is not None:
+        await rollups.task_completion_changed(db, task, update_data["completed"])
     for field, value in update_data.items():
         setattr(task, field, value)
 
-    db.commit()
-    db.refresh(task)
+    await db.commit()
+    await db.refresh(task)
     return task
 
 
 @app.delete("/tasks/{task_id}")
 async def delete_task(
     task_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    user_id: int = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    task = (
-        db.query(Task)
-        .filter(Task.id == task_id, Task.user_id == current_user.id)
-        .first()
+    task = await db.scalar(
+        select(Task).where(Task.id == task_id, Task.user_id == user_id, counted_tasks)
     )
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
 
-    db.delete(task)
-    db.commit()
+    await rollups.task_deleted(db, task)
+    await db.delete(task)
+    await db.commit()
     return {"message": "Task deleted successfully"}
 
 
+@app.post("/tasks/bulk", response_model=TaskBulkResponse)
+async def bulk_update_tasks(
+    request: TaskBulkRequest,
+    user_id: int = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Complete, reopen or delete many tasks in one transaction.
+
+    Each action is a single ``UPDATE``/``DELETE ... RETURNING`` over all of
+    its task ids, or over every task of ``week``. With ``week`` only the
+    tasks that changed are listed.
+    """
+    if request.operations is not None:
+        if request.action is not None or request.week is not None:
+            raise HTTPException(
+                status_code=400, detail="Send either operations or action and week"
+            )
+        # Later operations on the same task win
+        actions = {op.id: op.action for op in request.operations}
+        criteria = {
+            action: Task.id.in_([i for i, a in actions.items() if a == action])
+            for action in ("complete", "uncomplete", "delete")
+            if action in actions.values()
+        }
+    elif request.action is not None and request.week is not None:
+        actions = None
+        criteria = {request.action: Task.week == request.week}
+    else:
+        raise HTTPException(
+            status_code=400, detail="Send either operations or action and week"
+        )
+
+    updated = {}
+    deleted_ids = []
+    for action, criterion in criteria.items():
+        if action == "delete":
+            deleted_ids = await delete_tasks_returning(db, user_id, criterion)
+        else:
+            tasks = await set_tasks_completed(
+                db, user_id, action == "complete", criterion
+            )
+            updated.update({t.id: TaskResponse.model_validate(t) for t in tasks})
+
+    if actions is None:
+        results = [
+            TaskBulkResult(id=i, action=request.action, status="updated", task=t)
+            for i, t in updated.items()
+        ] + [
+            TaskBulkResult(id=i, action=request.action, status="deleted")
+            for i in deleted_ids
+        ]
+    else:
+        # Ids the UPDATEs skipped are either already in that state or not ours
+        skipped = [i for i, a in actions.items() if a != "delete" and i not in updated]
+        unchanged = {}
+        if skipped:
+            rows = await db.scalars(
+                select(Task).where(
+                    Task.user_id == user_id,
+                    counted_tasks,
+                    Task.id.in_(skipped),
+                )
+            )
+            unchanged = {t.id: TaskResponse.model_validate(t) for t in rows}
+        deleted = set(deleted_ids)
+        results = []
+        for i, action in actions.items():
+            if i in updated:
+                result = TaskBulkResult(
+                    id=i, action=action, status="updated", task=updated[i]
+                )
+            elif i in unchanged:
+                result = TaskBulkResult(
+                    id=i, action=action, status="unchanged", task=unchanged[i]
+                )
+            elif i in deleted:
+                result = TaskBulkResult(id=i, action=action, status="deleted")
+            else:
+                result = TaskBulkResult(id=i, action=action, status="not_found")
+            results.append(result)
+
+    await db.commit()
+    return TaskBulkResponse(
+        results=results, updated=len(updated), deleted=len(deleted_ids)
+    )
+
+
 # Schedule endpoints
 @app.get("/schedule", response_model=List[ScheduleResponse])
 async def get_schedule(
-    current_user: User = Depends(get_current_user), db: Session = Depends(get_db)
+    request: Request,
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    user_id: int = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    return db.query(Schedule).filter(Schedule.user_id == current_user.id).all()
+    page = await fetch_page(
+        db,
+        Schedule,
+        user_id,
+        ScheduleResponse,
+        limit=limit,
+        cursor=cursor,
+        fields=fields,
+    )
+    return page_response(request, response, page)
 
 
 @app.post("/schedule", response_model=ScheduleResponse)
 async def create_schedule(
     schedule: ScheduleCreate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    user_id: int = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    db_schedule = Schedule(user_id=current_user.id, **schedule.model_dump())
+    db_schedule = Schedule(user_id=user_id, **schedule.model_dump())
     db.add(db_schedule)
-    db.commit()
-    db.refresh(db_schedule)
+    await db.commit()
+    await db.refresh(db_schedule)
     return db_schedule
 
 
 # Notes endpoints
 @app.get("/notes", response_model=List[NoteResponse])
 async def get_notes(
-    current_user: User = Depends(get_current_user), db: Session = Depends(get_db)
+    request: Request,
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    user_id: int = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    return (
-        db.query(Note)
-        .filter(Note.user_id == current_user.id)
-        .order_by(Note.created_at.desc())
-        .all()
+    page = await fetch_page(
+        db,
+        Note,
+        user_id,
+        NoteResponse,
+        limit=limit,
+        cursor=cursor,
+        fields=fields,
+        newest_first=True,
     )
+    return page_response(request, response, page)
+
+
+@app.get("/notes/search", response_model=List[NoteSearchHit])
+async def search_user_notes(
+    request: Request,
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(20, ge=1, le=SEARCH_MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    user_id: int = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Notes matching ``q``, best match first, with highlighted snippets."""
+    page = await search_notes(db, user_id, q, limit=limit, cursor=cursor)
+    return page_response(request, response, page)
 
 
 @app.post("/notes", response_model=NoteResponse)
 async def create_note(
     note: NoteCreate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    user_id: int = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    db_note = Note(user_id=current_user.id, **note.model_dump())
+    db_note = Note(user_id=user_id, **note.model_dump())
     db.add(db_note)
-    db.commit()
-    db.refresh(db_note)
+    await rollups.note_created(db, db_note)
+    await db.commit()
+    await db.refresh(db_note)
     return db_note
 
 
@@ -381,13 +955,11 @@ async def create_note(
 async def update_note(
     note_id: int,
     note_update: NoteUpdate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    user_id: int = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    note = (
-        db.query(Note)
-        .filter(Note.id == note_id, Note.user_id == current_user.id)
-        .first()
+    note = await db.scalar(
+        select(Note).where(Note.id == note_id, Note.user_id == user_id)
     )
     if not note:
         raise HTTPException(status_code=404, detail="Note not found")
@@ -396,48 +968,62 @@ async def update_note(
     for field, value in update_data.items():
         setattr(note, field, value)
 
-    db.commit()
-    db.refresh(note)
+    await db.commit()
+    await db.refresh(note)
     return note
 
 
 @app.delete("/notes/{note_id}")
 async def delete_note(
     note_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    user_id: int = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    note = (
-        db.query(Note)
-        .filter(Note.id == note_id, Note.user_id == current_user.id)
-        .first()
+    note = await db.scalar(
+        select(Note).where(Note.id == note_id, Note.user_id == user_id)
     )
     if not note:
         raise HTTPException(status_code=404, detail="Note not found")
 
-    db.delete(note)
-    db.commit()
+    await rollups.note_deleted(db, note)
+    await db.delete(note)
+    await db.commit()
     return {"message": "Note deleted successfully"}
 
 
 # Playlist endpoints
 @app.get("/playlists", response_model=List[PlaylistResponse])
 async def get_playlists(
-    current_user: User = Depends(get_current_user), db: Session = Depends(get_db)
+    request: Request,
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    user_id: int = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    return db.query(Playlist).filter(Playlist.user_id == current_user.id).all()
+    page = await fetch_page(
+        db,
+        Playlist,
+        user_id,
+        PlaylistResponse,
+        limit=limit,
+        cursor=cursor,
+        fields=fields,
+    )
+    return page_response(request, response, page)
 
 
 @app.post("/playlists", response_model=PlaylistResponse)
 async def create_playlist(
     playlist: PlaylistCreate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    user_id: int = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    db_playlist = Playlist(user_id=current_user.id, **playlist.model_dump())
+    db_playlist = Playlist(user_id=user_id, **playlist.model_dump())
     db.add(db_playlist)
-    db.commit()
-    db.refresh(db_playlist)
+    await db.commit()
+    await db.refresh(db_playlist)
     return db_playlist
 
 
@@ -445,66 +1031,67 @@ async def create_playlist(
 @app.post("/progress", response_model=ProgressResponse)
 async def create_progress(
     progress: ProgressCreate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    user_id: int = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_async_db),
+):
+    # Create or overwrite the day's row in one statement
+    (saved,) = await upsert_progress(db, user_id, [progress.model_dump()])
+    response = ProgressResponse.model_validate(saved)
+    await db.commit()
+    return response
+
+
+@app.post("/progress/batch", response_model=List[ProgressResponse])
+async def create_progress_batch(
+    request: ProgressBatchCreate,
+    user_id: int = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    # Check if progress for this date already exists
-    existing = (
-        db.query(Progress)
-        .filter(Progress.user_id == current_user.id, Progress.date == progress.date)
-        .first()
+    """Sync many days at once (e.g. an offline client catching up)."""
+    saved = await upsert_progress(
+        db, user_id, [entry.model_dump() for entry in request.entries]
     )
-
-    if existing:
-        # Update existing progress
-        for field, value in progress.model_dump().items():
-            setattr(existing, field, value)
-        db.commit()
-        db.refresh(existing)
-        return existing
-    else:
-        # Create new progress
-        db_progress = Progress(user_id=current_user.id, **progress.model_dump())
-        db.add(db_progress)
-        db.commit()
-        db.refresh(db_progress)
-        return db_progress
+    response = [ProgressResponse.model_validate(row) for row in saved]
+    await db.commit()
+    return response
 
 
 # Profile endpoints
 @app.get("/profile", response_model=UserResponse)
-async def get_profile(current_user: User = Depends(get_current_user)):
+async def get_profile(current_user: AuthUser = Depends(get_current_user)):
     return current_user
 
 
 @app.put("/profile", response_model=UserResponse)
 async def update_profile(
     name: Optional[str] = None,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    current_user: AuthUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    if name is not None:
-        current_user.name = name
-        db.commit()
-        db.refresh(current_user)
-    return current_user
+    if name is None:
+        return current_user
+    user = await db.get(User, current_user.id)
+    if user is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    user.name = name
+    await db.commit()
+    await db.refresh(user)
+    invalidate_user(user.id)
+    return user
 
 
 @app.delete("/profile")
 async def delete_account(
-    current_user: User = Depends(get_current_user), db: Session = Depends(get_db)
+    user_id: int = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    # Delete all user data
-    db.query(Progress).filter(Progress.user_id == current_user.id).delete()
-    db.query(Note).filter(Note.user_id == current_user.id).delete()
-    db.query(Playlist).filter(Playlist.user_id == current_user.id).delete()
-    db.query(Schedule).filter(Schedule.user_id == current_user.id).delete()
-    db.query(Task).filter(Task.user_id == current_user.id).delete()
-    db.query(LearningGoal).filter(LearningGoal.user_id == current_user.id).delete()
-    db.query(Quiz).filter(Quiz.user_id == current_user.id).delete()
-    db.query(User).filter(User.id == current_user.id).delete()
-
-    db.commit()
+    # Small accounts go at once through ON DELETE CASCADE; large ones are
+    # disabled now and purged in the background
+    if await remove_account(db, user_id):
+        await db.commit()
+    else:
+        await enqueue(db, user_id, "purge_account", {})  # commits
+    invalidate_user(user_id, revoke=True)
     return {"message": "Account deleted successfully"}
 
 
@@ -0,0 +1,135 @@
+from __future__ import annotations
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Sequence
+import threading
+import time
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+DEFAULT_BUCKETS = (
+    0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60
+)
+
+
+class Histogram:
+    """Cumulative bucketed histogram of durations in seconds."""
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS) -> None:
+        self.buckets = tuple(buckets)
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._lock = threading.Lock()
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        with self._lock:
+            self.count += 1
+            self.sum += value
+            self.max = max(self.max, value)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    self._counts[i] += 1
+                    break
+            else:
+                self._counts[-1] += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            cumulative: Dict[str, int] = {}
+            running = 0
+            for bound, n in zip(self.buckets, self._counts):
+                running += n
+                cumulative[f"le_{bound:g}"] = running
+            cumulative["le_inf"] = self.count
+            return {
+                "count": self.count,
+                "sum": round(self.sum, 6),
+                "max": round(self.max, 6),
+                "buckets": cumulative,
+            }
+
+
+class PoolTelemetry:
+    """Connection pool and session metrics fed by SQLAlchemy events."""
+
+    def __init__(self) -> None:
+        self.checkout_wait = Histogram()
+        self.connection_hold = Histogram()
+        self.session_hold: Dict[str, Histogram] = defaultdict(Histogram)
+        self.checkouts = 0
+        self.checkout_timeouts = 0
+        self.connects = 0
+        self.invalidations = 0
+        self._pools: List[tuple] = []
+
+    def instrument(self, label: str, sync_engine) -> None:
+        pool = sync_engine.pool
+        self._pools.append((label, pool))
+        event.listen(pool, "connect", self._on_connect)
+        event.listen(pool, "checkout", self._on_checkout)
+        event.listen(pool, "checkin", self._on_checkin)
+        event.listen(pool, "invalidate", self._on_invalidate)
+
+    def _on_connect(self, dbapi_connection, connection_record) -> None:
+        self.connects += 1
+
+    def _on_checkout(self, dbapi_connection, connection_record, proxy) -> None:
+        self.checkouts += 1
+        connection_record.info["checked_out_at"] = time.perf_counter()
+
+    def _on_checkin(self, dbapi_connection, connection_record) -> None:
+        started = connection_record.info.pop("checked_out_at", None)
+        if started is not None:
+            self.connection_hold.observe(time.perf_counter() - started)
+
+    def _on_invalidate(self, dbapi_connection, connection_record, exception) -> None:
+        self.invalidations += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        pools = {}
+        for label, pool in self._pools:
+            stats: Dict[str, Optional[int]] = {"status": pool.status()}
+            if hasattr(pool, "checkedout"):
+                stats.update(
+                    size=pool.size(),
+                    checked_out=pool.checkedout(),
+                    checked_in=pool.checkedin(),
+                    overflow=pool.overflow(),
+                )
+            pools[label] = stats
+        return {
+            "pools": pools,
+            "checkouts": self.checkouts,
+            "checkout_timeouts": self.checkout_timeouts,
+            "connects": self.connects,
+            "invalidations": self.invalidations,
+            "checkout_wait_seconds": self.checkout_wait.snapshot(),
+            "connection_hold_seconds": self.connection_hold.snapshot(),
+            "session_hold_seconds": {
+                endpoint: hist.snapshot()
+                for endpoint, hist in sorted(self.session_hold.items())
+            },
+        }
+
+
+pool_telemetry = PoolTelemetry()
+
+
+# Session hold time is measured from the moment a session begins a transaction
+# on a pooled connection until that transaction ends, attributed to the
+# endpoint recorded in session.info by get_async_db.
+@event.listens_for(Session, "after_begin")
+def _session_began(session, transaction, connection) -> None:
+    session.info.setdefault("hold_started", time.perf_counter())
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _session_transaction_ended(session, transaction) -> None:
+    if transaction.parent is not None:
+        return
+    started = session.info.pop("hold_started", None)
+    if started is not None:
+        endpoint = session.info.get("endpoint", "unknown")
+        pool_telemetry.session_hold[endpoint].observe(time.perf_counter() - started)
@@ -8,6 +8,7 @@ from sqlalchemy import (
     ForeignKey,
     JSON,
     Date,
+    Index,
 )
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -22,26 +23,36 @@ class User(Base):
     email = Column(String, unique=True, index=True, nullable=False)
     hashed_password = Column(String, nullable=False)
     name = Column(String, nullable=True)
+    token_version = Column(Integer, nullable=False, default=0, server_default="0")
+    # Set when the account is deleted but its data is still being purged
+    deleted_at = Column(DateTime(timezone=True), nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
-    # Relationships
-    tasks = relationship("Task", back_populates="user")
-    schedules = relationship("Schedule", back_populates="user")
-    notes = relationship("Note", back_populates="user")
-    playlists = relationship("Playlist", back_populates="user")
-    progress = relationship("Progress", back_populates="user")
-    learning_goal = relationship("LearningGoal", back_populates="user", uselist=False)
+    # Relationships; child rows go with the user through ON DELETE CASCADE
+    tasks = relationship("Task", back_populates="user", passive_deletes=True)
+    schedules = relationship("Schedule", back_populates="user", passive_deletes=True)
+    notes = relationship("Note", back_populates="user", passive_deletes=True)
+    playlists = relationship("Playlist", back_populates="user", passive_deletes=True)
+    progress = relationship("Progress", back_populates="user", passive_deletes=True)
+    learning_goal = relationship(
+        "LearningGoal", back_populates="user", uselist=False, passive_deletes=True
+    )
 
 
 class LearningGoal(Base):
     __tablename__ = "learning_goals"
+    __table_args__ = (Index("ix_learning_goals_user_id", "user_id"),)
 
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    user_id = Column(
+        Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False
+    )
     topic = Column(String, nullable=False)
     details = Column(Text, nullable=True)
     roadmap = Column(JSON, nullable=True)  # Store the 24-week roadmap
+    # {"<week>": condensed line}, rebuilt whenever the roadmap is saved
+    week_summaries = Column(JSON, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
@@ -50,16 +61,24 @@ class LearningGoal(Base):
 
 class Task(Base):
     __tablename__ = "tasks"
+    __table_args__ = (
+        Index("ix_tasks_user_week_created", "user_id", "week", "created_at"),
+        Index("ix_tasks_user_created_id", "user_id", "created_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    user_id = Column(
+        Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False
+    )
     title = Column(String, nullable=False)
     description = Column(Text, nullable=True)
     quadrant = Column(
         String, nullable=True
     )  # removed usage; kept nullable for legacy rows
     week = Column(Integer, nullable=True)  # Week number in the roadmap
+    source = Column(String, nullable=True)  # "roadmap" for generated tasks
     completed = Column(Boolean, default=False)
+    completed_at = Column(DateTime(timezone=True), nullable=True)
     due_date = Column(Date, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
@@ -69,12 +88,20 @@ class Task(Base):
 
 class Schedule(Base):
     __tablename__ = "schedules"
+    __table_args__ = (
+        Index("ix_schedules_user_date", "user_id", "date"),
+        Index("ix_schedules_user_created_id", "user_id", "created_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    user_id = Column(
+        Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False
+    )
     day_of_week = Column(String, nullable=False)  # Monday, Tuesday, etc.
     time_slot = Column(String, nullable=False)  # e.g., "09:00-10:00"
-    task_id = Column(Integer, ForeignKey("tasks.id"), nullable=True)
+    task_id = Column(
+        Integer, ForeignKey("tasks.id", ondelete="SET NULL"), nullable=True
+    )
     custom_task = Column(String, nullable=True)
     date = Column(Date, nullable=True)  # For specific date scheduling
     created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -84,10 +111,17 @@ class Schedule(Base):
 
 
 class Note(Base):
+    # notes.search_vector (Postgres) and the notes_fts FTS5 table (SQLite) come
+    # from migration 0009 and are only used by app.search
     __tablename__ = "notes"
+    __table_args__ = (
+        Index("ix_notes_user_created_id", "user_id", "created_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    user_id = Column(
+        Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False
+    )
     title = Column(String, nullable=False)
     content = Column(Text, nullable=False)
     source = Column(String, nullable=True)  # "youtube", "manual", etc.
@@ -100,9 +134,14 @@ class Note(Base):
 
 class Playlist(Base):
     __tablename__ = "playlists"
+    __table_args__ = (
+        Index("ix_playlists_user_created_id", "user_id", "created_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    user_id = Column(
+        Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False
+    )
     title = Column(String, nullable=False)
     description = Column(Text, nullable=True)
     youtube_playlist_id = Column(String, nullable=False)
@@ -115,9 +154,12 @@ class Playlist(Base):
 
 class Progress(Base):
     __tablename__ = "progress"
+    __table_args__ = (Index("uq_progress_user_date", "user_id", "date", unique=True),)
 
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    user_id = Column(
+        Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False
+    )
     date = Column(Date, nullable=False)
     tasks_completed = Column(Integer, default=0)
     study_hours = Column(Integer, default=0)
@@ -129,12 +171,88 @@ class Progress(Base):
 
 class Quiz(Base):
     __tablename__ = "quizzes"
+    __table_args__ = (Index("ix_quizzes_user_created", "user_id", "created_at"),)
 
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    user_id = Column(
+        Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False
+    )
     topic = Column(String, nullable=False)
     difficulty = Column(String, nullable=False)
     questions = Column(JSON, nullable=False)  # Store the generated questions
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
     user = relationship("User")
+
+
+class AICacheEntry(Base):
+    __tablename__ = "ai_cache"
+
+    key = Column(String(64), primary_key=True)  # sha256 of model/prompt/schema
+    model = Column(String, nullable=False)
+    value = Column(Text, nullable=False)
+    size_bytes = Column(Integer, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
+
+
+class AIJob(Base):
+    __tablename__ = "ai_jobs"
+    __table_args__ = (
+        Index("ix_ai_jobs_state_run_after", "state", "run_after"),
+        Index("ix_ai_jobs_user_state", "user_id", "state"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(
+        Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False
+    )
+    kind = Column(String, nullable=False)  # "roadmap", "quiz"
+    payload = Column(JSON, nullable=False)  # the original request body
+    state = Column(String, nullable=False, default="queued")
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False)
+    run_after = Column(DateTime(timezone=True), nullable=False)
+    locked_at = Column(DateTime(timezone=True), nullable=True)
+    result = Column(JSON, nullable=True)
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+    user = relationship("User")
+
+
+# Rollups, maintained by app.rollups alongside every task/note write
+
+
+class DailyActivity(Base):
+    __tablename__ = "daily_activity"
+
+    user_id = Column(
+        Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True
+    )
+    day = Column(Date, primary_key=True)  # UTC calendar day
+    tasks_completed = Column(Integer, nullable=False, default=0)
+    notes_created = Column(Integer, nullable=False, default=0)
+
+
+class WeekRollup(Base):
+    __tablename__ = "week_rollups"
+
+    user_id = Column(
+        Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True
+    )
+    week = Column(Integer, primary_key=True)  # 0 for tasks without a week
+    total = Column(Integer, nullable=False, default=0)
+    completed = Column(Integer, nullable=False, default=0)
+
+
+class UserStreak(Base):
+    __tablename__ = "user_streaks"
+
+    user_id = Column(
+        Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True
+    )
+    current = Column(Integer, nullable=False, default=0)
+    longest = Column(Integer, nullable=False, default=0)
+    last_active_day = Column(Date, nullable=True)
@@ -0,0 +1,141 @@
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, List, Optional, Type
+import base64
+import json
+import os
+
+from fastapi import HTTPException, Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from sqlalchemy import DateTime, func, literal, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+MAX_PAGE_SIZE = int(os.getenv("LIST_MAX_PAGE_SIZE", "500"))
+DEFAULT_PAGE_SIZE = min(
+    int(os.getenv("LIST_DEFAULT_PAGE_SIZE", str(MAX_PAGE_SIZE))), MAX_PAGE_SIZE
+)
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    raw = json.dumps([created_at.isoformat(), row_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, row_id = json.loads(raw)
+        return datetime.fromisoformat(created_at), int(row_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+# SQLite keeps timestamps as text, and rows hold both CURRENT_TIMESTAMP's
+# "YYYY-MM-DD HH:MM:SS" and SQLAlchemy's "YYYY-MM-DD HH:MM:SS.ffffff", which
+# do not compare correctly as strings. Sort and compare on one format there.
+_SQLITE_SORTABLE = "%Y-%m-%d %H:%M:%f"
+
+
+def _sortable_timestamp(db: AsyncSession, value):
+    if db.bind.dialect.name == "sqlite":
+        return func.strftime(_SQLITE_SORTABLE, value)
+    return value
+
+
+@dataclass
+class Page:
+    items: List[Any]
+    next_cursor: Optional[str]
+    projected: bool
+
+
+async def fetch_page(
+    db: AsyncSession,
+    model,
+    user_id: int,
+    response_model: Type[BaseModel],
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    newest_first: bool = False,
+    criterion=None,
+) -> Page:
+    """Keyset-paginate a user's rows on (created_at, id).
+
+    Without ``limit`` a page holds ``DEFAULT_PAGE_SIZE`` rows; no page is
+    larger than ``MAX_PAGE_SIZE``. ``fields`` is a comma-separated subset of the
+    response model's fields; only those columns are selected. ``criterion``
+    further restricts the rows.
+    """
+    projected = fields is not None
+    if projected:
+        allowed = [
+            name for name in response_model.model_fields if hasattr(model, name)
+        ]
+        requested = [f.strip() for f in fields.split(",") if f.strip()]
+        unknown = sorted(set(requested) - set(allowed))
+        if unknown or not requested:
+            raise HTTPException(
+                status_code=400,
+                detail=f"fields must be a subset of: {', '.join(allowed)}",
+            )
+        output = list(dict.fromkeys(["id", *requested]))
+        columns = list(dict.fromkeys([*output, "created_at"]))
+        stmt = select(*(getattr(model, name) for name in columns))
+    else:
+        stmt = select(model)
+
+    created_at = _sortable_timestamp(db, model.created_at)
+    key = tuple_(created_at, model.id)
+    stmt = stmt.where(model.user_id == user_id)
+    if criterion is not None:
+        stmt = stmt.where(criterion)
+    if cursor is not None:
+        after_created_at, after_id = decode_cursor(cursor)
+        after = tuple_(
+            _sortable_timestamp(
+                db, literal(after_created_at, DateTime(timezone=True))
+            ),
+            literal(after_id),
+        )
+        stmt = stmt.where(key < after if newest_first else key > after)
+    if newest_first:
+        stmt = stmt.order_by(created_at.desc(), model.id.desc())
+    else:
+        stmt = stmt.order_by(created_at.asc(), model.id.asc())
+
+    page_size = min(limit or DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE)
+    stmt = stmt.limit(page_size + 1)
+
+    if projected:
+        rows = (await db.execute(stmt)).mappings().all()
+    else:
+        rows = (await db.scalars(stmt)).all()
+
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        last = rows[-1]
+        if projected:
+            next_cursor = encode_cursor(last["created_at"], last["id"])
+        else:
+            next_cursor = encode_cursor(last.created_at, last.id)
+
+    if projected:
+        rows = [{name: row[name] for name in output} for row in rows]
+    return Page(items=rows, next_cursor=next_cursor, projected=projected)
+
+
+def page_response(request: Request, response: Response, page: Page):
+    headers = {}
+    if page.next_cursor:
+        next_url = request.url.include_query_params(cursor=page.next_cursor)
+        headers["X-Next-Cursor"] = page.next_cursor
+        headers["Link"] = f'<{next_url}>; rel="next"'
+    if page.projected:
+        # Partial rows do not satisfy the endpoint's response_model
+        return JSONResponse(content=jsonable_encoder(page.items), headers=headers)
+    response.headers.update(headers)
+    return page.items
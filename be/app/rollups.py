@@ -0,0 +1,398 @@
+"""Per-user activity rollups kept in step with task and note writes.
+
+``daily_activity`` counts tasks completed and notes created per UTC day,
+``week_rollups`` counts total/completed tasks per roadmap week and
+``user_streaks`` holds the current and longest run of active days. Writers
+call the ``task_*``/``note_*`` hooks (or their set-based ``tasks_*`` forms)
+in the same transaction as the change itself.
+
+``daily_activity`` is history: when a regenerated roadmap replaces the old
+one's tasks, completions already counted stay on their day. Recounting from
+the tasks that remain therefore gives a lower bound for a day's completions,
+which ``check`` accepts and ``rebuild`` never goes below.
+
+Rebuild everything from the raw tables, or only verify it, with::
+
+    python -m app.rollups rebuild [--user ID]
+    python -m app.rollups check [--user ID]
+"""
+
+from collections import defaultdict
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+import argparse
+import asyncio
+import sys
+
+from sqlalchemy import delete, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .database import session_scope, upsert_insert
+from .models import DailyActivity, Note, Task, User, UserStreak, WeekRollup
+from .task_sources import counted_tasks
+
+NO_WEEK = 0  # week_rollups key for tasks without a roadmap week
+
+
+def utc_day(moment: Optional[datetime]) -> date:
+    if moment is None:
+        return datetime.now(timezone.utc).date()
+    if moment.tzinfo is None:  # SQLite hands back naive UTC timestamps
+        return moment.date()
+    return moment.astimezone(timezone.utc).date()
+
+
+async def _bump(db: AsyncSession, model, keys: dict, deltas: dict) -> Tuple:
+    """Add ``deltas`` to the counters at ``keys``; returns the new values."""
+    stmt = upsert_insert(db, model).values(**keys, **deltas)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=list(keys),
+        set_={
+            name: getattr(model, name) + getattr(stmt.excluded, name)
+            for name in deltas
+        },
+    ).returning(*(getattr(model, name) for name in deltas))
+    return (await db.execute(stmt)).one()
+
+
+async def _bump_day(
+    db: AsyncSession, user_id: int, day: date, tasks: int = 0, notes: int = 0
+) -> None:
+    new_tasks, new_notes = await _bump(
+        db,
+        DailyActivity,
+        {"user_id": user_id, "day": day},
+        {"tasks_completed": tasks, "notes_created": notes},
+    )
+    after = new_tasks + new_notes
+    before = after - tasks - notes
+    if before <= 0 < after:
+        await _day_became_active(db, user_id, day)
+    elif after <= 0 < before:
+        await recompute_streak(db, user_id)
+
+
+async def _day_became_active(db: AsyncSession, user_id: int, day: date) -> None:
+    streak = await db.scalar(
+        select(UserStreak).where(UserStreak.user_id == user_id).with_for_update()
+    )
+    if streak is None:
+        db.add(UserStreak(user_id=user_id, current=1, longest=1, last_active_day=day))
+        return
+    last = streak.last_active_day
+    if last is not None and day <= last:
+        # Activity backfilled into an earlier day can join or split runs
+        await recompute_streak(db, user_id)
+        return
+    if last is not None and day == last + timedelta(days=1):
+        streak.current += 1
+    else:
+        streak.current = 1
+    streak.last_active_day = day
+    streak.longest = max(streak.longest, streak.current)
+
+
+def streak_runs(active_days: List[date]) -> Tuple[int, int, Optional[date]]:
+    """(run ending on the last active day, longest run, last active day)."""
+    current = longest = 0
+    previous = None
+    for day in sorted(active_days):
+        if previous is not None and day == previous + timedelta(days=1):
+            current += 1
+        else:
+            current = 1
+        longest = max(longest, current)
+        previous = day
+    return current, longest, previous
+
+
+async def recompute_streak(db: AsyncSession, user_id: int) -> None:
+    days = (
+        await db.scalars(
+            select(DailyActivity.day).where(
+                DailyActivity.user_id == user_id,
+                DailyActivity.tasks_completed + DailyActivity.notes_created > 0,
+            )
+        )
+    ).all()
+    current, longest, last = streak_runs(days)
+    stmt = upsert_insert(db, UserStreak).values(
+        user_id=user_id, current=current, longest=longest, last_active_day=last
+    )
+    await db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[UserStreak.user_id],
+            set_={
+                "current": stmt.excluded.current,
+                "longest": stmt.excluded.longest,
+                "last_active_day": stmt.excluded.last_active_day,
+            },
+        )
+    )
+
+
+# Hooks for task writes. Completion counts on the UTC day of
+# ``completed_at``, which is kept after un-completing so the decrement lands
+# on the same day; tasks completed before it existed fall back to their
+# last update.
+
+
+def completed_moment(task) -> Optional[datetime]:
+    return task.completed_at or task.updated_at or task.created_at
+
+
+def completion_day(task) -> date:
+    return utc_day(completed_moment(task))
+
+
+def _week_key(week: Optional[int]) -> int:
+    return NO_WEEK if week is None else week
+
+
+async def _apply(
+    db: AsyncSession,
+    user_id: int,
+    weeks: Dict[int, List[int]],
+    days: Dict[date, int],
+) -> None:
+    # Sorted so concurrent writers lock counter rows in the same order
+    for week, (total, completed) in sorted(weeks.items()):
+        if total or completed:
+            await _bump(
+                db,
+                WeekRollup,
+                {"user_id": user_id, "week": week},
+                {"total": total, "completed": completed},
+            )
+    for day, tasks in sorted(days.items()):
+        if tasks:
+            await _bump_day(db, user_id, day, tasks=tasks)
+
+
+async def tasks_created(db: AsyncSession, user_id: int, tasks: Iterable) -> None:
+    """Record ``tasks``, already written, being created."""
+    weeks: Dict[int, List[int]] = defaultdict(lambda: [0, 0])
+    days: Dict[date, int] = defaultdict(int)
+    for task in tasks:
+        counters = weeks[_week_key(task.week)]
+        counters[0] += 1
+        if task.completed:
+            counters[1] += 1
+            days[completion_day(task)] += 1
+    await _apply(db, user_id, weeks, days)
+
+
+async def task_created(db: AsyncSession, task: Task) -> None:
+    if task.completed:
+        task.completed_at = task.completed_at or datetime.now(timezone.utc)
+    await tasks_created(db, task.user_id, [task])
+
+
+async def tasks_completion_changed(
+    db: AsyncSession, user_id: int, tasks: Iterable, completed: bool
+) -> None:
+    """Record ``tasks``, already written, whose ``completed`` flipped."""
+    sign = 1 if completed else -1
+    weeks: Dict[int, List[int]] = defaultdict(lambda: [0, 0])
+    days: Dict[date, int] = defaultdict(int)
+    for task in tasks:
+        weeks[_week_key(task.week)][1] += sign
+        days[completion_day(task)] += sign
+    await _apply(db, user_id, weeks, days)
+
+
+async def task_completion_changed(
+    db: AsyncSession, task: Task, completed: bool
+) -> None:
+    """Record ``task`` (still in its old state) becoming ``completed``.
+
+    Also stamps ``task.completed_at``, or pins it to the day the completion
+    was counted on when it is un-completed.
+    """
+    if bool(task.completed) == completed:
+        return
+    if completed:
+        task.completed_at = datetime.now(timezone.utc)
+    else:
+        task.completed_at = completed_moment(task)
+    await tasks_completion_changed(db, task.user_id, [task], completed)
+
+
+async def tasks_deleted(
+    db: AsyncSession, user_id: int, tasks: Iterable, keep_history: bool = False
+) -> None:
+    """Record ``tasks`` (their state before deletion) being deleted.
+
+    With ``keep_history`` only the week counters drop; their completions stay
+    in ``daily_activity``, as when a regenerated roadmap replaces them.
+    """
+    weeks: Dict[int, List[int]] = defaultdict(lambda: [0, 0])
+    days: Dict[date, int] = defaultdict(int)
+    for task in tasks:
+        counters = weeks[_week_key(task.week)]
+        counters[0] -= 1
+        if task.completed:
+            counters[1] -= 1
+            if not keep_history:
+                days[completion_day(task)] -= 1
+    await _apply(db, user_id, weeks, days)
+
+
+async def task_deleted(db: AsyncSession, task: Task) -> None:
+    await tasks_deleted(db, task.user_id, [task])
+
+
+async def note_created(db: AsyncSession, note: Note) -> None:
+    await _bump_day(db, note.user_id, utc_day(note.created_at), notes=1)
+
+
+async def note_deleted(db: AsyncSession, note: Note) -> None:
+    await _bump_day(db, note.user_id, utc_day(note.created_at), notes=-1)
+
+
+# Recomputation from the raw tables
+
+
+async def compute_user_rollups(
+    db: AsyncSession, user_id: int
+) -> Tuple[Dict[date, List[int]], Dict[int, List[int]]]:
+    """Daily ``[tasks_completed, notes_created]`` and weekly
+    ``[total, completed]`` counters for one user, from tasks and notes."""
+    days: Dict[date, List[int]] = defaultdict(lambda: [0, 0])
+    weeks: Dict[int, List[int]] = defaultdict(lambda: [0, 0])
+
+    tasks = await db.execute(
+        select(
+            Task.week,
+            Task.completed,
+            Task.completed_at,
+            Task.updated_at,
+            Task.created_at,
+        ).where(Task.user_id == user_id, counted_tasks)
+    )
+    for week, completed, completed_at, updated_at, created_at in tasks:
+        counters = weeks[_week_key(week)]
+        counters[0] += 1
+        if completed:
+            counters[1] += 1
+            days[utc_day(completed_at or updated_at or created_at)][0] += 1
+
+    notes = await db.scalars(select(Note.created_at).where(Note.user_id == user_id))
+    for created_at in notes:
+        days[utc_day(created_at)][1] += 1
+    return dict(days), dict(weeks)
+
+
+async def _stored_days(db: AsyncSession, user_id: int) -> Dict[date, List[int]]:
+    return {
+        row.day: [row.tasks_completed, row.notes_created]
+        for row in await db.scalars(
+            select(DailyActivity).where(DailyActivity.user_id == user_id)
+        )
+    }
+
+
+def _with_history(
+    days: Dict[date, List[int]], stored_days: Dict[date, List[int]]
+) -> Dict[date, List[int]]:
+    """Recounted ``days``, keeping completions that ``stored_days`` records
+    for tasks no longer there (see the module docstring)."""
+    merged = {day: list(counters) for day, counters in days.items()}
+    for day, (tasks, _) in stored_days.items():
+        if tasks:
+            counters = merged.setdefault(day, [0, 0])
+            counters[0] = max(counters[0], tasks)
+    return merged
+
+
+async def refresh_user_rollups(db: AsyncSession, user_id: int) -> None:
+    """Replace one user's rollups with freshly computed ones.
+
+    A day's completions are only ever raised to the recount, never lowered.
+    """
+    days, weeks = await compute_user_rollups(db, user_id)
+    days = _with_history(days, await _stored_days(db, user_id))
+    await db.execute(delete(DailyActivity).where(DailyActivity.user_id == user_id))
+    await db.execute(delete(WeekRollup).where(WeekRollup.user_id == user_id))
+    if days:
+        await db.execute(
+            insert(DailyActivity),
+            [
+                {"user_id": user_id, "day": d, "tasks_completed": t, "notes_created": n}
+                for d, (t, n) in days.items()
+            ],
+        )
+    if weeks:
+        await db.execute(
+            insert(WeekRollup),
+            [
+                {"user_id": user_id, "week": w, "total": t, "completed": c}
+                for w, (t, c) in weeks.items()
+            ],
+        )
+    await recompute_streak(db, user_id)
+
+
+async def check_user_rollups(db: AsyncSession, user_id: int) -> List[str]:
+    """Differences between stored and recomputed rollups, one line each."""
+    days, weeks = await compute_user_rollups(db, user_id)
+    stored_days = await _stored_days(db, user_id)
+    days = _with_history(days, stored_days)
+    stored_weeks = {
+        row.week: [row.total, row.completed]
+        for row in await db.scalars(
+            select(WeekRollup).where(WeekRollup.user_id == user_id)
+        )
+    }
+    problems = []
+    for label, expected, stored in (
+        ("day", days, stored_days),
+        ("week", weeks, stored_weeks),
+    ):
+        for key in sorted(set(expected) | set(stored)):
+            want = expected.get(key, [0, 0])
+            have = stored.get(key, [0, 0])
+            if want != have:
+                problems.append(
+                    f"user {user_id} {label} {key}: stored {have}, expected {want}"
+                )
+
+    streak = await db.get(UserStreak, user_id)
+    current, longest, last = streak_runs([d for d, c in days.items() if sum(c) > 0])
+    have = (streak.current, streak.longest, streak.last_active_day) if streak else None
+    if (current, longest, last) != (have or (0, 0, None)):
+        problems.append(
+            f"user {user_id} streak: stored {have}, "
+            f"expected {(current, longest, last)}"
+        )
+    return problems
+
+
+async def _run(command: str, user_id: Optional[int]) -> int:
+    async with session_scope("rollups") as db:
+        if user_id is not None:
+            user_ids = [user_id]
+        else:
+            user_ids = (await db.scalars(select(User.id).order_by(User.id))).all()
+
+    problems = 0
+    for uid in user_ids:
+        # One short transaction per user keeps locks and memory bounded
+        async with session_scope("rollups") as db:
+            if command == "rebuild":
+                await refresh_user_rollups(db, uid)
+                await db.commit()
+            else:
+                for line in await check_user_rollups(db, uid):
+                    problems += 1
+                    print(line)
+    print(f"{command}: {len(user_ids)} users, {problems} mismatches")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(prog="python -m app.rollups")
+    parser.add_argument("command", choices=["rebuild", "check"])
+    parser.add_argument("--user", type=int, default=None)
+    args = parser.parse_args()
+    sys.exit(asyncio.run(_run(args.command, args.user)))
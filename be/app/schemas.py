@@ -1,6 +1,6 @@
 from pydantic import BaseModel, Field
 from typing import List, Optional, Literal
-from datetime import date
+from datetime import date, datetime
 
 
 # Auth
@@ -50,6 +50,7 @@ class LearningRoadmap(BaseModel):
 class RoadmapRequest(BaseModel):
     topic: str
     details: Optional[str] = ""
+    fresh: bool = False  # bypass the generation cache
 
 
 class LearningGoalCreate(BaseModel):
@@ -90,6 +91,38 @@ class TaskResponse(BaseModel):
         from_attributes = True
 
 
+TaskBulkAction = Literal["complete", "uncomplete", "delete"]
+
+
+class TaskBulkOperation(BaseModel):
+    id: int
+    action: TaskBulkAction
+
+
+class TaskBulkRequest(BaseModel):
+    """Either explicit ``operations`` or one ``action`` for a whole ``week``."""
+
+    operations: Optional[List[TaskBulkOperation]] = Field(
+        None, min_length=1, max_length=500
+    )
+    action: Optional[TaskBulkAction] = None
+    week: Optional[int] = None
+
+
+class TaskBulkResult(BaseModel):
+    id: int
+    action: TaskBulkAction
+    # updated | unchanged (already in that state) | deleted | not_found
+    status: Literal["updated", "unchanged", "deleted", "not_found"]
+    task: Optional[TaskResponse] = None
+
+
+class TaskBulkResponse(BaseModel):
+    results: List[TaskBulkResult]
+    updated: int
+    deleted: int
+
+
 # Schedule
 class ScheduleCreate(BaseModel):
     title: str
@@ -131,6 +164,19 @@ class NoteResponse(BaseModel):
         from_attributes = True
 
 
+class NoteSearchHit(BaseModel):
+    id: int
+    title: str  # HTML-escaped, matched terms wrapped in <mark>
+    snippet: str  # best-matching content fragments, escaped and highlighted
+    rank: float
+    source: Optional[str] = None
+    source_url: Optional[str] = None
+    created_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+
 # Playlists
 class PlaylistCreate(BaseModel):
     title: str
@@ -155,6 +201,10 @@ class ProgressCreate(BaseModel):
     notes_created: int
 
 
+class ProgressBatchCreate(BaseModel):
+    entries: List[ProgressCreate] = Field(..., min_length=1, max_length=366)
+
+
 class ProgressResponse(BaseModel):
     id: int
     user_id: int
@@ -173,6 +223,12 @@ class QuizCreate(BaseModel):
     difficulty: Literal["easy", "medium", "hard"]
     week_start: int = 1
     week_end: int = 24
+    fresh: bool = False  # bypass the generation cache
+
+
+class QuizBatchCreate(BaseModel):
+    quizzes: List[QuizCreate] = Field(..., min_length=1, max_length=24)
+    fresh: bool = False  # bypass the generation cache
 
 
 class QuizQuestion(BaseModel):
@@ -192,10 +248,27 @@ class QuizResponse(BaseModel):
         from_attributes = True
 
 
+# Background jobs
+class JobResponse(BaseModel):
+    id: int
+    kind: str
+    state: Literal["queued", "running", "succeeded", "dead"]
+    attempts: int
+    max_attempts: int
+    result: Optional[dict] = None
+    error: Optional[str] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+
 # Video
 class VideoSummaryRequest(BaseModel):
     video_title: str
     video_description: Optional[str] = None
+    transcript: Optional[str] = None  # long inputs are summarized in chunks
 
 
 class VideoQuestionRequest(BaseModel):
@@ -210,3 +283,34 @@ class DashboardData(BaseModel):
     recent_tasks: List[TaskResponse]
     progress_data: List[ProgressResponse]
     upcoming_schedule: List[ScheduleResponse]
+
+
+class WeekProgress(BaseModel):
+    week: Optional[int] = None
+    total: int
+    completed: int
+
+
+class ActivityDay(BaseModel):
+    day: date
+    tasks_completed: int
+    notes_created: int
+
+
+class ActivitySummary(BaseModel):
+    current_streak: int
+    longest_streak: int
+    last_active_day: Optional[date] = None
+    days: List[ActivityDay]  # active days only, oldest first
+
+
+class DashboardSummary(BaseModel):
+    user: UserResponse
+    learning_goal: Optional[LearningGoalResponse]
+    current_week: Optional[int] = None
+    current_week_tasks: List[TaskResponse]
+    week_progress: List[WeekProgress]
+    total_tasks: int
+    completed_tasks: int
+    progress_data: List[ProgressResponse]
+    upcoming_schedule: List[ScheduleResponse]
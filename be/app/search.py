@@ -0,0 +1,224 @@
+"""Ranked full-text search over a user's notes.
+
+Postgres matches ``notes.search_vector``, a generated ``tsvector`` over
+title (weight A) and content (weight B) with a GIN index. SQLite, used
+locally and in tests, matches the ``notes_fts`` FTS5 table that triggers
+keep in sync with ``notes``. Both are created by migration 0009; neither
+column nor table is mapped on the Note model.
+
+Paging stops after the NOTES_SEARCH_MAX_MATCHES best matches, so Postgres
+only ever keeps a bounded top-N of the ranked matches. Snippets are only
+built for the page being returned.
+
+Titles and snippets are HTML: the note text is escaped and matched terms
+are wrapped in <mark>. The database marks matches with control characters
+that are swapped for the tags only after escaping, so markup in a note can
+never reach the client unescaped.
+"""
+
+from dataclasses import dataclass
+from datetime import datetime
+from typing import List, Optional
+import base64
+import html
+import json
+import os
+import re
+
+from fastapi import HTTPException
+from sqlalchemy import func, literal_column, select, text
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .models import Note
+from .pagination import Page
+
+SEARCH_CONFIG = "english"  # must match the generated column in 0009
+MAX_MATCHES = int(os.getenv("NOTES_SEARCH_MAX_MATCHES", "1000"))
+MAX_PAGE_SIZE = 100
+HIGHLIGHT_START = "<mark>"
+HIGHLIGHT_STOP = "</mark>"
+# What the database wraps matches in, replaced by the tags after escaping
+MATCH_START = "\x02"
+MATCH_STOP = "\x03"
+# ts_headline options; SQLite's snippet() takes the equivalent arguments
+HEADLINE_OPTIONS = (
+    f"StartSel={MATCH_START}, StopSel={MATCH_STOP}, "
+    'MaxWords=30, MinWords=12, MaxFragments=2, FragmentDelimiter=" … "'
+)
+SNIPPET_TOKENS = 24
+
+search_vector = literal_column("notes.search_vector", TSVECTOR)
+
+
+@dataclass
+class SearchHit:
+    id: int
+    title: str
+    snippet: str
+    rank: float
+    source: Optional[str]
+    source_url: Optional[str]
+    created_at: Optional[datetime]
+
+
+def encode_offset(offset: int) -> str:
+    return base64.urlsafe_b64encode(json.dumps([offset]).encode()).decode().rstrip("=")
+
+
+def decode_offset(cursor: Optional[str]) -> int:
+    if cursor is None:
+        return 0
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        (offset,) = json.loads(raw)
+        if not isinstance(offset, int) or offset < 0:
+            raise ValueError(offset)
+        return offset
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def highlight_html(text: Optional[str]) -> Optional[str]:
+    """Escape highlighted note text and turn its match markers into <mark>."""
+    if text is None:
+        return None
+    return (
+        html.escape(text)
+        .replace(MATCH_START, HIGHLIGHT_START)
+        .replace(MATCH_STOP, HIGHLIGHT_STOP)
+    )
+
+
+def fts5_query(query: str) -> str:
+    """Quote each word so user input never hits FTS5 query syntax.
+
+    The last word matches as a prefix, for search-as-you-type.
+    """
+    words = re.findall(r"\w+", query)
+    if not words:
+        return ""
+    terms = ['"' + w + '"' for w in words]
+    terms[-1] += "*"
+    return " ".join(terms)
+
+
+async def _search_postgres(
+    db: AsyncSession, user_id: int, query: str, offset: int, limit: int
+) -> List[SearchHit]:
+    tsquery = func.websearch_to_tsquery(SEARCH_CONFIG, query)
+    rank = func.ts_rank_cd(search_vector, tsquery).label("rank")
+    # search_notes keeps offset + limit within MAX_MATCHES, so this is a
+    # top-N sort over the matches rather than a full one
+    page = (
+        select(Note.id, rank)
+        .where(Note.user_id == user_id, search_vector.op("@@")(tsquery))
+        .order_by(rank.desc(), Note.id.desc())
+        .offset(offset)
+        .limit(limit)
+        .subquery()
+    )
+    rows = await db.execute(
+        select(
+            Note.id,
+            func.ts_headline(SEARCH_CONFIG, Note.title, tsquery, HEADLINE_OPTIONS),
+            func.ts_headline(SEARCH_CONFIG, Note.content, tsquery, HEADLINE_OPTIONS),
+            page.c.rank,
+            Note.source,
+            Note.source_url,
+            Note.created_at,
+        )
+        .join(page, page.c.id == Note.id)
+        .order_by(page.c.rank.desc(), page.c.id.desc())
+    )
+    return [
+        SearchHit(
+            id_,
+            highlight_html(title),
+            highlight_html(snippet),
+            rank,
+            source,
+            source_url,
+            created_at,
+        )
+        for id_, title, snippet, rank, source, source_url, created_at in rows
+    ]
+
+
+_FTS5_SEARCH = text(
+    f"""
+    SELECT notes.id,
+           highlight(notes_fts, 0, :start, :stop),
+           snippet(notes_fts, 1, :start, :stop, ' … ', {SNIPPET_TOKENS}),
+           -bm25(notes_fts, 4.0, 1.0) AS rank,
+           notes.source,
+           notes.source_url,
+           notes.created_at
+    FROM notes_fts JOIN notes ON notes.id = notes_fts.rowid
+    WHERE notes_fts MATCH :query AND notes.user_id = :user_id
+    ORDER BY rank DESC, notes.id DESC
+    LIMIT :limit OFFSET :offset
+    """
+)
+
+
+async def _search_sqlite(
+    db: AsyncSession, user_id: int, query: str, offset: int, limit: int
+) -> List[SearchHit]:
+    match = fts5_query(query)
+    if not match:
+        return []
+    rows = await db.execute(
+        _FTS5_SEARCH,
+        {
+            "query": match,
+            "start": MATCH_START,
+            "stop": MATCH_STOP,
+            "user_id": user_id,
+            "limit": limit,
+            "offset": offset,
+        },
+    )
+    hits = []
+    for id_, title, snippet, rank, source, source_url, created_at in rows:
+        if isinstance(created_at, str):  # raw SQL skips the DateTime type
+            created_at = datetime.fromisoformat(created_at)
+        hits.append(
+            SearchHit(
+                id_,
+                highlight_html(title),
+                highlight_html(snippet),
+                rank,
+                source,
+                source_url,
+                created_at,
+            )
+        )
+    return hits
+
+
+async def search_notes(
+    db: AsyncSession,
+    user_id: int,
+    query: str,
+    limit: int = 20,
+    cursor: Optional[str] = None,
+) -> Page:
+    """One page of ``user_id``'s notes matching ``query``, best first."""
+    offset = decode_offset(cursor)
+    page_size = min(limit, MAX_PAGE_SIZE)
+    # Paging stops after the MAX_MATCHES best matches
+    fetch = max(min(page_size + 1, MAX_MATCHES - offset), 0)
+    if fetch == 0:
+        return Page(items=[], next_cursor=None, projected=False)
+
+    if db.bind.dialect.name == "postgresql":
+        hits = await _search_postgres(db, user_id, query, offset, fetch)
+    else:
+        hits = await _search_sqlite(db, user_id, query, offset, fetch)
+
+    next_cursor = None
+    if len(hits) > page_size:
+        hits = hits[:page_size]
+        next_cursor = encode_offset(offset + page_size)
+    return Page(items=hits, next_cursor=next_cursor, projected=False)
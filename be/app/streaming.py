@@ -0,0 +1,63 @@
+from typing import Any, List
+import json
+
+
+class ArrayItemParser:
+    """Incrementally extracts objects from the first array of a JSON document.
+
+    Fed the raw text of a streamed ``{"weeks": [{...}, {...}]}`` response, it
+    returns each element object as soon as its closing brace arrives, so the
+    caller can act on week 1 while later weeks are still being generated.
+    """
+
+    def __init__(self) -> None:
+        self._buffer: List[str] = []
+        self._depth = 0
+        self._array_depth = None
+        self._in_string = False
+        self._escaped = False
+        self._capturing = False
+
+    def feed(self, text: str) -> List[Any]:
+        items = []
+        for char in text:
+            if self._capturing:
+                self._buffer.append(char)
+
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                continue
+
+            if char == '"':
+                self._in_string = True
+            elif char in "{[":
+                self._depth += 1
+                if char == "[" and self._array_depth is None:
+                    self._array_depth = self._depth
+                elif (
+                    char == "{"
+                    and self._array_depth is not None
+                    and self._depth == self._array_depth + 1
+                ):
+                    self._capturing = True
+                    self._buffer = ["{"]
+            elif char in "}]":
+                self._depth -= 1
+                if (
+                    char == "}"
+                    and self._capturing
+                    and self._depth == self._array_depth
+                ):
+                    self._capturing = False
+                    items.append(json.loads("".join(self._buffer)))
+                    self._buffer = []
+        return items
+
+
+def sse_event(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
@@ -0,0 +1,34 @@
+"""Where a task came from, and the filters built on ``Task.source``.
+
+Kept apart from ``crud`` and ``rollups`` so both can import it.
+"""
+
+from sqlalchemy import and_, or_
+
+from .models import Task
+
+ROADMAP_SOURCE = "roadmap"
+# Tasks of a roadmap that is still streaming in; promoted to ROADMAP_SOURCE
+# once the whole roadmap has arrived. Each stream tags its own rows (see
+# pending_source) so concurrent streams never touch each other's.
+ROADMAP_PENDING_SOURCE = "roadmap-pending"
+
+# Tasks created before Task.source existed are recognised by their quadrant:
+# only roadmap generation ever set it.
+roadmap_task_filter = or_(
+    Task.source == ROADMAP_SOURCE,
+    and_(Task.source.is_(None), Task.quadrant.is_not(None)),
+)
+
+
+def pending_source(stream: str) -> str:
+    """``Task.source`` of the tasks staged by one roadmap stream."""
+    return f"{ROADMAP_PENDING_SOURCE}:{stream}"
+
+
+pending_tasks = Task.source.like(f"{ROADMAP_PENDING_SOURCE}%")
+# Staged tasks of a roadmap still streaming in are not the user's yet: every
+# read and write of the user's tasks goes through this filter.
+counted_tasks = or_(
+    Task.source.is_(None), Task.source.not_like(f"{ROADMAP_PENDING_SOURCE}%")
+)
@@ -0,0 +1,70 @@
+"""Token estimates for prompts before they are sent.
+
+Gemini reports exact counts in usage metadata after a call; budgets must be
+enforced before it, so they work from this character-based estimate.
+"""
+
+from typing import Iterator, List
+import re
+
+CHARS_PER_TOKEN = 4  # rough estimate for English prose
+
+TRUNCATION_MARKER = "\n[… truncated …]\n"
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def fit_to_budget(text: str, max_tokens: int) -> str:
+    """Trim ``text`` to about ``max_tokens``, keeping its head and tail.
+
+    The opening and the end of a transcript or description usually carry
+    the most context, so the middle is what gets dropped.
+    """
+    max_chars = max(max_tokens, 0) * CHARS_PER_TOKEN
+    if len(text) <= max_chars:
+        return text
+    keep = max(max_chars - len(TRUNCATION_MARKER), 0)
+    head = keep * 2 // 3
+    tail = keep - head
+    return text[:head] + TRUNCATION_MARKER + (text[-tail:] if tail else "")
+
+
+def _pieces(text: str, max_chars: int) -> Iterator[str]:
+    # Paragraphs, else sentences, else whitespace-bounded slices: auto-generated
+    # transcripts often have no punctuation at all
+    for paragraph in re.split(r"\n\s*\n", text):
+        paragraph = " ".join(paragraph.split())
+        if len(paragraph) <= max_chars:
+            if paragraph:
+                yield paragraph
+            continue
+        for sentence in re.split(r"(?<=[.!?])\s+", paragraph):
+            while len(sentence) > max_chars:
+                cut = sentence.rfind(" ", 0, max_chars)
+                cut = cut if cut > 0 else max_chars
+                yield sentence[:cut]
+                sentence = sentence[cut:].lstrip()
+            if sentence:
+                yield sentence
+
+
+def split_into_chunks(text: str, max_tokens: int) -> List[str]:
+    """Split ``text`` into chunks of at most ``max_tokens`` on natural breaks.
+
+    Chunking depends only on the text, so the same transcript always yields
+    the same chunks (and the same cache keys for their summaries).
+    """
+    max_chars = max(max_tokens, 1) * CHARS_PER_TOKEN
+    chunks: List[str] = []
+    current = ""
+    for piece in _pieces(text, max_chars):
+        if current and len(current) + 1 + len(piece) > max_chars:
+            chunks.append(current)
+            current = piece
+        else:
+            current = f"{current} {piece}" if current else piece
+    if current:
+        chunks.append(current)
+    return chunks
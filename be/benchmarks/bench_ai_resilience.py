@@ -0,0 +1,124 @@
+"""Tail latency and success rate of AIService under injected faults.
+
+Runs AIService against the in-process StubBackend instead of Gemini, so it
+needs no API key or quota. Scenarios:
+
+- a long tail (3% of flash calls stall for 5s), without and with hedging
+- 10% transient 503s, without and with retries
+- a throttled pro model, without and with fallback to flash
+
+    uv run python -m benchmarks.bench_ai_resilience
+"""
+
+import asyncio
+import dataclasses
+import os
+import time
+
+os.environ.setdefault("LLM_BACKEND", "stub")
+
+from app.ai_service import AIService  # noqa: E402
+from app.llm_backends import StubBackend, StubProfile  # noqa: E402
+
+REQUESTS = 400
+CONCURRENT = 16
+
+
+def percentile(samples, q):
+    ordered = sorted(samples)
+    return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+
+async def drive(service: AIService, call) -> None:
+    latencies = []
+    failures = 0
+    gate = asyncio.Semaphore(CONCURRENT)
+
+    async def one(n: int) -> None:
+        nonlocal failures
+        async with gate:
+            started = time.perf_counter()
+            try:
+                await call(service, n)
+            except Exception:
+                failures += 1
+                return
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(n) for n in range(REQUESTS)))
+    elapsed = time.perf_counter() - started
+    ok = len(latencies)
+    p50 = percentile(latencies, 0.5) if ok else float("nan")
+    p99 = percentile(latencies, 0.99) if ok else float("nan")
+    upstream = sum(sum(c.values()) for c in service.attempts.outcomes.values())
+    print(
+        f"  ok {ok:>4}/{REQUESTS}  p50 {p50 * 1000:>7.1f}ms  "
+        f"p99 {p99 * 1000:>7.1f}ms  upstream calls {upstream:>4}  "
+        f"({elapsed:.1f}s)"
+    )
+
+
+def profile(slow_rate: float = 0.0, **rates) -> StubProfile:
+    # 50-150ms, except slow_rate of calls that stall for 5s
+    def latency(rng):
+        return 5.0 if rng.random() < slow_rate else rng.uniform(0.05, 0.15)
+
+    return StubProfile(latency=latency, **rates)
+
+
+def make_service(backend: StubBackend, **policy) -> AIService:
+    service = AIService(backend=backend)
+    service.cache = None
+    service._single_flight = None
+    service.policies = {
+        method: dataclasses.replace(p, **policy)
+        for method, p in service.policies.items()
+    }
+    return service
+
+
+async def summary(service: AIService, n: int) -> None:
+    # Distinct prompts, so nothing is coalesced or cached
+    await service.generate_video_summary(f"Video {n}")
+
+
+async def roadmap(service: AIService, n: int) -> None:
+    # Plain-text completion under the roadmap policy (pro with fallback)
+    await service._complete("roadmap", service.pro_model_name, f"Roadmap {n}")
+
+
+async def main() -> None:
+    flash = "gemini-2.5-flash-lite"
+    pro = "gemini-2.5-pro"
+
+    print("long tail: 3% of calls stall for 5s")
+    for label, policy in (
+        ("no hedging", dict(hedge_quantile=None)),
+        ("hedge @ p95", dict(hedge_quantile=0.95)),
+    ):
+        print(f" {label}")
+        backend = StubBackend({flash: profile(slow_rate=0.03)})
+        await drive(make_service(backend, **policy), summary)
+
+    print("transient errors: 10% of calls return 503")
+    for label, policy in (
+        ("no retries", dict(max_attempts=1, hedge_quantile=None)),
+        ("3 attempts", dict(max_attempts=3, base_delay=0.05, hedge_quantile=None)),
+    ):
+        print(f" {label}")
+        backend = StubBackend({flash: profile(error_rate=0.1)})
+        await drive(make_service(backend, **policy), summary)
+
+    print("throttled pro model: 50% of pro calls return 429")
+    for label, policy in (
+        ("no fallback", dict(fallback_model=None, base_delay=0.05)),
+        ("fallback to flash", dict(fallback_model=flash, base_delay=0.05)),
+    ):
+        print(f" {label}")
+        backend = StubBackend({pro: profile(throttle_rate=0.5), flash: profile()})
+        await drive(make_service(backend, **policy), roadmap)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,126 @@
+"""Full versus keyset-paged /notes fetches at 10k rows.
+
+Times the query plus serialization to JSON and reports payload size for:
+the legacy full fetch, one 100-row page, a 100-row page projected to
+``id,title``, and walking every page to the end:
+
+    uv run python -m benchmarks.bench_pagination
+    DATABASE_URL=postgresql://... uv run python -m benchmarks.bench_pagination
+"""
+
+import asyncio
+import json
+import os
+import time
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///./bench_pagination.db")
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from sqlalchemy import insert  # noqa: E402
+
+from app.database import Base, SessionLocal, SyncSessionAdapter, engine  # noqa: E402
+from app.models import Note, User  # noqa: E402
+from app.pagination import fetch_page  # noqa: E402
+from app.schemas import NoteResponse  # noqa: E402
+
+ROWS = 10_000
+PAGE = 100
+REPEAT = 5
+
+
+def seed() -> int:
+    db = SessionLocal()
+    user = User(username="bench-pages", email="pages@example.com", hashed_password="x")
+    db.add(user)
+    db.commit()
+    db.execute(
+        insert(Note),
+        [
+            {
+                "user_id": user.id,
+                "title": f"Note {i}",
+                "content": "lorem ipsum dolor sit amet " * 20,
+                "source": "manual",
+            }
+            for i in range(ROWS)
+        ],
+    )
+    db.commit()
+    user_id = user.id
+    db.close()
+    return user_id
+
+
+def serialize(items, projected: bool) -> bytes:
+    if not projected:
+        items = [NoteResponse.model_validate(item) for item in items]
+    return json.dumps(jsonable_encoder(items)).encode()
+
+
+async def timed(label: str, user_id: int, **kwargs) -> None:
+    best = float("inf")
+    size = 0
+    for _ in range(REPEAT):
+        db = SyncSessionAdapter(SessionLocal())
+        started = time.perf_counter()
+        page = await fetch_page(db, Note, user_id, NoteResponse, **kwargs)
+        size = len(serialize(page.items, page.projected))
+        best = min(best, time.perf_counter() - started)
+        await db.close()
+    print(f"{label:<22} {best * 1000:>9.1f} ms  {size / 1024:>9.1f} KiB")
+
+
+async def walk_all(user_id: int) -> None:
+    db = SyncSessionAdapter(SessionLocal())
+    started = time.perf_counter()
+    cursor, pages, rows = None, 0, 0
+    while True:
+        page = await fetch_page(
+            db,
+            Note,
+            user_id,
+            NoteResponse,
+            limit=PAGE,
+            cursor=cursor,
+            newest_first=True,
+        )
+        serialize(page.items, page.projected)
+        pages += 1
+        rows += len(page.items)
+        cursor = page.next_cursor
+        if cursor is None:
+            break
+    elapsed = time.perf_counter() - started
+    await db.close()
+    label = f"walk {pages} pages"
+    print(f"{label:<22} {elapsed * 1000:>9.1f} ms  {rows} rows")
+
+
+async def run(user_id: int) -> None:
+    await timed("full fetch", user_id, newest_first=True)
+    await timed(f"first page ({PAGE})", user_id, limit=PAGE, newest_first=True)
+    await timed(
+        f"page ({PAGE}) id,title",
+        user_id,
+        limit=PAGE,
+        fields="id,title",
+        newest_first=True,
+    )
+    await walk_all(user_id)
+
+
+def main() -> None:
+    Base.metadata.create_all(bind=engine)
+    user_id = seed()
+    try:
+        asyncio.run(run(user_id))
+    finally:
+        db = SessionLocal()
+        db.query(Note).filter(Note.user_id == user_id).delete()
+        db.query(User).filter(User.id == user_id).delete()
+        db.commit()
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
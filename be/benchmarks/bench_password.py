@@ -0,0 +1,70 @@
+"""Logins/sec for bcrypt verification at various thread-pool sizes.
+
+Each run fires CONCURRENT verifications at once, the way a login storm hits
+the /auth/login handler, and reports throughput plus how long the event loop
+was blocked by the slowest single callback:
+
+    uv run python -m benchmarks.bench_password
+    BCRYPT_ROUNDS=10 uv run python -m benchmarks.bench_password
+"""
+
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from passlib.context import CryptContext
+
+ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+CONCURRENT = 32
+POOL_SIZES = (1, 2, 4, 8)
+
+pwd_context = CryptContext(schemes=["bcrypt"], bcrypt__default_rounds=ROUNDS)
+PASSWORD = "correct horse battery staple"
+HASHED = pwd_context.hash(PASSWORD)
+
+
+async def loop_lag(stop: asyncio.Event) -> float:
+    worst = 0.0
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(0.001)
+        worst = max(worst, time.perf_counter() - started - 0.001)
+    return worst
+
+
+async def run(pool_size: int) -> None:
+    stop = asyncio.Event()
+    lag = asyncio.create_task(loop_lag(stop))
+    loop = asyncio.get_running_loop()
+    started = time.perf_counter()
+    if pool_size == 0:
+        for _ in range(CONCURRENT):
+            pwd_context.verify(PASSWORD, HASHED)
+            await asyncio.sleep(0)
+    else:
+        with ThreadPoolExecutor(max_workers=pool_size) as executor:
+            await asyncio.gather(
+                *(
+                    loop.run_in_executor(executor, pwd_context.verify, PASSWORD, HASHED)
+                    for _ in range(CONCURRENT)
+                )
+            )
+    elapsed = time.perf_counter() - started
+    stop.set()
+    worst_lag = await lag
+    label = "inline" if pool_size == 0 else f"pool={pool_size}"
+    print(
+        f"{label:<8} {CONCURRENT / elapsed:>8.1f} logins/sec  "
+        f"max loop stall {worst_lag * 1000:>7.1f} ms"
+    )
+
+
+def main() -> None:
+    print(f"bcrypt rounds={ROUNDS}, {CONCURRENT} concurrent logins")
+    for pool_size in (0,) + POOL_SIZES:
+        asyncio.run(run(pool_size))
+
+
+if __name__ == "__main__":
+    main()
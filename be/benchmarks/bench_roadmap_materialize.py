@@ -0,0 +1,95 @@
+"""Rows/sec for materializing a 24-week x 10-task roadmap.
+
+Compares the old per-row ``db.add`` loop with ``crud.materialize_roadmap``.
+Runs against DATABASE_URL (a throwaway SQLite file by default):
+
+    uv run python -m benchmarks.bench_roadmap_materialize
+    DATABASE_URL=postgresql://... uv run python -m benchmarks.bench_roadmap_materialize
+"""
+
+import asyncio
+import os
+import time
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///./bench_roadmap.db")
+
+from app.database import Base, SessionLocal, SyncSessionAdapter, engine  # noqa: E402
+from app.crud import materialize_roadmap, roadmap_task_rows  # noqa: E402
+from app.models import Task, User  # noqa: E402
+from app.schemas import LearningRoadmap, RoadmapWeek, TaskItem  # noqa: E402
+
+WEEKS = 24
+TASKS_PER_WEEK = 10
+ROUNDS = 20
+
+
+def make_roadmap() -> LearningRoadmap:
+    return LearningRoadmap(
+        weeks=[
+            RoadmapWeek(
+                week=w,
+                theme=f"Theme {w}",
+                tasks=[
+                    TaskItem(description=f"Week {w} task {t}")
+                    for t in range(TASKS_PER_WEEK)
+                ],
+            )
+            for w in range(1, WEEKS + 1)
+        ]
+    )
+
+
+def per_row(user_id: int, roadmap: LearningRoadmap) -> None:
+    db = SessionLocal()
+    try:
+        for row in roadmap_task_rows(user_id, roadmap.weeks):
+            db.add(Task(**row))
+        db.commit()
+    finally:
+        db.close()
+
+
+async def bulk(user_id: int, roadmap: LearningRoadmap) -> None:
+    db = SyncSessionAdapter(SessionLocal())
+    try:
+        await materialize_roadmap(db, user_id, roadmap)
+        await db.commit()
+    finally:
+        await db.close()
+
+
+def report(label: str, elapsed: float, rows: int) -> None:
+    print(f"{label:<12} {rows / elapsed:>12,.0f} rows/sec  ({elapsed:.3f}s total)")
+
+
+def main() -> None:
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    user = User(username="bench", email="bench@example.com", hashed_password="x")
+    db.add(user)
+    db.commit()
+    user_id = user.id
+    db.close()
+
+    roadmap = make_roadmap()
+    rows = WEEKS * TASKS_PER_WEEK * ROUNDS
+    try:
+        start = time.perf_counter()
+        for _ in range(ROUNDS):
+            per_row(user_id, roadmap)
+        report("per-row add", time.perf_counter() - start, rows)
+
+        start = time.perf_counter()
+        for _ in range(ROUNDS):
+            asyncio.run(bulk(user_id, roadmap))
+        report("bulk insert", time.perf_counter() - start, rows)
+    finally:
+        db = SessionLocal()
+        db.query(Task).filter(Task.user_id == user_id).delete()
+        db.query(User).filter(User.id == user_id).delete()
+        db.commit()
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
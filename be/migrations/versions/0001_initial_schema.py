@@ -0,0 +1,147 @@
+"""Initial schema, as previously created by Base.metadata.create_all
+
+Databases created before migrations existed already have these tables:
+run ``alembic stamp 0001`` once, then ``alembic upgrade head``.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "0001"
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _timestamps(updated: bool = True) -> list:
+    columns = [
+        sa.Column(
+            "created_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.func.now(),
+            nullable=True,
+        )
+    ]
+    if updated:
+        columns.append(sa.Column("updated_at", sa.DateTime(timezone=True)))
+    return columns
+
+
+def upgrade() -> None:
+    op.create_table(
+        "users",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("username", sa.String(), nullable=False),
+        sa.Column("email", sa.String(), nullable=False),
+        sa.Column("hashed_password", sa.String(), nullable=False),
+        sa.Column("name", sa.String(), nullable=True),
+        *_timestamps(),
+    )
+    op.create_index("ix_users_id", "users", ["id"])
+    op.create_index("ix_users_username", "users", ["username"], unique=True)
+    op.create_index("ix_users_email", "users", ["email"], unique=True)
+
+    op.create_table(
+        "learning_goals",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("topic", sa.String(), nullable=False),
+        sa.Column("details", sa.Text(), nullable=True),
+        sa.Column("roadmap", sa.JSON(), nullable=True),
+        *_timestamps(),
+    )
+    op.create_index("ix_learning_goals_id", "learning_goals", ["id"])
+
+    op.create_table(
+        "tasks",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("title", sa.String(), nullable=False),
+        sa.Column("description", sa.Text(), nullable=True),
+        sa.Column("quadrant", sa.String(), nullable=True),
+        sa.Column("week", sa.Integer(), nullable=True),
+        sa.Column("completed", sa.Boolean(), nullable=True),
+        sa.Column("due_date", sa.Date(), nullable=True),
+        *_timestamps(),
+    )
+    op.create_index("ix_tasks_id", "tasks", ["id"])
+
+    op.create_table(
+        "schedules",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("day_of_week", sa.String(), nullable=False),
+        sa.Column("time_slot", sa.String(), nullable=False),
+        sa.Column("task_id", sa.Integer(), sa.ForeignKey("tasks.id"), nullable=True),
+        sa.Column("custom_task", sa.String(), nullable=True),
+        sa.Column("date", sa.Date(), nullable=True),
+        *_timestamps(),
+    )
+    op.create_index("ix_schedules_id", "schedules", ["id"])
+
+    op.create_table(
+        "notes",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("title", sa.String(), nullable=False),
+        sa.Column("content", sa.Text(), nullable=False),
+        sa.Column("source", sa.String(), nullable=True),
+        sa.Column("source_url", sa.String(), nullable=True),
+        *_timestamps(),
+    )
+    op.create_index("ix_notes_id", "notes", ["id"])
+
+    op.create_table(
+        "playlists",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("title", sa.String(), nullable=False),
+        sa.Column("description", sa.Text(), nullable=True),
+        sa.Column("youtube_playlist_id", sa.String(), nullable=False),
+        sa.Column("thumbnail_url", sa.String(), nullable=True),
+        *_timestamps(),
+    )
+    op.create_index("ix_playlists_id", "playlists", ["id"])
+
+    op.create_table(
+        "progress",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("date", sa.Date(), nullable=False),
+        sa.Column("tasks_completed", sa.Integer(), nullable=True),
+        sa.Column("study_hours", sa.Integer(), nullable=True),
+        sa.Column("notes_created", sa.Integer(), nullable=True),
+        *_timestamps(updated=False),
+    )
+    op.create_index("ix_progress_id", "progress", ["id"])
+
+    op.create_table(
+        "quizzes",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("topic", sa.String(), nullable=False),
+        sa.Column("difficulty", sa.String(), nullable=False),
+        sa.Column("questions", sa.JSON(), nullable=False),
+        *_timestamps(updated=False),
+    )
+    op.create_index("ix_quizzes_id", "quizzes", ["id"])
+
+
+def downgrade() -> None:
+    for table in (
+        "quizzes",
+        "progress",
+        "playlists",
+        "notes",
+        "schedules",
+        "tasks",
+        "learning_goals",
+        "users",
+    ):
+        op.drop_table(table)
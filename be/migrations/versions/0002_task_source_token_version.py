@@ -0,0 +1,33 @@
+"""Add tasks.source and users.token_version
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "0002"
+down_revision: Union[str, None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("tasks", sa.Column("source", sa.String(), nullable=True))
+    op.add_column(
+        "users",
+        sa.Column(
+            "token_version", sa.Integer(), nullable=False, server_default="0"
+        ),
+    )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("users") as batch:
+        batch.drop_column("token_version")
+    with op.batch_alter_table("tasks") as batch:
+        batch.drop_column("source")
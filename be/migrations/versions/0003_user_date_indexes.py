@@ -0,0 +1,53 @@
+"""Composite (user_id, ...) indexes and unique progress per user/day
+
+Every list and dashboard query filters by user_id and sorts by a date or
+week column. Indexes are built CONCURRENTLY on Postgres so upgrading a live
+database does not block writes.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+revision: str = "0003"
+down_revision: Union[str, None] = "0002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEXES = [
+    ("ix_learning_goals_user_id", "learning_goals", ["user_id"], False),
+    ("ix_tasks_user_week_created", "tasks", ["user_id", "week", "created_at"], False),
+    ("ix_schedules_user_date", "schedules", ["user_id", "date"], False),
+    ("ix_notes_user_created", "notes", ["user_id", "created_at"], False),
+    ("ix_playlists_user_id", "playlists", ["user_id"], False),
+    ("uq_progress_user_date", "progress", ["user_id", "date"], True),
+    ("ix_quizzes_user_created", "quizzes", ["user_id", "created_at"], False),
+]
+
+
+def upgrade() -> None:
+    # The old read-then-write progress endpoint could store several rows for
+    # one day; keep the newest so the unique index can be built.
+    op.execute(
+        "DELETE FROM progress WHERE id NOT IN "
+        "(SELECT MAX(id) FROM progress GROUP BY user_id, date)"
+    )
+    with op.get_context().autocommit_block():
+        for name, table, columns, unique in INDEXES:
+            op.create_index(
+                name,
+                table,
+                columns,
+                unique=unique,
+                postgresql_concurrently=True,
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True)
@@ -0,0 +1,46 @@
+"""(user_id, created_at, id) indexes for keyset-paginated list endpoints
+
+The notes and playlists indexes from 0003 are prefixes of the new ones and
+are replaced.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+revision: str = "0004"
+down_revision: Union[str, None] = "0003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+KEYSET = ["user_id", "created_at", "id"]
+NEW_INDEXES = [
+    ("ix_tasks_user_created_id", "tasks"),
+    ("ix_schedules_user_created_id", "schedules"),
+    ("ix_notes_user_created_id", "notes"),
+    ("ix_playlists_user_created_id", "playlists"),
+]
+REPLACED = [
+    ("ix_notes_user_created", "notes", ["user_id", "created_at"]),
+    ("ix_playlists_user_id", "playlists", ["user_id"]),
+]
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table in NEW_INDEXES:
+            op.create_index(name, table, KEYSET, postgresql_concurrently=True)
+        for name, table, _ in REPLACED:
+            op.drop_index(name, table_name=table, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, columns in REPLACED:
+            op.create_index(name, table, columns, postgresql_concurrently=True)
+        for name, table in reversed(NEW_INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True)
@@ -0,0 +1,29 @@
+"""learning_goals.week_summaries for range-scoped quiz context
+
+Existing goals are filled in lazily the first time a quiz is generated.
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-17
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "0007"
+down_revision: Union[str, None] = "0006"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "learning_goals", sa.Column("week_summaries", sa.JSON(), nullable=True)
+    )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("learning_goals") as batch:
+        batch.drop_column("week_summaries")
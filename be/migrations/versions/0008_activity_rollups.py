@@ -0,0 +1,145 @@
+"""Activity rollups: daily_activity, week_rollups, user_streaks
+
+Also adds tasks.completed_at, stamped for already-completed tasks with the
+moment app.rollups would count them on. The new tables are filled from
+tasks and notes here, so the endpoints reading them are right as soon as
+the upgrade finishes; ``python -m app.rollups check`` verifies them.
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-17
+"""
+from datetime import date, timedelta
+from itertools import groupby
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "0008"
+down_revision: Union[str, None] = "0007"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Mirrors app.task_sources.counted_tasks: staged roadmap rows are not counted
+COUNTED = "(source IS NULL OR source NOT LIKE 'roadmap-pending%')"
+
+
+def _utc_day(column: str) -> str:
+    if op.get_bind().dialect.name == "postgresql":
+        return f"CAST(({column} AT TIME ZONE 'UTC') AS DATE)"
+    return f"date({column})"  # SQLite stores naive UTC timestamps
+
+
+def _streak(days):
+    """(run ending on the last day, longest run, last day) of sorted days."""
+    current = longest = 0
+    previous = None
+    for day in days:
+        if previous is not None and day == previous + timedelta(days=1):
+            current += 1
+        else:
+            current = 1
+        longest = max(longest, current)
+        previous = day
+    return current, longest, previous
+
+
+def _backfill() -> None:
+    # Pin each completion to the day it is counted on, as the app does
+    op.execute(
+        "UPDATE tasks SET completed_at = COALESCE(updated_at, created_at) "
+        "WHERE completed IS TRUE AND completed_at IS NULL"
+    )
+    op.execute(
+        "INSERT INTO week_rollups (user_id, week, total, completed) "
+        "SELECT user_id, COALESCE(week, 0), COUNT(*), "
+        "SUM(CASE WHEN completed IS TRUE THEN 1 ELSE 0 END) "
+        f"FROM tasks WHERE {COUNTED} GROUP BY user_id, COALESCE(week, 0)"
+    )
+    op.execute(
+        "INSERT INTO daily_activity (user_id, day, tasks_completed, notes_created) "
+        "SELECT user_id, day, SUM(tasks), SUM(notes) FROM ("
+        f"SELECT user_id, {_utc_day('completed_at')} AS day, 1 AS tasks, 0 AS notes "
+        f"FROM tasks WHERE completed IS TRUE AND {COUNTED} "
+        "UNION ALL "
+        f"SELECT user_id, {_utc_day('created_at')} AS day, 0 AS tasks, 1 AS notes "
+        "FROM notes"
+        ") AS activity GROUP BY user_id, day"
+    )
+
+    # Streaks need runs of consecutive days; one row per active day is small
+    # enough to walk here
+    rows = op.get_bind().execute(
+        sa.text("SELECT user_id, day FROM daily_activity ORDER BY user_id, day")
+    )
+    streaks = []
+    for user_id, user_rows in groupby(rows, key=lambda row: row[0]):
+        days = [
+            day if isinstance(day, date) else date.fromisoformat(str(day)[:10])
+            for _, day in user_rows
+        ]
+        current, longest, last = _streak(days)
+        streaks.append(
+            {
+                "user_id": user_id,
+                "current": current,
+                "longest": longest,
+                "last_active_day": last,
+            }
+        )
+    if streaks:
+        op.bulk_insert(
+            sa.table(
+                "user_streaks",
+                sa.column("user_id", sa.Integer()),
+                sa.column("current", sa.Integer()),
+                sa.column("longest", sa.Integer()),
+                sa.column("last_active_day", sa.Date()),
+            ),
+            streaks,
+        )
+
+
+def upgrade() -> None:
+    op.add_column(
+        "tasks", sa.Column("completed_at", sa.DateTime(timezone=True), nullable=True)
+    )
+    op.create_table(
+        "daily_activity",
+        sa.Column(
+            "user_id", sa.Integer(), sa.ForeignKey("users.id"), primary_key=True
+        ),
+        sa.Column("day", sa.Date(), primary_key=True),
+        sa.Column("tasks_completed", sa.Integer(), nullable=False),
+        sa.Column("notes_created", sa.Integer(), nullable=False),
+    )
+    op.create_table(
+        "week_rollups",
+        sa.Column(
+            "user_id", sa.Integer(), sa.ForeignKey("users.id"), primary_key=True
+        ),
+        sa.Column("week", sa.Integer(), primary_key=True),
+        sa.Column("total", sa.Integer(), nullable=False),
+        sa.Column("completed", sa.Integer(), nullable=False),
+    )
+    op.create_table(
+        "user_streaks",
+        sa.Column(
+            "user_id", sa.Integer(), sa.ForeignKey("users.id"), primary_key=True
+        ),
+        sa.Column("current", sa.Integer(), nullable=False),
+        sa.Column("longest", sa.Integer(), nullable=False),
+        sa.Column("last_active_day", sa.Date(), nullable=True),
+    )
+    _backfill()
+
+
+def downgrade() -> None:
+    op.drop_table("user_streaks")
+    op.drop_table("week_rollups")
+    op.drop_table("daily_activity")
+    with op.batch_alter_table("tasks") as batch:
+        batch.drop_column("completed_at")
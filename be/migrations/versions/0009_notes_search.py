@@ -0,0 +1,102 @@
+"""Full-text search over notes
+
+Postgres gets a generated ``notes.search_vector`` with a GIN index; SQLite
+gets an external-content FTS5 table kept in sync by triggers. Neither is
+mapped on the Note model; migrations/env.py keeps autogenerate from
+offering to drop them.
+
+Adding the stored column rewrites ``notes`` on Postgres. The GIN index is
+then built CONCURRENTLY, like 0003's, so writes are not blocked for the
+length of the build.
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-17
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import TSVECTOR
+
+
+revision: str = "0009"
+down_revision: Union[str, None] = "0008"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SEARCH_VECTOR = (
+    "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(content, '')), 'B')"
+)
+
+# Also used by later migrations that rebuild the notes table on SQLite,
+# which drops its triggers
+SQLITE_FTS_TRIGGERS = (
+    """
+    CREATE TRIGGER notes_fts_insert AFTER INSERT ON notes BEGIN
+        INSERT INTO notes_fts (rowid, title, content)
+        VALUES (new.id, new.title, new.content);
+    END
+    """,
+    """
+    CREATE TRIGGER notes_fts_delete AFTER DELETE ON notes BEGIN
+        INSERT INTO notes_fts (notes_fts, rowid, title, content)
+        VALUES ('delete', old.id, old.title, old.content);
+    END
+    """,
+    """
+    CREATE TRIGGER notes_fts_update AFTER UPDATE OF title, content ON notes BEGIN
+        INSERT INTO notes_fts (notes_fts, rowid, title, content)
+        VALUES ('delete', old.id, old.title, old.content);
+        INSERT INTO notes_fts (rowid, title, content)
+        VALUES (new.id, new.title, new.content);
+    END
+    """,
+)
+
+
+def upgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == "postgresql":
+        op.add_column(
+            "notes",
+            sa.Column(
+                "search_vector",
+                TSVECTOR(),
+                sa.Computed(SEARCH_VECTOR, persisted=True),
+            ),
+        )
+        with op.get_context().autocommit_block():
+            op.create_index(
+                "ix_notes_search_vector",
+                "notes",
+                ["search_vector"],
+                postgresql_using="gin",
+                postgresql_concurrently=True,
+            )
+    elif dialect == "sqlite":
+        op.execute(
+            "CREATE VIRTUAL TABLE notes_fts USING fts5("
+            "title, content, content='notes', content_rowid='id', "
+            "tokenize='porter unicode61')"
+        )
+        for trigger in SQLITE_FTS_TRIGGERS:
+            op.execute(trigger)
+        op.execute("INSERT INTO notes_fts (notes_fts) VALUES ('rebuild')")
+
+
+def downgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == "postgresql":
+        with op.get_context().autocommit_block():
+            op.drop_index(
+                "ix_notes_search_vector",
+                table_name="notes",
+                postgresql_concurrently=True,
+            )
+        op.drop_column("notes", "search_vector")
+    elif dialect == "sqlite":
+        for name in ("insert", "delete", "update"):
+            op.execute(f"DROP TRIGGER IF EXISTS notes_fts_{name}")
+        op.execute("DROP TABLE notes_fts")
@@ -0,0 +1,98 @@
+"""ON DELETE CASCADE from users to every child table; users.deleted_at
+
+schedules.task_id becomes ON DELETE SET NULL, matching how the app already
+detaches schedule rows from deleted tasks. users.deleted_at marks accounts
+disabled while a background job purges their data.
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-17
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "0010"
+down_revision: Union[str, None] = "0009"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+USER_CHILD_TABLES = (
+    "learning_goals",
+    "tasks",
+    "schedules",
+    "notes",
+    "playlists",
+    "progress",
+    "quizzes",
+    "ai_jobs",
+    "daily_activity",
+    "week_rollups",
+    "user_streaks",
+)
+
+# (table, column, referred table, ON DELETE action after upgrade)
+FOREIGN_KEYS = [(table, "user_id", "users", "CASCADE") for table in USER_CHILD_TABLES]
+FOREIGN_KEYS.append(("schedules", "task_id", "tasks", "SET NULL"))
+
+# SQLite reflects these FKs unnamed; batch mode names them by this convention
+SQLITE_NAMING = {"fk": "fk_%(table_name)s_%(column_0_name)s_%(referred_table_name)s"}
+
+
+def _replace_foreign_keys(ondelete: bool) -> None:
+    bind = op.get_bind()
+    if bind.dialect.name == "sqlite":
+        for table in dict.fromkeys(t for t, _, _, _ in FOREIGN_KEYS):
+            # Rebuilding the table drops its triggers (notes_fts_*): keep them
+            triggers = bind.execute(
+                sa.text(
+                    "SELECT sql FROM sqlite_master "
+                    "WHERE type = 'trigger' AND tbl_name = :table"
+                ),
+                {"table": table},
+            ).scalars().all()
+            with op.batch_alter_table(
+                table, recreate="always", naming_convention=SQLITE_NAMING
+            ) as batch:
+                for t, column, referred, action in FOREIGN_KEYS:
+                    if t != table:
+                        continue
+                    name = f"fk_{table}_{column}_{referred}"
+                    batch.drop_constraint(name, type_="foreignkey")
+                    batch.create_foreign_key(
+                        name,
+                        referred,
+                        [column],
+                        ["id"],
+                        ondelete=action if ondelete else None,
+                    )
+            for trigger in triggers:
+                op.execute(trigger)
+        return
+
+    for table, column, referred, action in FOREIGN_KEYS:
+        name = f"{table}_{column}_fkey"  # Postgres' default name
+        op.drop_constraint(name, table, type_="foreignkey")
+        op.create_foreign_key(
+            name,
+            table,
+            referred,
+            [column],
+            ["id"],
+            ondelete=action if ondelete else None,
+        )
+
+
+def upgrade() -> None:
+    op.add_column(
+        "users", sa.Column("deleted_at", sa.DateTime(timezone=True), nullable=True)
+    )
+    _replace_foreign_keys(ondelete=True)
+
+
+def downgrade() -> None:
+    _replace_foreign_keys(ondelete=False)
+    with op.batch_alter_table("users") as batch:
+        batch.drop_column("deleted_at")
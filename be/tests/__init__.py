@@ -0,0 +1,4 @@
+"""Backend tests against a throwaway SQLite database.
+
+Run from ``be/`` with ``uv run python -m unittest``.
+"""
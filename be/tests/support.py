@@ -0,0 +1,46 @@
+"""Shared setup: a migrated SQLite database and an authenticated client."""
+
+import os
+import tempfile
+import uuid
+
+_DB_DIR = tempfile.mkdtemp(prefix="goalpad-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_DB_DIR}/test.db"
+os.environ["DB_ASYNC"] = "false"
+os.environ["JOB_WORKERS"] = "0"
+os.environ["LLM_BACKEND"] = "stub"
+os.environ["LLM_STUB_PRO_LATENCY"] = "fixed:0"
+os.environ["LLM_STUB_FLASH_LATENCY"] = "fixed:0"
+os.environ["BCRYPT_ROUNDS"] = "4"
+
+from alembic import command  # noqa: E402
+from alembic.config import Config  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+_BE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_migrated = False
+
+
+def migrate() -> None:
+    global _migrated
+    if not _migrated:
+        command.upgrade(Config(os.path.join(_BE_DIR, "alembic.ini")), "head")
+        _migrated = True
+
+
+def client() -> TestClient:
+    """A client logged in as a fresh user (lifespan, and so job workers, off)."""
+    migrate()
+    from app.main import app
+
+    test_client = TestClient(app)
+    name = f"user-{uuid.uuid4().hex[:12]}"
+    test_client.post(
+        "/auth/register",
+        json={"username": name, "email": f"{name}@example.com", "password": "pw"},
+    ).raise_for_status()
+    token = test_client.post(
+        "/auth/login", json={"username": name, "password": "pw"}
+    ).json()["access_token"]
+    test_client.headers["Authorization"] = f"Bearer {token}"
+    return test_client
@@ -0,0 +1,83 @@
+import asyncio
+import dataclasses
+import unittest
+from unittest import mock
+
+from tests import support
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+class LargeAccountDeletionTest(unittest.TestCase):
+    def setUp(self):
+        self.client = support.client()
+        self.user_id = self.client.get("/profile").json()["id"]
+        for title in ("one", "two", "three"):
+            self.client.post("/tasks", json={"title": title}).raise_for_status()
+        with mock.patch("app.accounts.ACCOUNT_DELETE_INLINE_ROWS", 2):
+            self.client.delete("/profile").raise_for_status()
+
+    def tearDown(self):
+        from app import auth
+        from app.jobs import run_purge_job
+
+        # Leave no queued purge behind for the next test to claim
+        if self.user_exists():
+            run(run_purge_job(self.claim()))
+        # SQLite hands the deleted user's id to the next user registered
+        auth._revoked_users.pop(self.user_id, None)
+
+    def claim(self):
+        from app.database import session_scope
+        from app.jobs import claim_job
+
+        async def claim():
+            async with session_scope("tests") as db:
+                return await claim_job(db)
+
+        job = run(claim())
+        self.assertEqual((job.user_id, job.kind), (self.user_id, "purge_account"))
+        return job
+
+    def user_exists(self) -> bool:
+        from app.database import session_scope
+        from app.models import User
+
+        async def load():
+            async with session_scope("tests") as db:
+                return await db.get(User, self.user_id)
+
+        return run(load()) is not None
+
+    def test_disabled_account_tokens_are_refused_by_other_workers(self):
+        from app import auth
+
+        # A worker that neither served the delete nor cached the user
+        with mock.patch.dict(auth._revoked_users, clear=True):
+            auth.user_cache.invalidate_user(self.user_id)
+            self.assertEqual(self.client.get("/tasks").status_code, 401)
+            self.assertEqual(self.client.get("/profile").status_code, 401)
+
+    def test_purge_job_deletes_the_user(self):
+        from app.jobs import run_purge_job
+
+        run(run_purge_job(self.claim()))
+        self.assertFalse(self.user_exists())
+
+    def test_reclaimed_purge_job_stops(self):
+        from app.jobs import LeaseLost, run_purge_job
+
+        job = self.claim()
+        # Another worker reclaimed it after the lease expired
+        reclaimed = dataclasses.replace(job, attempts=job.attempts - 1)
+        with self.assertRaises(LeaseLost):
+            run(run_purge_job(reclaimed))
+        self.assertTrue(self.user_exists())
+        run(run_purge_job(job))
+        self.assertFalse(self.user_exists())
+
+
+if __name__ == "__main__":
+    unittest.main()
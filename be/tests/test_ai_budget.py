@@ -0,0 +1,33 @@
+import asyncio
+import unittest
+
+from tests import support  # noqa: F401  (sets the environment before app imports)
+
+from app.ai_service import AIService, TokenBudget
+from app.llm_backends import StubBackend, StubProfile, parse_latency
+
+
+class SingleFlightBudgetTest(unittest.TestCase):
+    def test_every_waiter_is_charged(self):
+        backend = StubBackend(
+            default=StubProfile(latency=parse_latency("fixed:0.05"))
+        )
+        service = AIService(backend=backend)
+        service.budget = TokenBudget(daily_limit=10**9)
+
+        async def run():
+            await asyncio.gather(
+                service.generate_roadmap("Python", user_id=1),
+                service.generate_roadmap("Python", user_id=2),
+            )
+
+        asyncio.run(run())
+        self.assertEqual(backend.calls, 1)
+        self.assertEqual(service._single_flight.followers, 1)
+        leader = service.budget._used_today(1)
+        self.assertGreater(leader, 0)
+        self.assertEqual(service.budget._used_today(2), leader)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,46 @@
+import asyncio
+import unittest
+
+from tests import support  # noqa: F401  (sets the environment before app imports)
+
+from app.ai_service import AIService
+from app.llm_backends import StubBackend, StubProfile, parse_latency
+
+
+class RoadmapCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.backend = StubBackend(
+            default=StubProfile(latency=parse_latency("fixed:0"))
+        )
+        # AI_CACHE_BACKEND is unset in tests, so each service gets a memory cache
+        self.service = AIService(backend=self.backend)
+
+    def test_whitespace_shares_an_entry(self):
+        async def run():
+            first = await self.service.generate_roadmap("Python", "for  data work")
+            second = await self.service.generate_roadmap(" Python ", "for data work\n")
+            return first, second
+
+        first, second = asyncio.run(run())
+        self.assertEqual(self.backend.calls, 1)
+        self.assertEqual(first, second)
+
+    def test_case_does_not(self):
+        async def run():
+            await self.service.generate_roadmap("Go", "using the NewReader API")
+            await self.service.generate_roadmap("Go", "using the newreader API")
+
+        asyncio.run(run())
+        self.assertEqual(self.backend.calls, 2)
+
+    def test_different_topics_do_not(self):
+        async def run():
+            await self.service.generate_roadmap("Python")
+            await self.service.generate_roadmap("Rust")
+
+        asyncio.run(run())
+        self.assertEqual(self.backend.calls, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
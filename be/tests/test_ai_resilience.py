@@ -0,0 +1,139 @@
+import asyncio
+import time
+import unittest
+
+from tests import support  # noqa: F401  (sets the environment before app imports)
+
+from app.ai_service import (
+    AIService,
+    AITimeoutError,
+    AIUnavailableError,
+    ModelGate,
+    ResiliencePolicy,
+)
+from app.llm_backends import StubAPIError, StubBackend, StubProfile, parse_latency
+
+
+class ScriptedBackend(StubBackend):
+    """Stub answers, each call first failing with or sleeping for its step."""
+
+    def __init__(self, *script) -> None:
+        super().__init__(default=StubProfile(latency=parse_latency("fixed:0")))
+        self.script = list(script)
+        self.models = []
+
+    async def generate(self, model, contents, config=None):
+        self.models.append(model)
+        step = self.script.pop(0) if self.script else None
+        if isinstance(step, int):
+            raise StubAPIError(step, "scripted")
+        if isinstance(step, float):
+            await asyncio.sleep(step)
+        return await super().generate(model, contents, config)
+
+
+class ResilienceTest(unittest.TestCase):
+    def service(self, backend, **policy) -> AIService:
+        service = AIService(backend=backend)
+        service.policies["answer"] = ResiliencePolicy(base_delay=0, **policy)
+        return service
+
+    def call(self, service, model=None):
+        model = model or service.flash_model_name
+        return asyncio.run(service._call("answer", model, "prompt"))
+
+    def test_retries_server_errors(self):
+        backend = ScriptedBackend(503, 503)
+        service = self.service(backend, max_attempts=3)
+        _, answered_by = self.call(service)
+        self.assertEqual(answered_by, service.flash_model_name)
+        self.assertEqual(len(backend.models), 3)
+        outcomes = service.attempts.outcomes[f"answer:{service.flash_model_name}"]
+        self.assertEqual(outcomes, {"server_error": 2, "ok": 1})
+
+    def test_gives_up_after_max_attempts(self):
+        backend = ScriptedBackend(503, 503, 503)
+        service = self.service(backend, max_attempts=3)
+        with self.assertRaises(AIUnavailableError):
+            self.call(service)
+        self.assertEqual(len(backend.models), 3)
+
+    def test_throttled_model_falls_back(self):
+        backend = ScriptedBackend(429)
+        service = self.service(backend, fallback_model="gemini-2.5-flash-lite")
+        _, answered_by = self.call(service, service.pro_model_name)
+        self.assertEqual(
+            backend.models, [service.pro_model_name, service.flash_model_name]
+        )
+        self.assertEqual(answered_by, service.flash_model_name)
+        self.assertEqual(
+            dict(service.attempts.fallbacks),
+            {f"{service.pro_model_name}->{service.flash_model_name}": 1},
+        )
+
+    def test_slow_call_is_hedged(self):
+        backend = ScriptedBackend(5.0)
+        service = self.service(backend, hedge_quantile=0.5)
+        model = service.flash_model_name
+        service._gates[model].latencies.extend([0.01] * 20)
+
+        started = time.perf_counter()
+        self.call(service)
+        self.assertLess(time.perf_counter() - started, 1.0)
+        self.assertEqual(service.attempts.hedges[model], 1)
+        self.assertEqual(service.attempts.hedge_wins[model], 1)
+
+    def test_waiting_for_a_slot_counts_against_the_deadline(self):
+        service = self.service(ScriptedBackend(), max_attempts=3, deadline=0.3)
+        model = service.flash_model_name
+        gate = service._gates[model] = ModelGate(model, limit=1, timeout=0.2)
+
+        async def run():
+            await gate.semaphore.acquire()  # every slot busy elsewhere
+            return await service._call("answer", model, "prompt")
+
+        started = time.perf_counter()
+        # Out of time either waiting or before another retry could start
+        with self.assertRaises((AITimeoutError, AIUnavailableError)):
+            asyncio.run(run())
+        self.assertLess(time.perf_counter() - started, 1.0)
+        self.assertGreaterEqual(gate.queue_timeouts, 1)
+
+
+class StreamRoadmapTest(unittest.TestCase):
+    def test_slow_consumer_does_not_hold_the_gate(self):
+        backend = StubBackend(
+            default=StubProfile(latency=parse_latency("fixed:0.05"))
+        )
+        service = AIService(backend=backend)
+        model = service.pro_model_name
+        gate = service._gates[model] = ModelGate(model, limit=1, timeout=5)
+
+        async def run():
+            stream = service.stream_roadmap("Python")
+            weeks = [await stream.__anext__()]
+            await asyncio.sleep(0.2)  # the caller is busy staging rows
+            self.assertEqual(gate.in_flight, 0)
+            await asyncio.wait_for(service.generate_roadmap("Rust"), timeout=1)
+            weeks += [week async for week in stream]
+            return weeks
+
+        self.assertEqual(len(asyncio.run(run())), 24)
+
+    def test_failed_stream_is_not_retried(self):
+        backend = StubBackend(
+            default=StubProfile(latency=parse_latency("fixed:0"), error_rate=1.0)
+        )
+        service = AIService(backend=backend)
+
+        async def run():
+            return [week async for week in service.stream_roadmap("Python")]
+
+        with self.assertRaises(StubAPIError):
+            asyncio.run(run())
+        self.assertEqual(backend.calls, 1)
+        self.assertEqual(service._gates[service.pro_model_name].failed, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
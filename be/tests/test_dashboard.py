@@ -0,0 +1,58 @@
+import asyncio
+import unittest
+
+from tests import support
+
+
+class DashboardSummaryTest(unittest.TestCase):
+    def setUp(self):
+        self.client = support.client()
+        self.user_id = self.client.get("/profile").json()["id"]
+
+    def grouped_from_tasks(self):
+        """Per-week [total, completed], aggregated over the tasks table."""
+        from sqlalchemy import case, func, select
+
+        from app.database import session_scope
+        from app.models import Task
+        from app.task_sources import counted_tasks
+
+        async def load():
+            async with session_scope("tests") as db:
+                rows = await db.execute(
+                    select(
+                        Task.week,
+                        func.count(),
+                        func.sum(case((Task.completed.is_(True), 1), else_=0)),
+                    )
+                    .where(Task.user_id == self.user_id, counted_tasks)
+                    .group_by(Task.week)
+                )
+                return {week: [total, done] for week, total, done in rows}
+
+        return asyncio.run(load())
+
+    def test_week_progress_matches_the_tasks(self):
+        self.client.post(
+            "/ai/generate-roadmap", json={"topic": "Python"}
+        ).raise_for_status()
+        tasks = self.client.get("/tasks").json()
+        for task in tasks[:3]:
+            self.client.put(
+                f"/tasks/{task['id']}", json={"completed": True}
+            ).raise_for_status()
+        self.client.delete(f"/tasks/{tasks[-1]['id']}").raise_for_status()
+        self.client.post("/tasks", json={"title": "loose"}).raise_for_status()
+
+        summary = self.client.get("/dashboard/summary").json()
+        served = {
+            wp["week"]: [wp["total"], wp["completed"]]
+            for wp in summary["week_progress"]
+        }
+        self.assertEqual(served, self.grouped_from_tasks())
+        self.assertEqual(summary["completed_tasks"], 3)
+        self.assertEqual(summary["current_week"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,156 @@
+import asyncio
+import unittest
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+
+from tests import support
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+async def _in_session(work):
+    from app.database import session_scope
+
+    async with session_scope("tests") as db:
+        return await work(db)
+
+
+class JobQueueTest(unittest.TestCase):
+    """claim_job / fail_job / release_job against the real table."""
+
+    def setUp(self):
+        support.migrate()
+        self.clear()
+        self.user_id = self.new_user()
+
+    def tearDown(self):
+        self.clear()
+
+    def clear(self):
+        from sqlalchemy import delete
+
+        from app.models import AIJob
+
+        async def work(db):
+            await db.execute(delete(AIJob))
+            await db.commit()
+
+        run(_in_session(work))
+
+    def new_user(self) -> int:
+        return support.client().get("/profile").json()["id"]
+
+    def enqueue(self, user_id: int) -> int:
+        from app.jobs import enqueue
+
+        async def work(db):
+            return (await enqueue(db, user_id, "roadmap", {"topic": "x"})).id
+
+        return run(_in_session(work))
+
+    def claim(self):
+        from app.jobs import claim_job
+
+        return run(_in_session(claim_job))
+
+    def settle(self, action, job, *args):
+        async def work(db):
+            result = await action(db, job, *args)
+            await db.commit()
+            return result
+
+        return run(_in_session(work))
+
+    def load(self, job_id: int):
+        from app.models import AIJob
+
+        return run(_in_session(lambda db: db.get(AIJob, job_id)))
+
+    def make_due(self, job_id: int) -> None:
+        from sqlalchemy import update
+
+        from app.models import AIJob
+
+        async def work(db):
+            await db.execute(
+                update(AIJob)
+                .where(AIJob.id == job_id)
+                .values(run_after=datetime.now(timezone.utc) - timedelta(seconds=1))
+            )
+            await db.commit()
+
+        run(_in_session(work))
+
+    def test_failure_requeues_with_backoff(self):
+        from app import jobs
+
+        job_id = self.enqueue(self.user_id)
+        job = self.claim()
+        self.assertEqual((job.id, job.attempts), (job_id, 1))
+
+        before = datetime.now(timezone.utc)
+        with mock.patch("app.jobs.JOB_RETRY_BASE", 60):
+            self.assertEqual(self.settle(jobs.fail_job, job, "boom"), jobs.QUEUED)
+        row = self.load(job_id)
+        self.assertEqual((row.state, row.error), (jobs.QUEUED, "boom"))
+        run_after = row.run_after.replace(tzinfo=timezone.utc)
+        self.assertGreaterEqual(run_after, before + timedelta(seconds=30))
+        # Not due yet
+        self.assertIsNone(self.claim())
+
+        self.make_due(job_id)
+        self.assertEqual(self.claim().attempts, 2)
+
+    def test_dead_after_max_attempts(self):
+        from app import jobs
+
+        with mock.patch("app.jobs.JOB_MAX_ATTEMPTS", 2):
+            job_id = self.enqueue(self.user_id)
+        self.assertEqual(self.settle(jobs.fail_job, self.claim(), "one"), jobs.QUEUED)
+        self.make_due(job_id)
+        self.assertEqual(self.settle(jobs.fail_job, self.claim(), "two"), jobs.DEAD)
+        self.assertEqual(self.load(job_id).state, jobs.DEAD)
+        self.make_due(job_id)
+        self.assertIsNone(self.claim())
+
+    def test_busy_user_is_skipped(self):
+        from app import jobs
+
+        other_id = self.new_user()
+        first = self.enqueue(self.user_id)
+        second = self.enqueue(self.user_id)
+        theirs = self.enqueue(other_id)
+
+        running = self.claim()
+        self.assertEqual(running.id, first)
+        # The first user is at JOB_PER_USER_CONCURRENCY=1
+        self.assertEqual(self.claim().id, theirs)
+        self.assertIsNone(self.claim())
+
+        # Releasing frees the user without charging an attempt
+        self.settle(jobs.release_job, running)
+        self.assertEqual(self.load(first).attempts, 0)
+        self.assertEqual(self.claim().id, second)
+
+    def test_reclaimed_job_loses_its_lease(self):
+        from app import jobs
+
+        job_id = self.enqueue(self.user_id)
+        job = self.claim()
+        # The lease has expired, so another worker takes the job over
+        with mock.patch("app.jobs.JOB_LEASE", 0):
+            reclaimed = self.claim()
+        self.assertEqual((reclaimed.id, reclaimed.attempts), (job_id, 2))
+
+        with self.assertRaises(jobs.LeaseLost):
+            self.settle(jobs.fail_job, job, "late")
+        with self.assertRaises(jobs.LeaseLost):
+            self.settle(jobs.release_job, job)
+        self.settle(jobs.complete_job, reclaimed, {"ok": True})
+        self.assertEqual(self.load(job_id).state, jobs.SUCCEEDED)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,22 @@
+import unittest
+
+from tests import support  # noqa: F401  (sets the environment before app imports)
+
+from app.llm_backends import LLMBackend, LLMResponse, StubBackend
+
+
+class LLMBackendTest(unittest.TestCase):
+    def test_incomplete_backend_fails_on_construction(self):
+        class GenerateOnly(LLMBackend):
+            async def generate(self, model, contents, config=None):
+                return LLMResponse(text="")
+
+        with self.assertRaises(TypeError):
+            GenerateOnly()
+
+    def test_stub_backend_is_complete(self):
+        self.assertIsInstance(StubBackend(), LLMBackend)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,28 @@
+import unittest
+from unittest import mock
+
+from tests import support
+
+
+class MetricsTest(unittest.TestCase):
+    def setUp(self):
+        self.client = support.client()
+
+    def test_disabled_without_a_token(self):
+        with mock.patch("app.main.METRICS_TOKEN", ""):
+            self.assertEqual(self.client.get("/metrics").status_code, 404)
+
+    def test_requires_the_token(self):
+        with mock.patch("app.main.METRICS_TOKEN", "s3cret"):
+            self.assertEqual(self.client.get("/metrics").status_code, 403)
+            wrong = self.client.get("/metrics", headers={"X-Metrics-Token": "no"})
+            self.assertEqual(wrong.status_code, 403)
+            response = self.client.get(
+                "/metrics", headers={"X-Metrics-Token": "s3cret"}
+            )
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(set(response.json()), {"ai", "db", "jobs"})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,111 @@
+import unittest
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+
+from tests import support
+
+
+def walk(test_client, path: str, limit: int):
+    """Follow X-Next-Cursor from the first page to the last."""
+    ids, cursor, pages = [], None, 0
+    while True:
+        params = {"limit": limit}
+        if cursor:
+            params["cursor"] = cursor
+        response = test_client.get(path, params=params)
+        response.raise_for_status()
+        ids.extend(item["id"] for item in response.json())
+        pages += 1
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None or pages > 50:
+            return ids
+
+
+class KeysetPaginationTest(unittest.TestCase):
+    def setUp(self):
+        self.client = support.client()
+
+    def test_walks_every_note_newest_first(self):
+        # Same-second server timestamps: ties are broken by id
+        created = [
+            self.client.post(
+                "/notes", json={"title": f"n{i}", "content": "x"}
+            ).json()["id"]
+            for i in range(5)
+        ]
+        self.assertEqual(walk(self.client, "/notes", 2), created[::-1])
+
+    def test_walks_every_task_oldest_first(self):
+        created = [
+            self.client.post("/tasks", json={"title": f"t{i}"}).json()["id"]
+            for i in range(4)
+        ]
+        self.assertEqual(walk(self.client, "/tasks", 2), created)
+
+    def test_mixed_timestamp_formats(self):
+        from app.database import SessionLocal
+        from app.models import Task
+
+        first = self.client.post("/tasks", json={"title": "server"}).json()
+        # A row whose created_at SQLAlchemy wrote, with microseconds
+        db = SessionLocal()
+        try:
+            user_id = first["user_id"]
+            later = Task(
+                user_id=user_id,
+                title="python",
+                created_at=datetime.now(timezone.utc) + timedelta(seconds=1),
+            )
+            db.add(later)
+            db.commit()
+            later_id = later.id
+        finally:
+            db.close()
+        last = self.client.post("/tasks", json={"title": "server"}).json()
+        self.assertEqual(
+            sorted(walk(self.client, "/tasks", 1)),
+            sorted([first["id"], later_id, last["id"]]),
+        )
+
+    def test_projected_pages_walk_to_the_end(self):
+        created = [
+            self.client.post("/tasks", json={"title": f"t{i}"}).json()["id"]
+            for i in range(3)
+        ]
+        ids, cursor = [], None
+        while True:
+            params = {"limit": 1, "fields": "title"}
+            if cursor:
+                params["cursor"] = cursor
+            response = self.client.get("/tasks", params=params)
+            ids.extend(item["id"] for item in response.json())
+            cursor = response.headers.get("X-Next-Cursor")
+            if cursor is None or len(ids) > 10:
+                break
+        self.assertEqual(ids, created)
+
+    def test_omitted_limit_returns_the_default_page(self):
+        created = [
+            self.client.post("/tasks", json={"title": f"t{i}"}).json()["id"]
+            for i in range(3)
+        ]
+        with mock.patch("app.pagination.DEFAULT_PAGE_SIZE", 2):
+            first = self.client.get("/tasks")
+            self.assertEqual([item["id"] for item in first.json()], created[:2])
+            rest = self.client.get(
+                "/tasks", params={"cursor": first.headers["X-Next-Cursor"]}
+            )
+        self.assertEqual([item["id"] for item in rest.json()], created[2:])
+        self.assertNotIn("X-Next-Cursor", rest.headers)
+
+    def test_limit_is_capped(self):
+        for i in range(3):
+            self.client.post("/tasks", json={"title": f"t{i}"})
+        with mock.patch("app.pagination.MAX_PAGE_SIZE", 2):
+            response = self.client.get("/tasks", params={"limit": 50})
+        self.assertEqual(len(response.json()), 2)
+        self.assertIn("X-Next-Cursor", response.headers)
+
+
+if __name__ == "__main__":
+    unittest.main()
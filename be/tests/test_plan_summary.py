@@ -0,0 +1,44 @@
+import asyncio
+import unittest
+
+from tests import support
+
+
+class LoadPlanSummaryTest(unittest.TestCase):
+    def setUp(self):
+        self.client = support.client()
+        self.user_id = self.client.get("/profile").json()["id"]
+        self.client.post(
+            "/ai/generate-roadmap", json={"topic": "Python"}
+        ).raise_for_status()
+
+    def test_legacy_goal_is_summarized_without_writing(self):
+        from sqlalchemy import select, update
+
+        from app.crud import load_plan_summary
+        from app.database import session_scope
+        from app.models import LearningGoal
+
+        goal = LearningGoal.user_id == self.user_id
+
+        async def run():
+            async with session_scope("tests") as db:
+                await db.execute(
+                    update(LearningGoal).where(goal).values(week_summaries=None)
+                )
+                await db.commit()
+            async with session_scope("tests") as db:
+                summary = await load_plan_summary(db, self.user_id, 1, 2)
+            async with session_scope("tests") as db:
+                stored = await db.scalar(
+                    select(LearningGoal.week_summaries).where(goal)
+                )
+            return summary, stored
+
+        summary, stored = asyncio.run(run())
+        self.assertIn("Week 1", summary)
+        self.assertIsNone(stored)
+
+
+if __name__ == "__main__":
+    unittest.main()
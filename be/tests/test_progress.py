@@ -0,0 +1,78 @@
+import asyncio
+import unittest
+
+from tests import support
+
+
+def entry(day: str, tasks_completed: int, study_hours: float = 1.0) -> dict:
+    return {
+        "date": day,
+        "tasks_completed": tasks_completed,
+        "study_hours": study_hours,
+        "notes_created": 0,
+    }
+
+
+class ProgressUpsertTest(unittest.TestCase):
+    def setUp(self):
+        self.client = support.client()
+        self.user_id = self.client.get("/profile").json()["id"]
+
+    def stored(self):
+        from sqlalchemy import select
+
+        from app.database import session_scope
+        from app.models import Progress
+
+        async def load():
+            async with session_scope("tests") as db:
+                rows = await db.scalars(
+                    select(Progress)
+                    .where(Progress.user_id == self.user_id)
+                    .order_by(Progress.date)
+                )
+                return [
+                    (row.id, str(row.date), row.tasks_completed, row.study_hours)
+                    for row in rows
+                ]
+
+        return asyncio.run(load())
+
+    def test_duplicate_dates_in_a_batch_keep_the_last_entry(self):
+        response = self.client.post(
+            "/progress/batch",
+            json={
+                "entries": [
+                    entry("2026-03-02", 1),
+                    entry("2026-03-01", 4),
+                    entry("2026-03-02", 3, study_hours=2.5),
+                ]
+            },
+        )
+        response.raise_for_status()
+        saved = [(r["date"], r["tasks_completed"]) for r in response.json()]
+        self.assertEqual(saved, [("2026-03-01", 4), ("2026-03-02", 3)])
+        stored = self.stored()
+        self.assertEqual(
+            [row[1:] for row in stored],
+            [("2026-03-01", 4, 1.0), ("2026-03-02", 3, 2.5)],
+        )
+
+    def test_existing_day_is_updated_in_place(self):
+        first = self.client.post("/progress", json=entry("2026-03-01", 1)).json()
+        response = self.client.post(
+            "/progress/batch",
+            json={"entries": [entry("2026-03-01", 5, study_hours=3.0)]},
+        )
+        response.raise_for_status()
+        (updated,) = response.json()
+        self.assertEqual(updated["id"], first["id"])
+        self.assertEqual(updated["tasks_completed"], 5)
+
+        again = self.client.post("/progress", json=entry("2026-03-01", 6)).json()
+        self.assertEqual(again["id"], first["id"])
+        self.assertEqual(self.stored(), [(first["id"], "2026-03-01", 6, 1.0)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,72 @@
+import asyncio
+import unittest
+
+from tests import support
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+class StagedRoadmapTest(unittest.TestCase):
+    def setUp(self):
+        self.client = support.client()
+        self.user_id = self.client.get("/profile").json()["id"]
+
+    def stage(self, stream: str, description: str) -> int:
+        from app.crud import stage_roadmap_week
+        from app.database import session_scope
+        from app.schemas import RoadmapWeek
+
+        week = RoadmapWeek(
+            week=1, theme="w1", tasks=[{"description": description, "quadrant": "Q2"}]
+        )
+
+        async def stage():
+            async with session_scope("tests") as db:
+                (task_id,) = await stage_roadmap_week(db, self.user_id, stream, week)
+                await db.commit()
+            return task_id
+
+        return run(stage())
+
+    def call(self, function, stream: str):
+        from app.database import session_scope
+
+        async def call():
+            async with session_scope("tests") as db:
+                await function(db, self.user_id, stream)
+                await db.commit()
+
+        run(call())
+
+    def titles(self):
+        return [task["title"] for task in self.client.get("/tasks").json()]
+
+    def test_staged_tasks_stay_out_of_reads(self):
+        self.client.post("/tasks", json={"title": "mine"}).raise_for_status()
+        self.stage("a", "staged")
+
+        self.assertEqual(self.titles(), ["mine"])
+        page = self.client.get("/tasks", params={"limit": 10, "fields": "title"})
+        self.assertEqual([t["title"] for t in page.json()], ["mine"])
+        dashboard = self.client.get("/dashboard").json()
+        self.assertEqual([t["title"] for t in dashboard["recent_tasks"]], ["mine"])
+        summary = self.client.get("/dashboard/summary", params={"week": 1}).json()
+        self.assertEqual(summary["current_week_tasks"], [])
+
+    def test_concurrent_streams_keep_their_own_rows(self):
+        from app.crud import discard_pending_roadmap, promote_pending_roadmap
+
+        self.stage("a", "from a")
+        self.stage("b", "from b")
+        self.call(discard_pending_roadmap, "a")
+        self.call(promote_pending_roadmap, "b")
+        self.assertEqual(self.titles(), ["from b"])
+
+        summary = self.client.get("/dashboard/summary").json()
+        self.assertEqual(summary["total_tasks"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
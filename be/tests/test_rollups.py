@@ -0,0 +1,80 @@
+import asyncio
+import unittest
+
+from tests import support
+
+
+def activity(test_client):
+    response = test_client.get("/stats/activity")
+    response.raise_for_status()
+    return response.json()
+
+
+def check(user_id: int):
+    from app.database import session_scope
+    from app.rollups import check_user_rollups
+
+    async def run():
+        async with session_scope("tests") as db:
+            return await check_user_rollups(db, user_id)
+
+    return asyncio.run(run())
+
+
+class RoadmapRegenerationTest(unittest.TestCase):
+    def setUp(self):
+        self.client = support.client()
+        self.user_id = self.client.get("/profile").json()["id"]
+
+    def generate(self, topic: str):
+        self.client.post(
+            "/ai/generate-roadmap", json={"topic": topic}
+        ).raise_for_status()
+
+    def test_completions_survive_a_new_roadmap(self):
+        self.generate("Python")
+        first = self.client.get("/tasks", params={"limit": 1}).json()[0]
+        self.client.put(
+            f"/tasks/{first['id']}", json={"completed": True}
+        ).raise_for_status()
+        self.assertEqual(activity(self.client)["days"][0]["tasks_completed"], 1)
+
+        self.generate("Rust")
+        summary = activity(self.client)
+        self.assertEqual(summary["days"][0]["tasks_completed"], 1)
+        self.assertEqual(summary["current_streak"], 1)
+
+        dashboard = self.client.get("/dashboard/summary").json()
+        self.assertEqual(dashboard["completed_tasks"], 0)
+        self.assertEqual(
+            dashboard["total_tasks"], len(self.client.get("/tasks").json())
+        )
+        self.assertEqual(check(self.user_id), [])
+
+    def test_staged_tasks_cannot_be_changed(self):
+        from app.crud import stage_roadmap_week
+        from app.database import session_scope
+        from app.schemas import RoadmapWeek
+
+        async def stage():
+            week = RoadmapWeek.model_validate(
+                {
+                    "week": 1,
+                    "theme": "staged",
+                    "tasks": [{"description": "staged", "quadrant": "Q2"}],
+                }
+            )
+            async with session_scope("tests") as db:
+                (task_id,) = await stage_roadmap_week(db, self.user_id, "s1", week)
+                await db.commit()
+            return task_id
+
+        task_id = asyncio.run(stage())
+        update = self.client.put(f"/tasks/{task_id}", json={"completed": True})
+        self.assertEqual(update.status_code, 404)
+        self.assertEqual(self.client.delete(f"/tasks/{task_id}").status_code, 404)
+        self.assertEqual(activity(self.client)["days"], [])
+
+
+if __name__ == "__main__":
+    unittest.main()
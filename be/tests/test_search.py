@@ -0,0 +1,49 @@
+import unittest
+
+from tests import support
+
+
+class NoteSearchTest(unittest.TestCase):
+    def setUp(self):
+        self.client = support.client()
+
+    def search(self, query: str):
+        response = self.client.get("/notes/search", params={"q": query})
+        response.raise_for_status()
+        return response.json()
+
+    def test_note_markup_is_escaped(self):
+        self.client.post(
+            "/notes",
+            json={
+                "title": "<script>alert(1)</script> payload",
+                "content": 'Read <img src=x onerror="alert(1)"> then the payload',
+            },
+        ).raise_for_status()
+
+        (hit,) = self.search("payload")
+        self.assertEqual(
+            hit["title"],
+            "&lt;script&gt;alert(1)&lt;/script&gt; <mark>payload</mark>",
+        )
+        self.assertNotIn("<img", hit["snippet"])
+        self.assertIn("&lt;img", hit["snippet"])
+        self.assertIn("<mark>payload</mark>", hit["snippet"])
+
+    def test_best_match_first(self):
+        for title, content in (
+            ("other", "mentions kestrel once"),
+            ("kestrel", "kestrel kestrel kestrel"),
+        ):
+            self.client.post(
+                "/notes", json={"title": title, "content": content}
+            ).raise_for_status()
+
+        hits = self.search("kestrel")
+        self.assertEqual(
+            [h["title"] for h in hits], ["<mark>kestrel</mark>", "other"]
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
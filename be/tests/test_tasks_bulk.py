@@ -0,0 +1,85 @@
+import unittest
+
+from tests import support
+from tests.test_rollups import activity, check
+
+
+class BulkTasksTest(unittest.TestCase):
+    def setUp(self):
+        self.client = support.client()
+        self.user_id = self.client.get("/profile").json()["id"]
+
+    def create(self, title: str, week: int = 1) -> int:
+        response = self.client.post("/tasks", json={"title": title, "week": week})
+        response.raise_for_status()
+        return response.json()["id"]
+
+    def bulk(self, operations):
+        response = self.client.post(
+            "/tasks/bulk",
+            json={"operations": [{"id": i, "action": a} for i, a in operations]},
+        )
+        response.raise_for_status()
+        return response.json()
+
+    def statuses(self, body):
+        return {r["id"]: r["status"] for r in body["results"]}
+
+    def week_progress(self):
+        dashboard = self.client.get("/dashboard/summary").json()
+        return {
+            w["week"]: (w["total"], w["completed"]) for w in dashboard["week_progress"]
+        }
+
+    def test_other_users_and_unknown_ids_are_not_found(self):
+        mine = self.create("mine")
+        other = support.client()
+        theirs = other.post("/tasks", json={"title": "theirs"}).json()["id"]
+        unknown = max(mine, theirs) + 1000
+
+        body = self.bulk(
+            [(mine, "complete"), (theirs, "complete"), (unknown, "delete")]
+        )
+        self.assertEqual(
+            self.statuses(body),
+            {mine: "updated", theirs: "not_found", unknown: "not_found"},
+        )
+        self.assertEqual((body["updated"], body["deleted"]), (1, 0))
+        # The other user's task is untouched, and still theirs to delete
+        self.assertFalse(other.get("/tasks").json()[0]["completed"])
+        body = self.bulk([(theirs, "delete")])
+        self.assertEqual(self.statuses(body), {theirs: "not_found"})
+        self.assertEqual(len(other.get("/tasks").json()), 1)
+
+    def test_tasks_already_in_that_state_are_unchanged(self):
+        done = self.create("done")
+        todo = self.create("todo")
+        self.bulk([(done, "complete")])
+
+        body = self.bulk([(done, "complete"), (todo, "uncomplete")])
+        self.assertEqual(self.statuses(body), {done: "unchanged", todo: "unchanged"})
+        self.assertEqual(body["updated"], 0)
+        results = {r["id"]: r for r in body["results"]}
+        self.assertTrue(results[done]["task"]["completed"])
+        self.assertFalse(results[todo]["task"]["completed"])
+        # A repeated completion is not counted twice
+        self.assertEqual(activity(self.client)["days"][0]["tasks_completed"], 1)
+
+    def test_bulk_delete_updates_the_rollups(self):
+        first = self.create("first")
+        second = self.create("second")
+        third = self.create("third", week=2)
+        self.bulk([(first, "complete"), (second, "complete")])
+        self.assertEqual(self.week_progress(), {1: (2, 2), 2: (1, 0)})
+
+        body = self.bulk([(first, "delete"), (third, "delete")])
+        self.assertEqual(self.statuses(body), {first: "deleted", third: "deleted"})
+        self.assertEqual(body["deleted"], 2)
+
+        self.assertEqual(self.week_progress(), {1: (1, 1)})
+        self.assertEqual(activity(self.client)["days"][0]["tasks_completed"], 1)
+        self.assertEqual(check(self.user_id), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -197,6 +197,7 @@ export interface RoadmapRequest {
 export interface VideoSummaryRequest {
 	video_title: string;
 	video_description?: string;
+	transcript?: string;
 }
 
 export interface VideoQuestionRequest {